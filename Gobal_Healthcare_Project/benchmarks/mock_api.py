@@ -0,0 +1,122 @@
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+from benchmarks.synthetic_data import generate, DEFAULT_DAYS
+from etl.fetch_engine import ENDPOINTS
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 3000
+
+
+class MockAPIServer:
+    # Local stand-in for the localhost:3000/api server: GET /api/<endpoint>
+    # with the same query parameters APIClient sends (country, start_date,
+    # end_date, limit, offset), returning plain JSON arrays. Datasets are
+    # in-memory frames sorted by country and date; each page is serialized
+    # on request, so large datasets cost memory once, not per page.
+
+    def __init__(self, datasets, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.datasets = {endpoint: self._index(frame) for endpoint, frame in datasets.items()}
+        self.requests = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-api", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @staticmethod
+    def _index(frame):
+        frame = frame.reset_index(drop=True)
+        names = frame["country_name"].astype(str).str.lower()
+        bounds = {country: (rows.min(), rows.max() + 1) for country, rows in names.groupby(names).groups.items()}
+        return frame, bounds
+
+    def page(self, endpoint, params):
+        frame, bounds = self.datasets[endpoint]
+        country = params.get("country")
+        if country:
+            start, stop = bounds.get(country.lower(), (0, 0))
+            frame = frame.iloc[start:stop]
+        if params.get("start_date") or params.get("end_date"):
+            dates = frame["report_date"]
+            mask = pd.Series(True, index=frame.index)
+            if params.get("start_date"):
+                mask &= dates >= pd.Timestamp(params["start_date"])
+            if params.get("end_date"):
+                mask &= dates <= pd.Timestamp(params["end_date"])
+            frame = frame[mask]
+        offset = int(params.get("offset", 0))
+        limit = int(params.get("limit", len(frame)))
+        page = frame.iloc[offset:offset + limit]
+        return page.to_json(orient="records", date_format="iso").encode("utf-8")
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                endpoint = url.path.rstrip("/").rsplit("/", 1)[-1]
+                if endpoint not in server.datasets:
+                    self.send_error(404)
+                    return
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+                server.requests += 1
+                body = server.page(endpoint, params)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve synthetic healthcare data in place of the real API.")
+    parser.add_argument("--countries", type=int, default=50)
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS)
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    datasets = {endpoint: generate(endpoint, args.countries, args.days, seed=args.seed) for endpoint in ENDPOINTS}
+    server = MockAPIServer(datasets, args.host, args.port)
+    print(f" Serving {args.countries} countries x {args.days} days at {server.base_url} (Ctrl+C to stop).")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
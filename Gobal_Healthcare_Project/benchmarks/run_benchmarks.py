@@ -0,0 +1,261 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from tabulate import tabulate
+
+from benchmarks.mock_api import MockAPIServer, DEFAULT_HOST
+from benchmarks.synthetic_data import generate, shape_for_rows, DEFAULT_DAYS
+from etl.api_client import APIClient
+from etl.data_transformer import DataTransformer
+from etl.fetch_engine import ENDPOINTS, ENDPOINT_TABLES
+from etl.load_data import DataLoader
+from etl.page_decoder import DECODERS, DEFAULT_DECODER
+from etl.rollups import RollupStore, rollup_table, summary_table
+from storage_backend import get_storage_backend
+
+# Times the three ETL stages separately on synthetic datasets: APIClient
+# pages from a mock API running in a child process (so it does not share the
+# GIL with the client), DataTransformer on each page, DataLoader into the
+# configured store. Results (seconds, rows/s, peak traced memory per stage)
+# are written as JSON; --compare prints the change against an earlier run.
+
+DEFAULT_SIZES = "10k,1M,10M"
+DEFAULT_PAGE_SIZE = 10000
+DEFAULT_RESULTS_DIR = os.path.join("benchmarks", "results")
+STAGES = ("fetch", "transform", "load")
+SUFFIXES = {"k": 1_000, "m": 1_000_000}
+
+
+def parse_size(text):
+    text = text.strip().lower()
+    if text[-1:] in SUFFIXES:
+        return int(float(text[:-1]) * SUFFIXES[text[-1]])
+    return int(text)
+
+
+def _serve(endpoint, n_countries, n_days, seed, ready):
+    frame = generate(endpoint, n_countries, n_days, seed=seed)
+    server = MockAPIServer({endpoint: frame}, DEFAULT_HOST, 0)
+    ready.send(server.base_url)
+    server.serve_forever()
+
+
+class StageTimer:
+    # Accumulates wall time and the largest traced-memory growth of one stage
+    # over many calls.
+
+    def __init__(self, track_memory):
+        self.track_memory = track_memory
+        self.seconds = 0.0
+        self.peak_bytes = 0
+
+    def __call__(self, func, *args):
+        if self.track_memory:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        result = func(*args)
+        self.seconds += time.perf_counter() - started
+        if self.track_memory:
+            self.peak_bytes = max(self.peak_bytes, tracemalloc.get_traced_memory()[1] - baseline)
+        return result
+
+    def summary(self, rows):
+        return {
+            "seconds": round(self.seconds, 4),
+            "rows_per_second": round(rows / self.seconds) if self.seconds else None,
+            "peak_memory_mb": round(self.peak_bytes / 2 ** 20, 2) if self.track_memory else None,
+        }
+
+
+class BenchmarkRunner:
+    def __init__(self, endpoint="cases", page_size=DEFAULT_PAGE_SIZE, days=DEFAULT_DAYS, config_path=None,
+                 load_mode="ignore", track_memory=True, seed=0, decoder=DEFAULT_DECODER):
+        self.endpoint = endpoint
+        self.table_name = ENDPOINT_TABLES[endpoint]
+        self.page_size = page_size
+        self.days = days
+        self.config_path = config_path
+        self.load_mode = load_mode
+        self.track_memory = track_memory
+        self.seed = seed
+        self.decoder = decoder
+
+    def run(self, sizes):
+        results = []
+        for rows in sizes:
+            print(f" Benchmarking {rows:,} {self.endpoint} rows...")
+            results.append(self.run_size(rows))
+        return results
+
+    def run_size(self, rows):
+        n_countries, n_days = shape_for_rows(rows, self.days)
+        parent, child = multiprocessing.Pipe()
+        server = multiprocessing.Process(target=_serve, args=(self.endpoint, n_countries, n_days, self.seed, child),
+                                         daemon=True)
+        started = time.perf_counter()
+        server.start()
+        base_url = parent.recv()
+        generate_seconds = time.perf_counter() - started
+
+        scratch_dir = None
+        config_path = self.config_path
+        if config_path is None:
+            scratch_dir = tempfile.mkdtemp(prefix="healthcare-bench-")
+            config_path = self._scratch_config(scratch_dir)
+        try:
+            db_handler = get_storage_backend(config_path)
+            self._empty_table(db_handler)
+            counts = self._run_stages(base_url, db_handler, n_countries * n_days)
+        finally:
+            server.terminate()
+            server.join()
+            if scratch_dir:
+                shutil.rmtree(scratch_dir, ignore_errors=True)
+
+        return {
+            "rows": counts.pop("rows"), "countries": n_countries, "days": n_days,
+            "generate_seconds": round(generate_seconds, 4), "load_counts": counts.pop("load_counts"),
+            "stages": counts,
+        }
+
+    def _run_stages(self, base_url, db_handler, expected_rows):
+        api_client = APIClient(base_url, page_size=self.page_size, max_retries=1, decoder=self.decoder)
+        transformer = DataTransformer()
+        rollups = RollupStore(db_handler) if db_handler.dialect == "mysql" else None
+        loader = DataLoader(db_handler, mode=self.load_mode, chunk_size=self.page_size, rollups=rollups)
+        timers = {stage: StageTimer(self.track_memory) for stage in STAGES}
+
+        if self.track_memory:
+            tracemalloc.start()
+        rows = 0
+        try:
+            pages = api_client.fetch_pages(self.endpoint, page_size=self.page_size)
+            while True:
+                page = timers["fetch"](next, pages, None)
+                if page is None:
+                    break
+                frame = timers["transform"](transformer.transform, self.table_name, page)
+                if not timers["load"](loader.load, self.table_name, frame):
+                    raise RuntimeError(f"load into `{self.table_name}` failed: {loader.failures[-1][1]}")
+                rows += len(page)
+        finally:
+            if self.track_memory:
+                tracemalloc.stop()
+            api_client.close()
+
+        if rows != expected_rows:
+            print(f" ⚠️ Fetched {rows:,} rows, expected {expected_rows:,}.")
+        result = {stage: timer.summary(rows) for stage, timer in timers.items()}
+        result["rows"] = rows
+        result["load_counts"] = loader.totals.get(self.table_name, {})
+        return result
+
+    def _empty_table(self, db_handler):
+        if db_handler.dialect == "mysql":
+            for table_name in (self.table_name, rollup_table(self.table_name), summary_table(self.table_name)):
+                db_handler.execute(f"TRUNCATE TABLE {table_name}")
+        else:
+            db_handler.drop_table(self.table_name)
+
+    @staticmethod
+    def _scratch_config(directory):
+        path = os.path.join(directory, "config.ini")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("[storage]\nbackend = duckdb\n\n[duckdb]\n"
+                    f"database = {os.path.join(directory, 'bench.duckdb')}\n"
+                    f"data_dir = {os.path.join(directory, 'parquet')}\n")
+        return path
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"git_commit": commit, "python": platform.python_version(), "platform": platform.platform(),
+            "cpus": os.cpu_count()}
+
+
+def print_results(results):
+    rows = []
+    for result in results:
+        for stage in STAGES:
+            stats = result["stages"][stage]
+            rows.append([f"{result['rows']:,}", stage, f"{stats['seconds']:.2f}",
+                         f"{stats['rows_per_second']:,}" if stats["rows_per_second"] else "-",
+                         stats["peak_memory_mb"] if stats["peak_memory_mb"] is not None else "-"])
+    print(tabulate(rows, headers=["Rows", "Stage", "Seconds", "Rows/s", "Peak MB"], tablefmt="grid"))
+
+
+def print_comparison(previous, results):
+    baseline = {result["rows"]: result["stages"] for result in previous["results"]}
+    rows = []
+    for result in results:
+        old = baseline.get(result["rows"])
+        if not old:
+            continue
+        for stage in STAGES:
+            before, after = old[stage]["rows_per_second"], result["stages"][stage]["rows_per_second"]
+            change = f"{(after / before - 1) * 100:+.1f}%" if before and after else "-"
+            rows.append([f"{result['rows']:,}", stage, before, after, change])
+    if rows:
+        print(f" Compared with {previous.get('label')} ({previous['environment'].get('git_commit')}):")
+        print(tabulate(rows, headers=["Rows", "Stage", "Before rows/s", "After rows/s", "Change"], tablefmt="grid"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the fetch, transform and load stages.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated row counts, e.g. 10k,1M,10M")
+    parser.add_argument("--endpoint", choices=ENDPOINTS, default="cases")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE, help="API page and load batch size")
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS, help="Days per synthetic country")
+    parser.add_argument("--config", default=None,
+                        help="config.ini of the store to load into; its table is emptied before each size, so "
+                             "point it at a scratch database (default: a temporary DuckDB store)")
+    parser.add_argument("--load-mode", choices=("ignore", "upsert"), default="ignore")
+    parser.add_argument("--decoder", choices=DECODERS, default=DEFAULT_DECODER, help="JSON decoder for API pages")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="Skip tracemalloc; timings are closer to production without it")
+    parser.add_argument("--label", default=None, help="Name of this run (default: timestamp)")
+    parser.add_argument("--output-dir", default=DEFAULT_RESULTS_DIR)
+    parser.add_argument("--compare", default=None, help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    started_at = datetime.now()
+    label = args.label or started_at.strftime("%Y%m%d_%H%M%S")
+    runner = BenchmarkRunner(args.endpoint, args.page_size, args.days, args.config, args.load_mode,
+                             track_memory=not args.no_memory, decoder=args.decoder)
+    results = runner.run([parse_size(size) for size in args.sizes.split(",") if size.strip()])
+    print_results(results)
+
+    report = {
+        "label": label, "started_at": started_at.isoformat(timespec="seconds"),
+        "endpoint": args.endpoint, "page_size": args.page_size, "load_mode": args.load_mode,
+        "decoder": args.decoder,
+        "backend": get_storage_backend(args.config).dialect if args.config else "duckdb",
+        "environment": environment(), "results": results,
+    }
+    os.makedirs(args.output_dir, exist_ok=True)
+    path = os.path.join(args.output_dir, f"{label}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Results written to {path}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            print_comparison(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
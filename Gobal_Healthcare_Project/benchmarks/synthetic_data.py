@@ -0,0 +1,73 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from etl.fetch_engine import ENDPOINT_TABLES
+from etl.schema import SCHEMAS
+
+# Synthetic API payloads: N countries x M consecutive days of cases or
+# vaccinations with plausible shapes (seasonal daily counts, cumulative
+# totals), generated with whole-array numpy operations so 10M-row datasets
+# take seconds. Rows come out sorted by country and date, like the API.
+
+DEFAULT_START_DATE = "2020-01-01"
+DEFAULT_DAYS = 1000
+
+
+def shape_for_rows(rows, days=DEFAULT_DAYS):
+    # Number of countries and days giving at least `rows` rows.
+    days = min(days, rows)
+    return math.ceil(rows / days), days
+
+
+def country_names(n_countries):
+    return [f"Country {i:05d}" for i in range(n_countries)]
+
+
+def generate(endpoint, n_countries, n_days, start_date=DEFAULT_START_DATE, missing_rate=0.01, seed=0):
+    rng = np.random.default_rng(seed)
+    scale = rng.lognormal(mean=6, sigma=1.5, size=(n_countries, 1))
+    phase = rng.uniform(0, 2 * np.pi, size=(n_countries, 1))
+    season = 1 + 0.8 * np.sin(np.arange(n_days) / 58 + phase)
+
+    if endpoint == "cases":
+        new_cases = rng.poisson(scale * season)
+        new_deaths = rng.binomial(new_cases, 0.015)
+        values = {
+            "total_cases": new_cases.cumsum(axis=1),
+            "new_cases": new_cases,
+            "total_deaths": new_deaths.cumsum(axis=1),
+            "new_deaths": new_deaths,
+        }
+    elif endpoint == "vaccinations":
+        doses = rng.poisson(scale * 20 * season)
+        total = doses.cumsum(axis=1)
+        values = {
+            "total_vaccinations": total,
+            "people_vaccinated": (total * 0.55).astype(np.int64),
+            "people_fully_vaccinated": (total * 0.42).astype(np.int64),
+        }
+    else:
+        raise ValueError(f"Unknown endpoint '{endpoint}'; choose from: {', '.join(ENDPOINT_TABLES)}.")
+
+    dates = pd.date_range(start_date, periods=n_days, freq="D")
+    frame = pd.DataFrame({
+        "report_date": np.tile(dates.values, n_countries),
+        "country_name": pd.Categorical.from_codes(np.repeat(np.arange(n_countries), n_days),
+                                                  country_names(n_countries)),
+    })
+    required = SCHEMAS[ENDPOINT_TABLES[endpoint]].required
+    for column, data in values.items():
+        series = pd.Series(data.reshape(-1), dtype="Int64")
+        if missing_rate and column not in required:
+            # Real feeds have gaps in the optional columns.
+            series[rng.random(len(series)) < missing_rate] = pd.NA
+        frame[column] = series
+    frame["etl_timestamp"] = pd.Timestamp.now().floor("s")
+    return frame
+
+
+def generate_rows(endpoint, rows, days=DEFAULT_DAYS, **kwargs):
+    n_countries, n_days = shape_for_rows(rows, days)
+    return generate(endpoint, n_countries, n_days, **kwargs).head(rows)
@@ -1,38 +1,117 @@
 import argparse
-import logging
+import math
 import os
-import pandas as pd
-from datetime import datetime
-from etl.data_transformer import DataTransformer
-from etl.load_data import DataLoader
-from tabulate import tabulate
+import signal
+import threading
+import time
+from datetime import datetime, timedelta
+from etl.fetch_engine import FetchEngine, DEFAULT_MAX_WORKERS, ENDPOINTS, ENDPOINT_TABLES, concat_pages
+from etl.load_data import DataLoader, LOAD_MODES
+from etl.pipeline import StreamingPipeline, DEFAULT_BATCH_SIZE
+from etl.file_source import FILE_FORMATS, DEFAULT_FILE_CHUNK_SIZE
+from etl.scheduler import ETLScheduler, SUCCESS, FAILED
+from etl.bulk_loader import DEFAULT_CHUNK_SIZE
+from etl.rollups import RollupStore, PERIODS, ROLLUP_STATE_TABLE, rollup_table, summary_table
+from etl.schema import SCHEMAS
+from etl import run_metrics
+from etl.run_metrics import RunStore
+from query_builder import QueryError
+import derived_metrics
+from report_generator import ReportGenerator, REPORT_FORMATS, DEFAULT_REPORT_DIR, DEFAULT_REPORT_WORKERS
+from utils.logger import get_logger
+
+# Only modules that are cheap to import are imported above. pandas,
+# tabulate, requests and the database drivers are imported by the commands
+# that use them, and the API client and storage backend are built on first
+# use, so --help and commands that never touch them start fast (see
+# test_startup.py).
+
+logger = get_logger("CLIManager")
 
 
 class CLIManager:
-    def __init__(self, api_client, db_handler):
-        self.api_client = api_client
-        self.db_handler = db_handler
-
-        # Setup logging
-        logging.basicConfig(
-            filename='etl.log',
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s'
-        )
-        logging.info("CLIManager initialized")
+    def __init__(self, api_client_factory, db_handler_factory, metrics_file=None, query_service_url=None):
+        self._api_client_factory = api_client_factory
+        self._db_handler_factory = db_handler_factory
+        self._api_client = None
+        self._db_handler = None
+        self.metrics_file = metrics_file
+        # Queries go through the query service when one is configured.
+        self.query_service_url = query_service_url
+
+        logger.info("CLIManager initialized")
 
         # Setup CLI
         self.parser = argparse.ArgumentParser(description="Global Healthcare Data ETL & Analysis CLI")
         self._setup_parser()
 
+    @property
+    def api_client(self):
+        if self._api_client is None:
+            self._api_client = self._api_client_factory()
+        return self._api_client
+
+    @property
+    def db_handler(self):
+        if self._db_handler is None:
+            self._db_handler = self._db_handler_factory()
+        return self._db_handler
+
     def _setup_parser(self):
         subparsers = self.parser.add_subparsers(dest='command', help='Available commands')
 
         # Fetch and Load
         fetch_parser = subparsers.add_parser('fetch_data', help='Fetch, transform, and load healthcare data.')
-        fetch_parser.add_argument('country', type=str, help='Country to fetch data for (e.g., "India")')
+        fetch_parser.add_argument('country', type=str, help='Country or comma-separated countries (e.g., "India,Brazil")')
         fetch_parser.add_argument('start_date', type=str, help='Start date (YYYY-MM-DD)')
         fetch_parser.add_argument('end_date', type=str, help='End date (YYYY-MM-DD)')
+        fetch_parser.add_argument('--workers', type=int, default=DEFAULT_MAX_WORKERS,
+                                  help='Number of concurrent fetch requests per dataset chain')
+        fetch_parser.add_argument('--chain-workers', type=int, default=DEFAULT_MAX_WORKERS,
+                                  help='Number of dataset/country ETL chains run in parallel')
+        fetch_parser.add_argument('--shard-days', type=int, default=None,
+                                  help='Split the date range into shards of N days fetched in parallel')
+        fetch_parser.add_argument('--full-refresh', action='store_true',
+                                  help='Ignore stored watermarks and re-process the whole date range')
+        fetch_parser.add_argument('--load-mode', choices=LOAD_MODES, default='ignore',
+                                  help='ignore: keep existing rows; upsert: update rows whose values changed')
+        fetch_parser.add_argument('--lookback-days', type=int, default=0,
+                                  help='Re-fetch N days before the watermark to pick up late corrections')
+        fetch_parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                                  help='Rows per load transaction')
+        fetch_parser.add_argument('--load-data-infile', action='store_true',
+                                  help='Bulk load chunks with LOAD DATA LOCAL INFILE via a staging table')
+        fetch_parser.add_argument('--stream', action='store_true',
+                                  help='Stream fixed-size batches through fetch, transform and load with bounded memory')
+        fetch_parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                                  help='Records per batch in --stream mode')
+        fetch_parser.add_argument('--offline', action='store_true',
+                                  help='Serve API responses from the local cache only')
+        fetch_parser.add_argument('--datasets', type=str, default=None,
+                                  help=f'Comma-separated datasets to fetch ({", ".join(ENDPOINTS)}; default: all)')
+
+        # Local dumps
+        ingest_parser = subparsers.add_parser('ingest_file',
+                                              help='Load a local CSV, NDJSON or JSON-array dump (optionally .gz).')
+        ingest_parser.add_argument('path', type=str, help='File to load, e.g. owid-covid-data.csv.gz')
+        ingest_parser.add_argument('--format', choices=FILE_FORMATS, default=None,
+                                   help='File format (default: from the extension)')
+        ingest_parser.add_argument('--tables', type=str, default=None,
+                                   help='Comma-separated tables to load (default: every table the file has columns for)')
+        ingest_parser.add_argument('--map', dest='column_map', action='append', default=[], metavar='SOURCE=COLUMN',
+                                   help='Map a source column onto a schema column (repeatable; OWID names are built in)')
+        ingest_parser.add_argument('--countries', type=str, default=None,
+                                   help='Comma-separated countries to load (default: all)')
+        ingest_parser.add_argument('--keep-aggregates', action='store_true',
+                                   help='Also load OWID continent/income-group rows (iso_code OWID_*)')
+        ingest_parser.add_argument('--batch-size', type=int, default=DEFAULT_FILE_CHUNK_SIZE,
+                                   help='Rows parsed and transformed per chunk')
+        ingest_parser.add_argument('--load-mode', choices=LOAD_MODES, default='ignore',
+                                   help='ignore: keep existing rows; upsert: update rows whose values changed')
+        ingest_parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                                   help='Rows per load transaction')
+        ingest_parser.add_argument('--load-data-infile', action='store_true',
+                                   help='Bulk load chunks with LOAD DATA LOCAL INFILE via a staging table')
 
         # Queries
         query_parser = subparsers.add_parser('query_data', help='Query loaded data.')
@@ -45,14 +124,67 @@ class CLIManager:
         daily_trends_parser.add_argument('country', type=str)
         daily_trends_parser.add_argument('metric', type=str)
         daily_trends_parser.add_argument('--export', action='store_true', help='Export results to CSV')
+        daily_trends_parser.add_argument('--limit', type=int, default=10, help='Number of days to show')
 
         top_n_parser = query_subparsers.add_parser('top_n_countries_by_metric', help='Top N countries by a metric.')
         top_n_parser.add_argument('n', type=int)
         top_n_parser.add_argument('metric', type=str)
 
+        rollup_parser = query_subparsers.add_parser('period_rollup', help='Weekly or monthly rollup of a metric.')
+        rollup_parser.add_argument('country', type=str)
+        rollup_parser.add_argument('metric', type=str)
+        rollup_parser.add_argument('--period', choices=PERIODS, default='month')
+        rollup_parser.add_argument('--table', choices=list(SCHEMAS), help='Defaults to the table holding the metric')
+        rollup_parser.add_argument('--limit', type=int, default=12, help='Most recent periods to show')
+
+        derived_parser = query_subparsers.add_parser('derived',
+                                                     help='Rolling means, growth rates, CFR or coverage per 100 people.')
+        derived_parser.add_argument('country', type=str)
+        derived_parser.add_argument('metric', choices=list(derived_metrics.DERIVED_METRICS))
+        derived_parser.add_argument('--days', type=int, default=14, help='Most recent days to show')
+        derived_parser.add_argument('--export', action='store_true', help='Export results to CSV')
+
+        # Report packs
+        reports_parser = subparsers.add_parser('generate_reports',
+                                               help='Write per-country, per-metric reports for many countries at once.')
+        reports_parser.add_argument('--countries', type=str, default=None,
+                                    help='Comma-separated countries (default: every country in the database)')
+        reports_parser.add_argument('--metrics', type=str, default=None,
+                                    help='Comma-separated metrics from either table (default: all)')
+        reports_parser.add_argument('--start-date', type=str, default=None, help='First report date (YYYY-MM-DD)')
+        reports_parser.add_argument('--end-date', type=str, default=None, help='Last report date (YYYY-MM-DD)')
+        reports_parser.add_argument('--format', choices=list(REPORT_FORMATS), default='csv')
+        reports_parser.add_argument('--output-dir', type=str, default=DEFAULT_REPORT_DIR)
+        reports_parser.add_argument('--workers', type=int, default=DEFAULT_REPORT_WORKERS,
+                                    help='Worker processes rendering reports')
+        reports_parser.add_argument('--force', action='store_true',
+                                    help='Rewrite reports even if their source data is unchanged')
+
         # Admin
         subparsers.add_parser('list_tables', help='List tables in the database.')
         subparsers.add_parser('drop_tables', help='Drop all tables (Use with caution).')
+        subparsers.add_parser('rebuild_rollups', help='Recompute rollup and summary tables from the fact tables.')
+
+        # Run metrics
+        stats_parser = subparsers.add_parser('run_stats', help='Recent ETL runs with stage timings and percentiles.')
+        stats_parser.add_argument('--limit', type=int, default=20, help='Most recent runs to show')
+        stats_parser.add_argument('--command', dest='run_command', type=str, default=None,
+                                  help='Only runs of this command (e.g. fetch_data)')
+        stats_parser.add_argument('--prometheus', action='store_true',
+                                  help='Print the latest runs in Prometheus text format instead')
+
+        # Daemon
+        serve_parser = subparsers.add_parser('serve',
+                                             help='Run the [job:*] fetch_data jobs in config.ini on their schedules.')
+        serve_parser.add_argument('--host', type=str, default=None, help='Control endpoint host (default: [serve] host)')
+        serve_parser.add_argument('--port', type=int, default=None, help='Control endpoint port (default: [serve] port)')
+        serve_parser.add_argument('--run-now', action='store_true', help='Queue every job once at start-up')
+
+        # Query service
+        queries_parser = subparsers.add_parser('serve_queries',
+                                               help='Serve the analytics queries over HTTP/JSON with a shared cache.')
+        queries_parser.add_argument('--host', type=str, default=None, help='Default: [query_service] host')
+        queries_parser.add_argument('--port', type=int, default=None, help='Default: [query_service] port')
 
         # Raw SQL
         sql_parser = subparsers.add_parser('run_sql', help='Run a raw SQL command.')
@@ -64,100 +196,453 @@ class CLIManager:
 
         if command == 'fetch_data':
             self._handle_fetch(args)
+        elif command == 'ingest_file':
+            self._recorded_run("ingest_file", self._ingest_file, args)
         elif command == 'query_data':
             self._handle_query(args)
+        elif command == 'generate_reports':
+            self._generate_reports(args)
         elif command == 'list_tables':
             self._list_tables()
         elif command == 'drop_tables':
             self._drop_tables()
+        elif command == 'rebuild_rollups':
+            self._rebuild_rollups()
+        elif command == 'run_stats':
+            self._run_stats(args)
+        elif command == 'serve':
+            self._serve(args)
+        elif command == 'serve_queries':
+            self._serve_queries(args)
         elif command == 'run_sql':
             self._run_sql(args)
         else:
             self.parser.print_help()
 
-    def _handle_fetch(self, args):
-        logging.info(f"Fetching data for {args.country} from {args.start_date} to {args.end_date}")
+    def _handle_fetch(self, args, command="fetch_data"):
+        return self._recorded_run(command, self._fetch, args)
+
+    def _recorded_run(self, command, work, args):
+        run_metrics.start_run(command)
+        status = run_metrics.FAILED
+        try:
+            status = work(args)
+        finally:
+            self._record_run(run_metrics.end_run(status))
+        return status
+
+    def _fetch(self, args):
+        logger.info(f"Fetching data for {args.country} from {args.start_date} to {args.end_date}")
         print(f" Fetching data for {args.country}...")
 
         try:
-            raw_cases = self.api_client.fetch_cases()
-            raw_vacc = self.api_client.fetch_vaccinations()
+            if args.offline:
+                if self.api_client.cache is None:
+                    print("❌ --offline needs the response cache; set enabled = true under [cache] in config.ini.")
+                    return run_metrics.FAILED
+                print(" Offline mode: serving API responses from the local cache only.")
+            # Reset on every run: the client outlives a single run in serve mode.
+            self.api_client.offline = args.offline
+
+            countries = [c.strip() for c in args.country.split(",") if c.strip()]
+            endpoints = [e.strip() for e in (args.datasets or ",".join(ENDPOINTS)).split(",") if e.strip()]
+            unknown = [e for e in endpoints if e not in ENDPOINTS]
+            if unknown:
+                print(f"❌ Unknown dataset(s): {', '.join(unknown)}. Choose from {', '.join(ENDPOINTS)}.")
+                return run_metrics.FAILED
+            from etl.data_transformer import DataTransformer
+            from etl.validation import QuarantineStore
+            from etl.watermark import WatermarkStore
 
-            transformer = DataTransformer()
-            transformed_cases = transformer.transform_cases(raw_cases)
-            transformed_vacc = transformer.transform_vaccinations(raw_vacc)
+            watermarks = WatermarkStore(self.db_handler)
+            transformer = DataTransformer(quarantine=QuarantineStore(self.db_handler))
+            loader = DataLoader(self.db_handler, watermarks, mode=args.load_mode,
+                                chunk_size=args.chunk_size, use_load_data=args.load_data_infile,
+                                rollups=self._rollup_store())
 
-            loader = DataLoader(self.db_handler)
-            loader.load_cases(transformed_cases)
-            loader.load_vaccinations(transformed_vacc)
+            marks = {}
+            if args.full_refresh:
+                print(" Full refresh requested; ignoring stored watermarks.")
+            else:
+                marks = {
+                    (endpoint, country): watermarks.get(ENDPOINT_TABLES[endpoint], country)
+                    for endpoint in endpoints for country in countries
+                }
+                marks = {
+                    key: mark - timedelta(days=args.lookback_days)
+                    for key, mark in marks.items() if mark is not None
+                }
+            start_overrides = {
+                key: max(args.start_date, (mark + timedelta(days=1)).isoformat())
+                for key, mark in marks.items()
+            }
+
+            scheduler = ETLScheduler(max_workers=args.chain_workers)
+            chains = {}
+            for endpoint in endpoints:
+                for country in countries:
+                    start_date = start_overrides.get((endpoint, country), args.start_date)
+                    if start_date > args.end_date:
+                        logger.info(f"{endpoint} for {country} is up to date; skipping.")
+                        continue
+                    stages = self._chain_stages(args, endpoint, country, start_date, transformer, loader,
+                                                since=marks.get((endpoint, country)))
+                    chain_name = f"{ENDPOINT_TABLES[endpoint]}[{country}]"
+                    chains[chain_name] = (ENDPOINT_TABLES[endpoint], country)
+                    scheduler.add_chain(chain_name, stages)
+
+            results = scheduler.run()
+            self._print_stage_timings(results)
+            failures = []
+            for result in results:
+                if result.status == FAILED:
+                    failures.append(f"{result.name} failed: {result.error}")
+                if result.status != SUCCESS:
+                    loader.mark_failed(*chains[result.name.rsplit(".", 1)[0]])
+            loader.commit_watermarks()
 
+            for table_name, counts in loader.totals.items():
+                print(f" {table_name}: {counts['loaded']} loaded, {counts['updated']} updated, "
+                      f"{counts['unchanged']} unchanged.")
+            self._print_rule_counts(transformer.rule_counts)
+            if loader.failures or failures:
+                for table_name, error in loader.failures:
+                    print(f"❌ Load into `{table_name}` failed: {error}")
+                for error in failures:
+                    print(f"❌ {error}")
+                print(" ⚠️ Some batches failed; re-run to resume from the last committed chunk.")
+                logger.warning(
+                    f"Data fetch & load finished with {len(loader.failures) + len(failures)} failure(s).")
+                return run_metrics.PARTIAL
             print(" ✅ Data fetched and loaded successfully.")
-            logging.info("Data fetch & load complete.")
+            logger.info("Data fetch & load complete.")
+            return run_metrics.SUCCESS
         except Exception as e:
-            logging.error(f"Failed during fetch/load: {e}")
+            logger.error(f"Failed during fetch/load: {e}")
             print(f"❌ Error during fetch/load: {e}")
+            return run_metrics.FAILED
+
+    def _ingest_file(self, args):
+        from etl.data_transformer import DataTransformer
+        from etl.file_source import FileSource
+        from etl.validation import QuarantineStore
+        from etl.watermark import WatermarkStore
+
+        try:
+            column_map = dict(self._parse_mapping(item) for item in args.column_map)
+            tables = [t.strip() for t in args.tables.split(",") if t.strip()] if args.tables else None
+            unknown = [t for t in tables or [] if t not in SCHEMAS]
+            if unknown:
+                raise ValueError(f"Unknown table(s): {', '.join(unknown)}. Choose from {', '.join(SCHEMAS)}.")
+            countries = [c.strip() for c in args.countries.split(",") if c.strip()] if args.countries else None
+            source = FileSource(args.path, file_format=args.format, column_map=column_map,
+                                chunk_size=args.batch_size, countries=countries,
+                                keep_aggregates=args.keep_aggregates)
+            if not os.path.isfile(args.path):
+                raise ValueError(f"No such file: {args.path}")
+        except ValueError as e:
+            print(f"❌ {e}")
+            return run_metrics.FAILED
+
+        print(f" Ingesting {args.path} ({source.file_format}) in {args.batch_size:,}-row chunks...")
+        try:
+            transformer = DataTransformer(quarantine=QuarantineStore(self.db_handler))
+            loader = DataLoader(self.db_handler, WatermarkStore(self.db_handler), mode=args.load_mode,
+                                chunk_size=args.chunk_size, use_load_data=args.load_data_infile,
+                                rollups=self._rollup_store())
+            pipeline = StreamingPipeline(None, transformer, loader, batch_size=args.batch_size)
+            started = time.perf_counter()
+            loaded = pipeline.run_batches(source.batches(tables), description=os.path.basename(args.path))
+            elapsed = max(time.perf_counter() - started, 1e-9)
+            # Watermarks only move after a complete file, so later API
+            # fetches resume after the backfilled history.
+            loader.commit_watermarks()
+        except Exception as e:
+            logger.error(f"Failed to ingest {args.path}: {e}")
+            print(f"❌ Error ingesting {args.path}: {e}")
+            return run_metrics.FAILED
+
+        rows = [[table_name, counts['loaded'], counts['updated'], counts['unchanged']]
+                for table_name, counts in loader.totals.items()]
+        if rows:
+            print(tabulate(rows, headers=["Table", "Loaded", "Updated", "Unchanged"], tablefmt="grid"))
+        self._print_rule_counts(transformer.rule_counts)
+        print(f" ✅ {source.rows_read:,} rows read ({source.bytes_read / 2 ** 20:.1f} MB, "
+              f"{source.rows_skipped:,} filtered out), {loaded:,} table rows processed in {elapsed:.2f}s: "
+              f"{source.rows_read / elapsed:,.0f} rows/s.")
+        return run_metrics.SUCCESS
+
+    @staticmethod
+    def _parse_mapping(item):
+        source, sep, column = item.partition("=")
+        if not sep or not source.strip() or not column.strip():
+            raise ValueError(f"--map expects SOURCE=COLUMN, got '{item}'.")
+        return source.strip(), column.strip()
+
+    def _record_run(self, run):
+        # Run metrics are best effort: a failure to store them never fails
+        # the ETL run itself.
+        print(f" ⏱ {run.summary()}")
+        try:
+            store = RunStore(self.db_handler)
+            store.save(run)
+            if self.metrics_file:
+                run_metrics.write_prometheus_file(store, self.metrics_file)
+        except Exception as e:
+            logger.error(f"Could not record run metrics: {e}")
+            print(f" ⚠️ Could not record run metrics: {e}")
+        if self.query_service_url:
+            # The service also notices the new run within its version
+            # interval; this just makes the new data visible at once.
+            try:
+                from query_service import QueryClient
+                QueryClient(self.query_service_url, timeout=5).invalidate()
+            except Exception as e:
+                logger.warning(f"Could not invalidate the query service cache: {e}")
+
+    def _chain_stages(self, args, endpoint, country, start_date, transformer, loader, since=None):
+        # One extract -> transform -> load chain per dataset and country. A new
+        # dataset only needs a schema in etl/schema.py to get its own chains.
+        table_name = ENDPOINT_TABLES[endpoint]
+
+        if args.stream:
+            pipeline = StreamingPipeline(self.api_client, transformer, loader, batch_size=args.batch_size)
+            return [("stream", lambda: pipeline.run(table_name, endpoint, country, start_date, args.end_date, since))]
+
+        def extract():
+            engine = FetchEngine(self.api_client, max_workers=args.workers)
+            fetched = engine.fetch([country], start_date, args.end_date, endpoints=(endpoint,),
+                                   shard_days=args.shard_days)
+            return concat_pages([records for _, _, records in fetched], table_name)
+
+        def transform(records):
+            return transformer.transform(table_name, records, since)
+
+        def load(frame):
+            if not loader.load(table_name, frame):
+                raise RuntimeError(f"load into `{table_name}` failed")
+            return len(frame)
+
+        return [("extract", extract), ("transform", transform), ("load", load)]
+
+    def _print_rule_counts(self, rule_counts):
+        from etl.validation import RULES
+        descriptions = {rule.name: rule.description for rules in RULES.values() for rule in rules}
+        rows = [[table_name, rule, descriptions.get(rule, ""), total]
+                for table_name, counts in rule_counts.items() for rule, total in sorted(counts.items())]
+        if rows:
+            print(" ⚠️ Rows failing validation were written to quarantine_records:")
+            print(tabulate(rows, headers=["Table", "Rule", "Check", "Rows"], tablefmt="grid"))
+
+    def _print_stage_timings(self, results):
+        rows = []
+        for result in results:
+            chain, stage = result.name.rsplit(".", 1)
+            rows.append([chain, stage, result.status, f"{result.duration:.2f}"])
+        if rows:
+            print(tabulate(rows, headers=["Chain", "Stage", "Status", "Seconds"], tablefmt="grid"))
 
     def _handle_query(self, args):
+        from query_service import Analytics, QueryClient
         try:
-            if args.query_type == 'total_cases':
-                sql = f"""
-                    SELECT country_name, SUM(total_cases) as total_cases
-                    FROM daily_cases 
-                    WHERE country_name = '{args.country}'
-                    GROUP BY country_name;
-                """
-                result = self.db_handler.run_query(sql)
-                if result:
-                    print(tabulate(result, headers=["Country", "Total Cases"], tablefmt="grid"))
-                else:
-                    print("No results found.")
-                logging.info(f"Total cases queried for {args.country}")
-
-            elif args.query_type == 'daily_trends':
-                sql = f"""
-                    SELECT report_date, {args.metric}
-                    FROM daily_cases
-                    WHERE country_name = '{args.country}'
-                    ORDER BY report_date
-                    LIMIT 10;
-                """
-                result = self.db_handler.run_query(sql)
-                if result:
-                    headers = ["Date", args.metric]
-                    print(tabulate(result, headers=headers, tablefmt="grid"))
-
-                    if getattr(args, 'export', False):
-                        df = pd.DataFrame(result, columns=headers)
-                        os.makedirs("reports", exist_ok=True)
-                        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                        filename = f"reports/{args.country}_{args.metric}_trends_{timestamp}.csv"
-                        df.to_csv(filename, index=False)
-                        print(f"✅ Report exported to: {filename}")
-                else:
-                    print("No trends found.")
-                logging.info(f"Daily trends for {args.metric} in {args.country} queried.")
-
-            elif args.query_type == 'top_n_countries_by_metric':
-                sql = f"""
-                    SELECT country_name, SUM({args.metric}) AS total
-                    FROM daily_cases
-                    GROUP BY country_name
-                    ORDER BY total DESC
-                    LIMIT {args.n};
-                """
-                result = self.db_handler.run_query(sql)
-                if result:
-                    print(tabulate(result, headers=["Country", f"Total {args.metric}"], tablefmt="grid"))
-                else:
-                    print("No countries found.")
-                logging.info(f"Top {args.n} countries by {args.metric} queried.")
+            if self.query_service_url:
+                import requests
+                try:
+                    self._run_query_command(QueryClient(self.query_service_url), args)
+                    return
+                except requests.ConnectionError as e:
+                    logger.info(f"Query service unavailable: {e}")
+                    print(f" ⚠️ Query service at {self.query_service_url} unavailable; querying the database.")
+            with self.db_handler.prepared_session() as session:
+                self._run_query_command(Analytics(self.db_handler, session), args)
+        except QueryError as e:
+            print(f"❌ {e}")
+        except Exception as e:
+            logger.error(f"Query failed: {e}")
+            print(f"❌ Error running query: {e}")
+
+    def _run_query_command(self, analytics, args):
+        if args.query_type == 'total_cases':
+            _, result = analytics.total_cases(args.country)
+            if result:
+                print(tabulate(result, headers=["Country", "Total Cases"], tablefmt="grid"))
+            else:
+                print("No results found.")
+            logger.info(f"Total cases queried for {args.country}")
+
+        elif args.query_type == 'daily_trends':
+            _, result = analytics.daily_trends(args.metric, args.country, args.limit)
+            if result:
+                headers = ["Date", args.metric]
+                print(tabulate(result, headers=headers, tablefmt="grid"))
+
+                if getattr(args, 'export', False):
+                    import pandas as pd
+                    df = pd.DataFrame(result, columns=headers)
+                    os.makedirs("reports", exist_ok=True)
+                    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                    filename = f"reports/{args.country}_{args.metric}_trends_{timestamp}.csv"
+                    df.to_csv(filename, index=False)
+                    print(f"✅ Report exported to: {filename}")
+            else:
+                print("No trends found.")
+            logger.info(f"Daily trends for {args.metric} in {args.country} queried.")
+
+        elif args.query_type == 'top_n_countries_by_metric':
+            _, result = analytics.top_countries(args.metric, args.n)
+            if result:
+                print(tabulate(result, headers=["Country", f"Total {args.metric}"], tablefmt="grid"))
+            else:
+                print("No countries found.")
+            logger.info(f"Top {args.n} countries by {args.metric} queried.")
 
+        elif args.query_type == 'period_rollup':
+            _, result = analytics.period_rollup(args.metric, args.country, args.period, args.limit, args.table)
+            if result:
+                headers = [args.period.title(), "Days", f"Sum {args.metric}", f"Max {args.metric}"]
+                print(tabulate(result[::-1], headers=headers, tablefmt="grid"))
             else:
-                print("Unknown query type.")
-                self.parser.print_help()
+                print(f"No data found for {args.country}.")
+            logger.info(f"{args.period.title()} rollup of {args.metric} for {args.country} queried.")
+
+        elif args.query_type == 'derived':
+            _, rows = analytics.derived(args.metric, [args.country], args.days)
+            if rows:
+                import pandas as pd
+                df = pd.DataFrame([row[1:] for row in rows], columns=["Date", args.metric])
+                table_rows = df.round(2).astype(object).where(df.notna(), None).values.tolist()
+                print(tabulate(table_rows, headers=["Date", args.metric], tablefmt="grid", missingval="-"))
+
+                if getattr(args, 'export', False):
+                    os.makedirs("reports", exist_ok=True)
+                    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                    filename = f"reports/{args.country}_{args.metric}_{timestamp}.csv"
+                    df.to_csv(filename, index=False)
+                    print(f"✅ Report exported to: {filename}")
+            else:
+                print("No data found.")
+            logger.info(f"Derived metric {args.metric} for {args.country} queried.")
+
+        else:
+            print("Unknown query type.")
+            self.parser.print_help()
+
+    def _generate_reports(self, args):
+        countries = [c.strip() for c in args.countries.split(",") if c.strip()] if args.countries else None
+        metrics = [m.strip() for m in args.metrics.split(",") if m.strip()] if args.metrics else None
+        print(f" Generating {args.format} reports into {args.output_dir}...")
+        try:
+            generator = ReportGenerator(self.db_handler, args.output_dir, args.format, args.workers)
+            result = generator.generate(countries, metrics, args.start_date, args.end_date, force=args.force)
+            print(f"✅ {result['written']} report(s) written, {result['skipped']} unchanged "
+                  f"in {result['seconds']:.2f}s. Manifest: {generator.manifest_path}")
+        except QueryError as e:
+            print(f"❌ {e}")
         except Exception as e:
-            logging.error(f"Query failed: {e}")
-            print(f"❌ Error running query: {e}")
+            logger.error(f"Report generation failed: {e}")
+            print(f"❌ Error generating reports: {e}")
+
+    def _run_stats(self, args):
+        try:
+            store = RunStore(self.db_handler)
+            if args.prometheus:
+                print(run_metrics.prometheus_text(store), end="")
+                return
+            runs = store.recent(args.limit, args.run_command)
+            if runs.empty:
+                print("No runs recorded yet.")
+                return
+
+            rows = [[run.started_at, run.command, run.status, _seconds(run.duration_seconds),
+                     _seconds(run.fetch_seconds), _seconds(run.transform_seconds), _seconds(run.load_seconds),
+                     run.rows_fetched, run.rows_dropped, run.rows_skipped, run.rows_affected,
+                     f"{(run.bytes_fetched or 0) / 2 ** 20:.1f}", run.peak_rss_mb]
+                    for run in runs.itertuples(index=False)]
+            headers = ["Started", "Command", "Status", "Total s", "Fetch s", "Transform s", "Load s",
+                       "Rows fetched", "Dropped", "Skipped", "Affected", "MB fetched", "Peak RSS MB"]
+            print(tabulate(rows, headers=headers, tablefmt="grid"))
+
+            quantiles = run_metrics.percentiles(runs)
+            rows = [[name.replace("_seconds", "")] + [f"{value:.2f}" for value in values]
+                    for name, values in quantiles.iterrows()]
+            print(f" Percentiles over the last {len(runs)} run(s):")
+            print(tabulate(rows, headers=["Seconds", "p50", "p90", "p99"], tablefmt="grid"))
+        except Exception as e:
+            logger.error(f"run_stats failed: {e}")
+            print(f"❌ Error reading run metrics: {e}")
+
+    def _serve(self, args):
+        from etl.daemon import ETLDaemon, load_jobs
+
+        try:
+            jobs, settings = load_jobs()
+            for job in jobs:
+                self._job_args(job)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return
+        if not jobs:
+            print("❌ No jobs configured; add [job:<name>] sections to config.ini.")
+            return
+
+        daemon = ETLDaemon(jobs, lambda job: self._handle_fetch(self._job_args(job), command=f"serve:{job.name}"),
+                           host=args.host or settings["host"], port=args.port or settings["port"])
+        print(tabulate([[name, job.schedule.expression, ", ".join(job.countries), ", ".join(job.datasets),
+                         daemon.states[name].next_run.strftime("%Y-%m-%d %H:%M:%S")]
+                        for name, job in daemon.jobs.items()],
+                       headers=["Job", "Schedule", "Countries", "Datasets", "Next run"], tablefmt="grid"))
+        print(f" Control endpoint: http://{daemon.host}:{daemon.port}/status (Ctrl+C to stop).")
+        if args.run_now:
+            for name in daemon.jobs:
+                daemon.trigger(name, reason="start-up")
+
+        signal.signal(signal.SIGTERM, lambda signum, frame: daemon.stop())
+        try:
+            daemon.serve_forever()
+        except OSError as e:
+            print(f"❌ Could not start the control endpoint: {e}")
+            return
+        except KeyboardInterrupt:
+            daemon.stop()
+        finally:
+            if self._db_handler is not None:
+                self._db_handler.close()
+        print(" ✅ Daemon stopped.")
+
+    def _serve_queries(self, args):
+        from query_service import Analytics, QueryService, ENDPOINTS as QUERY_ENDPOINTS, load_settings
+
+        settings = load_settings()
+        service = QueryService(Analytics(self.db_handler), cache_entries=settings["cache_entries"],
+                               cache_ttl=settings["cache_ttl_seconds"], version_interval=settings["version_interval"])
+        host, port = args.host or settings["host"], args.port or settings["port"]
+        try:
+            server = service.make_server(host, port)
+        except OSError as e:
+            print(f"❌ Could not start the query service: {e}")
+            return
+
+        # serve_forever runs on this thread, so shutdown has to come from another.
+        signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+        print(f" Query service on http://{host}:{port}/ ({', '.join(QUERY_ENDPOINTS)}; Ctrl+C to stop).")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.db_handler.close()
+        stats = service.status()
+        print(f" ✅ Query service stopped: {stats['requests']} request(s), {stats['hits']} cache hit(s), "
+              f"{stats['coalesced']} coalesced, {stats['queries']} database queries.")
+
+    def _job_args(self, job):
+        # Jobs go through the fetch_data parser, so every fetch_data option
+        # can be set in the job's `options`.
+        try:
+            return self.parser.parse_args(job.fetch_argv())
+        except SystemExit:
+            raise ValueError(f"Job '{job.name}' has invalid fetch_data options: {' '.join(job.options)}") from None
 
     def _list_tables(self):
         try:
@@ -166,36 +651,72 @@ class CLIManager:
                 print(tabulate(tables, headers=["Tables"], tablefmt="grid"))
             else:
                 print("No tables found.")
-            logging.info("Listed tables.")
+            logger.info("Listed tables.")
         except Exception as e:
-            logging.error(f"Error listing tables: {e}")
+            logger.error(f"Error listing tables: {e}")
             print(f"❌ Error listing tables: {e}")
 
     def _drop_tables(self):
         print("Dropping all tables...")
         try:
-            drop_queries = [
-                "DROP TABLE IF EXISTS daily_cases;",
-                "DROP TABLE IF EXISTS vaccination_data;"
-            ]
-            for query in drop_queries:
-                self.db_handler.run_query(query)
+            # Load state goes with the data: kept watermarks would make the
+            # next fetch_data skip every country, and kept checkpoints would
+            # resume batches into tables that no longer hold their chunks.
+            # Quarantined rows and run history describe the dropped data too;
+            # without etl_runs the query service's data version changes, so
+            # it stops serving results cached from the old data.
+            tables = ["daily_cases", "vaccination_data"] + [
+                name
+                for table_name in SCHEMAS
+                for name in (rollup_table(table_name), summary_table(table_name))
+            ] + [ROLLUP_STATE_TABLE, "etl_watermarks", "etl_load_checkpoints", "quarantine_records", "etl_runs"]
+            for table_name in tables:
+                self.db_handler.drop_table(table_name)
             print("✅ All tables dropped.")
-            logging.info("All tables dropped.")
+            logger.info("All tables dropped.")
         except Exception as e:
-            logging.error(f"Failed to drop tables: {e}")
+            logger.error(f"Failed to drop tables: {e}")
             print(f"❌ Error dropping tables: {e}")
 
+    def _rollup_store(self):
+        # Rollup tables only pay off on MySQL; the columnar backend aggregates
+        # the fact data directly.
+        if self.db_handler.dialect != "mysql":
+            return None
+        return RollupStore(self.db_handler)
+
+    def _rebuild_rollups(self):
+        rollups = self._rollup_store()
+        if rollups is None:
+            print(f"Rollup tables are not used with the {self.db_handler.dialect} backend.")
+            return
+        print("Rebuilding rollup tables...")
+        try:
+            for table_name in SCHEMAS:
+                countries = rollups.rebuild(table_name)
+                print(f"✅ {table_name}: rolled up {countries} countries.")
+        except Exception as e:
+            logger.error(f"Failed to rebuild rollups: {e}")
+            print(f"❌ Error rebuilding rollups: {e}")
+
     def _run_sql(self, args):
         print(f"🧾 Running SQL: {args.sql}")
         try:
-            results = self.db_handler.run_query(args.sql)
+            results, column_names = self.db_handler.run_query_with_columns(args.sql)
             if results:
-                column_names = [desc[0] for desc in self.db_handler.cursor.description]
                 print(tabulate(results, headers=column_names, tablefmt="grid"))
             else:
                 print("SQL executed. No results to display.")
-            logging.info(f"Executed SQL: {args.sql}")
+            logger.info(f"Executed SQL: {args.sql}")
         except Exception as e:
-            logging.error(f"Error running raw SQL: {e}")
+            logger.error(f"Error running raw SQL: {e}")
             print(f"❌ Error running SQL: {e}")
+
+
+def tabulate(*args, **kwargs):
+    from tabulate import tabulate as _tabulate
+    return _tabulate(*args, **kwargs)
+
+
+def _seconds(value):
+    return "-" if value is None or math.isnan(value) else f"{value:.2f}"
@@ -1,59 +1,303 @@
+import argparse
 import mysql.connector
-import configparser
 import os
-import logging
-
-# Configure logging
-logging.basicConfig(
-    filename='sql_execution.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
-
-def execute_sql_file(file_path):
-    # Load database config from config.ini
-    config = configparser.ConfigParser()
-    config.read("config.ini")
-    db_config = {
-        "host": config["mysql"]["host"],
-        "user": config["mysql"]["user"],
-        "password": config["mysql"]["password"],
-        "database": config["mysql"]["database"],
-        "port": int(config["mysql"].get("port", 3306))
-    }
-
-    logging.info(f"Starting execution of SQL file: {file_path}")
+import time
+from datetime import date
+from mysql_handler import get_db_handler
+from etl.bulk_loader import CREATE_CHECKPOINT_TABLE
+from etl.rollups import CREATE_ROLLUP_STATE, create_rollup_tables
+from etl.run_metrics import CREATE_RUNS_TABLE
+from etl.schema import SCHEMAS
+from etl.validation import CREATE_QUARANTINE_TABLE
+from etl.watermark import CREATE_WATERMARK_TABLE
+from utils.logger import get_logger
+
+logger = get_logger("Migrations")
+
+BASE_DIR = os.path.dirname(__file__)
+SQL_FILE_PATH = os.path.join(BASE_DIR, "sql", "create_tables.sql")
+
+FACT_TABLES = tuple(SCHEMAS)
+FIRST_PARTITION_YEAR = 2020
+MAX_PARTITION = "pmax"
+
+CREATE_MIGRATIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT NOT NULL PRIMARY KEY,
+        name VARCHAR(100) NOT NULL,
+        duration_ms INT NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+def execute_sql_file(db_handler, file_path):
+    logger.info(f"Starting execution of SQL file: {file_path}")
 
     # Read SQL file
-    try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            sql_script = f.read()
-        logging.info("SQL file read successfully.")
-    except FileNotFoundError:
-        logging.error(f"SQL file not found: {file_path}")
-        return
-
-    # Execute SQL statements
-    try:
-        conn = mysql.connector.connect(**db_config)
-        cursor = conn.cursor()
+    with open(file_path, "r", encoding="utf-8") as f:
+        sql_script = f.read()
+    logger.info("SQL file read successfully.")
+
+    # Execute SQL statements on a pooled connection from the shared DB layer
+    with db_handler.transaction() as cursor:
         for statement in sql_script.split(';'):
             if statement.strip():
                 cursor.execute(statement)
-                logging.info(f"Executed statement: {statement.strip()[:100]}...")
-        conn.commit()
-        logging.info("All statements executed and committed successfully.")
-        print("Tables created successfully.")
-    except mysql.connector.Error as err:
-        logging.error(f"MySQL Error: {err}")
-        print(f"MySQL Error: {err}")
-    finally:
-        if conn.is_connected():
-            cursor.close()
-            conn.close()
-            logging.info("Database connection closed.")
+                logger.info(f"Executed statement: {statement.strip()[:100]}...")
+    logger.info("All statements executed and committed successfully.")
+
+
+# --- Schema inspection (every migration step checks before it changes anything) ---
+
+def index_exists(db_handler, table_name, index_name):
+    rows = db_handler.run_query(
+        """
+        SELECT COUNT(*) FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        """,
+        (table_name, index_name)
+    )
+    return rows[0][0] > 0
+
+
+def column_exists(db_handler, table_name, column_name):
+    rows = db_handler.run_query(
+        """
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+        """,
+        (table_name, column_name)
+    )
+    return rows[0][0] > 0
+
+
+def table_exists(db_handler, table_name):
+    rows = db_handler.run_query(
+        "SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s",
+        (table_name,)
+    )
+    return rows[0][0] > 0
+
+
+def list_partitions(db_handler, table_name):
+    # [(partition_name, upper_bound_or_None_for_MAXVALUE), ...] in range order.
+    rows = db_handler.run_query(
+        """
+        SELECT partition_name, partition_description FROM information_schema.partitions
+        WHERE table_schema = DATABASE() AND table_name = %s AND partition_name IS NOT NULL
+        ORDER BY partition_ordinal_position
+        """,
+        (table_name,)
+    )
+    return [(name, None if bound == "MAXVALUE" else date.fromisoformat(bound.strip("'"))) for name, bound in rows]
+
+
+def year_partition(year):
+    return f"PARTITION p{year} VALUES LESS THAN ('{year + 1}-01-01')"
+
+
+# --- Migrations, applied in version order and recorded in schema_migrations ---
+
+def migrate_baseline(db_handler):
+    execute_sql_file(db_handler, SQL_FILE_PATH)
+
+
+def migrate_covering_indexes(db_handler):
+    # (report_date, country_name): date-range scans across all countries and
+    # "latest N days" windows. (country_name, report_date, metrics...): the
+    # dashboard's per-country "ORDER BY report_date DESC LIMIT n" and
+    # daily_trends read straight from the index without touching the rows.
+    for table_name in FACT_TABLES:
+        metrics = ", ".join(SCHEMAS[table_name].metric_columns)
+        indexes = {
+            f"idx_{table_name}_date_country": "report_date, country_name",
+            f"idx_{table_name}_country_date_metrics": f"country_name, report_date, {metrics}",
+        }
+        for index_name, columns in indexes.items():
+            if index_exists(db_handler, table_name, index_name):
+                continue
+            db_handler.execute(f"CREATE INDEX {index_name} ON {table_name} ({columns})")
+            print(f" Created index {index_name}.")
+
+
+def migrate_partition_by_report_date(db_handler):
+    # MySQL requires the partitioning column in every unique key, so the
+    # primary key becomes (id, report_date); UNIQUE (country_name, report_date)
+    # already qualifies. One partition per year, plus a MAXVALUE catch-all.
+    through_year = date.today().year + 1
+    for table_name in FACT_TABLES:
+        if list_partitions(db_handler, table_name):
+            continue
+        print(f" Partitioning {table_name} by report_date (this rebuilds the table)...")
+        db_handler.execute(f"ALTER TABLE {table_name} DROP PRIMARY KEY, ADD PRIMARY KEY (id, report_date)")
+        partitions = [year_partition(year) for year in range(FIRST_PARTITION_YEAR, through_year + 1)]
+        partitions.append(f"PARTITION {MAX_PARTITION} VALUES LESS THAN (MAXVALUE)")
+        db_handler.execute(
+            f"ALTER TABLE {table_name} PARTITION BY RANGE COLUMNS(report_date) ({', '.join(partitions)})"
+        )
+
+
+def migrate_row_hash_columns(db_handler):
+    # Content hash of each row, compared by the upsert load mode.
+    for table_name in FACT_TABLES:
+        if column_exists(db_handler, table_name, "row_hash"):
+            continue
+        db_handler.execute(f"ALTER TABLE {table_name} ADD COLUMN row_hash CHAR(32) NULL")
+        print(f" Added row_hash to {table_name}.")
+
+
+def migrate_etl_state_tables(db_handler):
+    # Watermarks, chunk checkpoints, run metrics and the quarantine. The
+    # loader also creates them on first use, so these are CREATE IF NOT EXISTS.
+    for statement in (CREATE_WATERMARK_TABLE["mysql"], CREATE_CHECKPOINT_TABLE,
+                      CREATE_RUNS_TABLE["mysql"], CREATE_QUARANTINE_TABLE["mysql"]):
+        db_handler.execute(statement)
+
+
+def migrate_rollup_tables(db_handler):
+    # Empty until the first load rebuilds them from the fact tables; readers
+    # aggregate the fact tables until then.
+    db_handler.execute(CREATE_ROLLUP_STATE)
+    for table_name in FACT_TABLES:
+        for statement in create_rollup_tables(table_name):
+            db_handler.execute(statement)
+
+
+def migrate_etl_runs_rows_skipped(db_handler):
+    # Rows under the watermark, counted apart from validation rejects.
+    if table_exists(db_handler, "etl_runs") and not column_exists(db_handler, "etl_runs", "rows_skipped"):
+        db_handler.execute("ALTER TABLE etl_runs ADD COLUMN rows_skipped BIGINT AFTER rows_dropped")
+
+
+MIGRATIONS = [
+    (1, "baseline_tables", migrate_baseline),
+    (2, "covering_indexes", migrate_covering_indexes),
+    (3, "partition_by_report_date", migrate_partition_by_report_date),
+    (4, "row_hash_columns", migrate_row_hash_columns),
+    (5, "etl_state_tables", migrate_etl_state_tables),
+    (6, "rollup_tables", migrate_rollup_tables),
+    (7, "etl_runs_rows_skipped", migrate_etl_runs_rows_skipped),
+]
+
+
+def applied_versions(db_handler):
+    db_handler.execute(CREATE_MIGRATIONS_TABLE)
+    return {row[0] for row in db_handler.run_query("SELECT version FROM schema_migrations")}
+
+
+def migrate(db_handler):
+    done = applied_versions(db_handler)
+    if done and not all(table_exists(db_handler, table_name) for table_name in FACT_TABLES):
+        # The fact tables were dropped after migrating (main.py drop_tables):
+        # every step is safe to re-run, so apply them all again.
+        print("Fact tables are missing; re-applying all migrations.")
+        db_handler.execute("DELETE FROM schema_migrations")
+        done = set()
+    pending = [migration for migration in MIGRATIONS if migration[0] not in done]
+    if not pending:
+        print("Schema is up to date.")
+    for version, name, step in pending:
+        # DDL commits implicitly in MySQL, so a step cannot be rolled back; each
+        # one inspects the schema first and is safe to re-run if interrupted.
+        print(f"Applying migration {version:03d}_{name}...")
+        started = time.perf_counter()
+        step(db_handler)
+        duration_ms = int((time.perf_counter() - started) * 1000)
+        db_handler.execute(
+            "INSERT INTO schema_migrations (version, name, duration_ms) VALUES (%s, %s, %s)",
+            (version, name, duration_ms)
+        )
+        logger.info(f"Applied migration {version:03d}_{name} in {duration_ms} ms.")
+        print(f"✅ {version:03d}_{name} applied in {duration_ms} ms.")
+    add_partitions(db_handler, date.today().year + 1)
+
+
+def show_status(db_handler):
+    done = applied_versions(db_handler)
+    for version, name, _ in MIGRATIONS:
+        print(f"{version:03d}_{name}: {'applied' if version in done else 'pending'}")
+    for table_name in FACT_TABLES:
+        partitions = list_partitions(db_handler, table_name)
+        names = ", ".join(name for name, _ in partitions) if partitions else "not partitioned"
+        print(f"{table_name}: {names}")
+
+
+# --- Partition maintenance ---
+
+def add_partitions(db_handler, through_year):
+    # Splits the MAXVALUE partition so every year up to through_year has its
+    # own range; run ahead of time so new data never lands in pmax.
+    for table_name in FACT_TABLES:
+        partitions = list_partitions(db_handler, table_name)
+        if not partitions or partitions[-1][0] != MAX_PARTITION:
+            continue
+        bounds = [bound for _, bound in partitions if bound is not None]
+        next_year = bounds[-1].year if bounds else FIRST_PARTITION_YEAR
+        if next_year > through_year:
+            continue
+        new_partitions = [year_partition(year) for year in range(next_year, through_year + 1)]
+        new_partitions.append(f"PARTITION {MAX_PARTITION} VALUES LESS THAN (MAXVALUE)")
+        db_handler.execute(
+            f"ALTER TABLE {table_name} REORGANIZE PARTITION {MAX_PARTITION} INTO ({', '.join(new_partitions)})"
+        )
+        logger.info(f"{table_name}: added partitions for {next_year}-{through_year}.")
+        print(f" {table_name}: added partitions for {next_year}-{through_year}.")
+
+
+def archive_partitions(db_handler, before, drop=False):
+    # Removes every partition that lies entirely before `before`. By default
+    # each one is swapped out into a plain <table>_archive_<partition> table
+    # (EXCHANGE PARTITION moves no rows); with drop=True the rows are deleted.
+    # Rollup and summary tables keep their aggregates either way.
+    for table_name in FACT_TABLES:
+        for partition, bound in list_partitions(db_handler, table_name):
+            if bound is None or bound > before:
+                continue
+            if not drop:
+                archive = f"{table_name}_archive_{partition}"
+                if table_exists(db_handler, archive):
+                    print(f"⚠️ {archive} already exists; skipping {table_name}.{partition}.")
+                    continue
+                db_handler.execute(f"CREATE TABLE {archive} LIKE {table_name}")
+                db_handler.execute(f"ALTER TABLE {archive} REMOVE PARTITIONING")
+                db_handler.execute(f"ALTER TABLE {table_name} EXCHANGE PARTITION {partition} WITH TABLE {archive}")
+                print(f" {table_name}.{partition} archived to {archive}.")
+            db_handler.execute(f"ALTER TABLE {table_name} DROP PARTITION {partition}")
+            logger.info(f"{table_name}: {'dropped' if drop else 'archived'} partition {partition} (< {bound}).")
+            if drop:
+                print(f" {table_name}.{partition} dropped.")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Create and migrate the healthcare database schema")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("migrate", help="Apply pending migrations (default)")
+    subparsers.add_parser("status", help="Show applied migrations and partitions")
+    add_parser = subparsers.add_parser("add_partitions", help="Create yearly partitions ahead of time")
+    add_parser.add_argument("through_year", type=int)
+    archive_parser = subparsers.add_parser("archive", help="Archive or drop partitions older than a date")
+    archive_parser.add_argument("before", type=date.fromisoformat, help="YYYY-MM-DD; whole years before it go")
+    archive_parser.add_argument("--drop", action="store_true", help="Delete the rows instead of archiving them")
+    return parser
+
 
 if __name__ == "__main__":
-    base_dir = os.path.dirname(__file__)
-    sql_file_path = os.path.join(base_dir, "sql", "create_tables.sql")
-    execute_sql_file(sql_file_path)
+    args = build_parser().parse_args()
+    try:
+        db_handler = get_db_handler("config.ini")
+        if args.command == "status":
+            show_status(db_handler)
+        elif args.command == "add_partitions":
+            add_partitions(db_handler, args.through_year)
+        elif args.command == "archive":
+            archive_partitions(db_handler, args.before, drop=args.drop)
+        else:
+            migrate(db_handler)
+            print("Tables created successfully.")
+    except FileNotFoundError as err:
+        logger.error(f"SQL file not found: {err.filename}")
+        print(f"SQL file not found: {err.filename}")
+    except mysql.connector.Error as err:
+        logger.error(f"MySQL Error: {err}")
+        print(f"MySQL Error: {err}")
@@ -144,21 +144,72 @@ import streamlit as st
 import pandas as pd
 import altair as alt
 import plotly.express as px
-import mysql.connector
-import configparser
 import traceback
+from storage_backend import get_storage_backend
+from query_service import Analytics, QueryClient, load_settings
+from derived_metrics import DERIVED_METRICS, metrics_for_table, load_population
 
-# --- Load MySQL Config from config.ini ---
-config = configparser.ConfigParser()
-config.read('config.ini')
+# Results are cached per data version; the version itself is re-read at most
+# this often, so a finished ETL run shows up within VERSION_TTL seconds.
+VERSION_TTL = 30
+DATA_TTL = 3600
+
+ISO_CODES = load_population()["iso3"].to_dict()
+
+
+# --- Shared analytics (one per Streamlit server, not per rerun) ---
+# Through the query service when [query_service] url is set, so every
+# dashboard shares its cache and connection pool; otherwise straight from
+# the backend selected under [storage] in config.ini.
+@st.cache_resource(show_spinner=False)
+def get_analytics():
+    url = load_settings('config.ini')["url"]
+    if url:
+        return QueryClient(url)
+    return Analytics(get_storage_backend('config.ini'))
+
+
+@st.cache_data(ttl=VERSION_TTL, show_spinner=False)
+def data_version():
+    # Finish time of the latest ETL run; part of every data cache key, so a
+    # new load invalidates cached results without waiting for DATA_TTL.
+    return analytics.version()
+
+
+@st.cache_data(ttl=DATA_TTL, show_spinner=False)
+def load_countries():
+    _, rows = analytics.countries()
+    return [row[0] for row in rows]
+
+
+def _series_frame(rows, metric):
+    df = pd.DataFrame(rows, columns=["Country", "Date", metric])[["Date", metric, "Country"]]
+    df["Date"] = pd.to_datetime(df["Date"])
+    df[metric] = pd.to_numeric(df[metric])
+    return df
+
+
+@st.cache_data(ttl=DATA_TTL, show_spinner=False)
+def fetch_data(metric, countries, n_days, version):
+    # One round-trip for all selected countries: each country's last n_days
+    # up to its own latest report_date.
+    _, rows = analytics.series(metric, list(countries), n_days)
+    return _series_frame(rows, metric)
+
+
+@st.cache_data(ttl=DATA_TTL, show_spinner=False)
+def fetch_derived(metric, countries, n_days, version):
+    _, rows = analytics.derived(metric, list(countries), n_days)
+    return _series_frame(rows, metric)
+
+
+@st.cache_data(ttl=DATA_TTL, show_spinner=False)
+def fetch_map_data(metric, countries, version):
+    _, rows = analytics.map_summary(metric, list(countries))
+    map_df = pd.DataFrame(rows, columns=["Country", "Total"])
+    map_df["ISO"] = map_df["Country"].map(ISO_CODES)
+    return map_df
 
-db_config = {
-    'host': config.get('mysql', 'host'),
-    'port': config.getint('mysql', 'port'),
-    'user': config.get('mysql', 'user'),
-    'password': config.get('mysql', 'password'),
-    'database': config.get('mysql', 'database')
-}
 
 # --- Streamlit Setup ---
 st.set_page_config(page_title="Global Healthcare Dashboard", layout="wide")
@@ -166,13 +217,18 @@ st.title("🌍 Global Healthcare Data Dashboard")
 st.markdown("Visualize COVID-19 case and vaccination trends globally.")
 st.markdown("---")
 
+analytics = get_analytics()
+
 # --- Sidebar Filters ---
 st.sidebar.header("Filter Options")
-country_list = [
-    "Australia", "Brazil", "Canada", "China", "France",
-    "Germany", "India", "Japan", "Russia", "South Korea", "UK", "USA"
-]
-selected_countries = st.sidebar.multiselect("Select Countries", country_list, default=["India"])
+try:
+    country_list = load_countries()
+except Exception:
+    st.error("❌ Database error while loading the country list.")
+    st.code(traceback.format_exc())
+    st.stop()
+default_countries = ["India"] if "India" in country_list else country_list[:1]
+selected_countries = st.sidebar.multiselect("Select Countries", country_list, default=default_countries)
 
 metric_type = st.sidebar.radio("Metric Type", ["Cases", "Vaccinations"])
 n_days = st.sidebar.slider("Last N Days", min_value=5, max_value=60, value=14)
@@ -183,48 +239,33 @@ show_cumulative = st.sidebar.checkbox("Show Cumulative Map (for cases only)", va
 # --- Metric Selection ---
 if metric_type == "Cases":
     table = "daily_cases"
-    metric_column = st.sidebar.selectbox("Case Metric", ["total_cases", "new_cases", "total_deaths", "new_deaths"])
+    metric_column = st.sidebar.selectbox("Case Metric", ["total_cases", "new_cases", "total_deaths", "new_deaths"]
+                                         + metrics_for_table(table))
 else:
     table = "vaccination_data"
-    metric_column = st.sidebar.selectbox("Vaccination Metric", ["total_vaccinations", "people_vaccinated", "people_fully_vaccinated"])
-
-# --- Fetch Data ---
-def fetch_data(country, table, metric):
-    query = f"""
-        SELECT report_date, {metric}
-        FROM {table}
-        WHERE country_name = %s
-        ORDER BY report_date DESC
-        LIMIT %s
-    """
-    try:
-        conn = mysql.connector.connect(**db_config)
-        cursor = conn.cursor()
-        cursor.execute(query, (country, n_days))
-        rows = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        df = pd.DataFrame(rows, columns=["Date", metric])
-        df["Date"] = pd.to_datetime(df["Date"])
-        df["Country"] = country
-        return df.sort_values("Date")
-    except Exception:
-        st.error("❌ Database error while fetching data.")
-        st.code(traceback.format_exc())
-        return pd.DataFrame()
-
-# --- Load and Combine Data ---
-all_data = []
-for country in selected_countries:
-    df = fetch_data(country, table, metric_column)
-    if not df.empty:
-        all_data.append(df)
+    metric_column = st.sidebar.selectbox("Vaccination Metric", ["total_vaccinations", "people_vaccinated", "people_fully_vaccinated"]
+                                         + metrics_for_table(table))
 
-if not all_data:
+if not selected_countries:
     st.warning("No data available for selected filters.")
     st.stop()
 
-final_df = pd.concat(all_data)
+# --- Load Data (cache key: table, metric, countries, n_days, data version) ---
+countries_key = tuple(sorted(selected_countries))
+try:
+    version = data_version()
+    if metric_column in DERIVED_METRICS:
+        final_df = fetch_derived(metric_column, countries_key, n_days, version)
+    else:
+        final_df = fetch_data(metric_column, countries_key, n_days, version)
+except Exception:
+    st.error("❌ Database error while fetching data.")
+    st.code(traceback.format_exc())
+    st.stop()
+
+if final_df.empty:
+    st.warning("No data available for selected filters.")
+    st.stop()
 
 # --- Visualization ---
 st.subheader(f"📊 {metric_column.replace('_', ' ').title()} Over Time")
@@ -255,26 +296,13 @@ st.altair_chart(chart.properties(width="container", height=400), use_container_w
 if metric_type == "Cases" and show_cumulative:
     st.subheader("🗺️ Global Cumulative Summary Map")
     try:
-        format_strings = ','.join(['%s'] * len(selected_countries))
-        query = f"""
-            SELECT country_name, MAX({metric_column}) as total
-            FROM {table}
-            WHERE country_name IN ({format_strings})
-            GROUP BY country_name
-        """
-        conn = mysql.connector.connect(**db_config)
-        cursor = conn.cursor()
-        cursor.execute(query, selected_countries)
-        result = cursor.fetchall()
-        cursor.close()
-        conn.close()
-
-        map_df = pd.DataFrame(result, columns=["Country", "Total"])
-        map_df["ISO"] = map_df["Country"].map({
-            "Australia": "AUS", "Brazil": "BRA", "Canada": "CAN", "China": "CHN", "France": "FRA",
-            "Germany": "DEU", "India": "IND", "Japan": "JPN", "Russia": "RUS",
-            "South Korea": "KOR", "UK": "GBR", "USA": "USA"
-        })
+        if metric_column in DERIVED_METRICS:
+            # Latest value per country; derived series have no stored summary.
+            map_df = final_df.dropna(subset=[metric_column]).groupby("Country").tail(1)
+            map_df = map_df.rename(columns={metric_column: "Total"})[["Country", "Total"]]
+            map_df["ISO"] = map_df["Country"].map(ISO_CODES)
+        else:
+            map_df = fetch_map_data(metric_column, countries_key, version)
 
         fig = px.choropleth(map_df, locations="ISO", color="Total", hover_name="Country",
                             color_continuous_scale="Blues", locationmode="ISO-3")
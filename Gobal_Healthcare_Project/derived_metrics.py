@@ -0,0 +1,158 @@
+import os
+from functools import lru_cache
+
+from etl.schema import SCHEMAS
+from query_builder import QueryError
+
+# Derived series computed for many countries at once. Every function works on
+# one frame holding all requested countries (one row per country per reported
+# day, as loaded) through grouped, vectorized pandas operations, never a Python
+# loop over countries or rows. Windows and comparisons are in calendar days on
+# report_date, so a country with missing days still gets 7-day figures.
+
+POPULATION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reference", "population.csv")
+
+# Rows needed before the first reported day so every window is full
+# (14-day means, and week-over-week growth comparing two 7-day windows).
+WARMUP_DAYS = 21
+
+
+class DerivedMetric:
+    def __init__(self, name, table, sources, compute, description, needs_population=False):
+        self.name = name
+        self.table = table
+        self.sources = sources
+        self.compute = compute
+        self.description = description
+        self.needs_population = needs_population
+
+
+@lru_cache(maxsize=None)
+def load_population(path=POPULATION_FILE):
+    # country_name -> (iso3, population), from the bundled reference table.
+    import pandas as pd
+    return pd.read_csv(path, dtype={"country_name": "string", "iso3": "string", "population": "int64"}) \
+        .set_index("country_name")
+
+
+def _window_mean(frame, groups, column, days):
+    # Mean over the reported days among the last `days` calendar days. The
+    # result is keyed by (country, date), in the frame's sorted row order.
+    import pandas as pd
+    means = groups.rolling(f"{days}D", on="report_date", min_periods=1)[column].mean()
+    return pd.Series(means.to_numpy(), index=frame.index)
+
+
+def _days_earlier(frame, values, days):
+    # values as of `days` calendar days before each row, for the same country;
+    # NaN where that day was not reported.
+    import pandas as pd
+    lookup = pd.Series(values.to_numpy(), index=pd.MultiIndex.from_arrays(
+        [frame["country_name"], frame["report_date"]]))
+    lookup = lookup[~lookup.index.duplicated(keep="last")]
+    earlier = pd.MultiIndex.from_arrays([frame["country_name"], frame["report_date"] - pd.Timedelta(days=days)])
+    return pd.Series(lookup.reindex(earlier).to_numpy(), index=frame.index)
+
+
+def _rolling_mean(column, window):
+    def compute(frame, groups, population):
+        return _window_mean(frame, groups, column, window)
+    return compute
+
+
+def _day_over_day(column):
+    def compute(frame, groups, population):
+        return (frame[column] / _days_earlier(frame, frame[column], 1) - 1) * 100
+    return compute
+
+
+def _week_over_week(column):
+    # Last 7 days against the 7 days before them, so single-day reporting
+    # spikes don't dominate. Daily means rather than sums, so a missing day
+    # does not read as a drop; the first week of a country has no growth.
+    def compute(frame, groups, population):
+        import pandas as pd
+        weekly = _window_mean(frame, groups, column, 7)
+        first_day = groups["report_date"].transform("min")
+        weekly = weekly.where(frame["report_date"] - first_day >= pd.Timedelta(days=6))
+        return (weekly / _days_earlier(frame, weekly, 7) - 1) * 100
+    return compute
+
+
+def _case_fatality_rate(frame, groups, population):
+    return frame["total_deaths"] / frame["total_cases"] * 100
+
+
+def _per_100(column):
+    def compute(frame, groups, population):
+        people = frame["country_name"].astype("string").map(population["population"]).astype("float64")
+        return frame[column] / people * 100
+    return compute
+
+
+def _build_registry():
+    metrics = {}
+
+    def add(metric):
+        metrics[metric.name] = metric
+
+    for column in ("new_cases", "new_deaths"):
+        label = column.replace("_", " ")
+        for window in (7, 14):
+            add(DerivedMetric(f"{column}_{window}d_avg", "daily_cases", [column],
+                              _rolling_mean(column, window), f"{window}-day rolling mean of {label}"))
+        add(DerivedMetric(f"{column}_dod_growth", "daily_cases", [column],
+                          _day_over_day(column), f"day-over-day change in {label} (%)"))
+        add(DerivedMetric(f"{column}_wow_growth", "daily_cases", [column],
+                          _week_over_week(column), f"week-over-week change in 7-day {label} (%)"))
+    add(DerivedMetric("case_fatality_rate", "daily_cases", ["total_cases", "total_deaths"],
+                      _case_fatality_rate, "total deaths per 100 total cases"))
+    for column in SCHEMAS["vaccination_data"].metric_columns:
+        add(DerivedMetric(f"{column}_per_100", "vaccination_data", [column], _per_100(column),
+                          f"{column.replace('_', ' ')} per 100 people", needs_population=True))
+    return metrics
+
+
+DERIVED_METRICS = _build_registry()
+
+
+def get_metric(name):
+    if name not in DERIVED_METRICS:
+        raise QueryError(f"Unknown derived metric '{name}'; choose from: {', '.join(DERIVED_METRICS)}.")
+    return DERIVED_METRICS[name]
+
+
+def metrics_for_table(table_name):
+    return [name for name, metric in DERIVED_METRICS.items() if metric.table == table_name]
+
+
+def source_columns(names):
+    columns = []
+    for name in names:
+        for column in get_metric(name).sources:
+            if column not in columns:
+                columns.append(column)
+    return columns
+
+
+def compute_metrics(frame, names, population=None):
+    # frame: country_name, report_date and the source columns of `names`, for
+    # any number of countries. Returns country_name, report_date and one column
+    # per derived metric, aligned with the input rows.
+    import numpy as np
+    import pandas as pd
+    specs = [get_metric(name) for name in names]
+    if population is None and any(spec.needs_population for spec in specs):
+        population = load_population()
+
+    frame = frame.sort_values(["country_name", "report_date"], kind="stable").reset_index(drop=True)
+    values = frame[["country_name", "report_date"]].copy()
+    numeric = frame.assign(**{
+        column: pd.to_numeric(frame[column], errors="coerce").astype("float64")
+        for column in source_columns(names)
+    })
+    numeric["report_date"] = pd.to_datetime(numeric["report_date"])
+    groups = numeric.groupby("country_name", observed=True, sort=False)
+    for spec in specs:
+        values[spec.name] = spec.compute(numeric, groups, population).replace([np.inf, -np.inf], np.nan)
+    return values
@@ -0,0 +1,239 @@
+import glob
+import os
+import re
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+
+import duckdb
+from etl.schema import SCHEMAS, DATE, TIMESTAMP, CATEGORY
+from storage_backend import StorageBackend, KEY_COLUMNS, as_frame, frame_row_hashes
+from utils.logger import get_logger
+
+logger = get_logger("DuckDBHandler")
+
+DEFAULT_LOCK_TIMEOUT = 30
+SQL_TYPES = {DATE: "DATE", TIMESTAMP: "TIMESTAMP", CATEGORY: "VARCHAR"}
+
+
+def duckdb_sql(sql):
+    # The callers' SQL uses MySQL-style %s placeholders.
+    return re.sub(r"%s", "?", sql).replace("%%", "%")
+
+
+class DuckDBCursor:
+    # What transaction() yields: a connection taking %s placeholders, like the
+    # MySQL cursor the same callers get from MySQLHandler.
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        self.conn.execute(duckdb_sql(sql), params)
+
+    def executemany(self, sql, rows):
+        self.conn.executemany(duckdb_sql(sql), rows)
+
+    def fetchone(self):
+        return self.conn.fetchone()
+
+    def fetchall(self):
+        return self.conn.fetchall()
+
+
+class DuckDBHandler(StorageBackend):
+    # Embedded columnar store. Fact tables are Parquet files, one per month of
+    # report_date (<data_dir>/<table>/YYYY-MM.parquet), exposed to every query
+    # as a view of the same name, so DuckDB skips files and row groups outside
+    # a query's date range. Small bookkeeping tables (etl_watermarks) live in
+    # the DuckDB database file. Connections are short-lived, so the CLI and the
+    # dashboard can take turns on the same database file.
+    dialect = "duckdb"
+
+    def __init__(self, database_path, data_dir, lock_timeout=DEFAULT_LOCK_TIMEOUT):
+        self.database_path = database_path
+        self.data_dir = data_dir
+        self.lock_timeout = lock_timeout
+        self._lock = threading.RLock()
+        os.makedirs(os.path.dirname(database_path) or ".", exist_ok=True)
+        os.makedirs(data_dir, exist_ok=True)
+        logger.info(f" DuckDB backend ready (database={database_path}, parquet={data_dir}).")
+
+    @contextmanager
+    def connection(self):
+        with self._lock:
+            conn = self._connect()
+            try:
+                self._create_views(conn)
+                yield conn
+            finally:
+                conn.close()
+
+    cursor = connection
+
+    @contextmanager
+    def transaction(self):
+        with self.connection() as conn:
+            conn.execute("BEGIN TRANSACTION")
+            try:
+                yield DuckDBCursor(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _connect(self):
+        # Another process holding the database file's write lock is retried
+        # until lock_timeout, like waiting for a pooled MySQL connection.
+        deadline = time.monotonic() + self.lock_timeout
+        while True:
+            try:
+                return duckdb.connect(self.database_path)
+            except duckdb.IOException:
+                if time.monotonic() >= deadline:
+                    logger.error(" Timed out waiting for the DuckDB database lock.", exc_info=True)
+                    raise
+                time.sleep(0.1)
+
+    def _create_views(self, conn):
+        for table_name, schema in SCHEMAS.items():
+            files = os.path.join(self._table_dir(table_name), "*.parquet")
+            if glob.glob(files):
+                source = f"SELECT * FROM read_parquet('{files}')"
+            else:
+                columns = ", ".join(f"CAST(NULL AS {self._sql_type(dtype)}) AS {column}"
+                                    for column, dtype in schema.columns.items())
+                source = f"SELECT {columns}, CAST(NULL AS VARCHAR) AS row_hash WHERE false"
+            conn.execute(f"CREATE OR REPLACE TEMP VIEW {table_name} AS {source}")
+
+    def run_query(self, sql, params=None):
+        try:
+            logger.info(f"Executing SQL query: {sql}")
+            with self.connection() as conn:
+                results = conn.execute(duckdb_sql(sql), params).fetchall()
+            logger.info(f" Query executed. Rows returned: {len(results)}")
+            return results
+        except duckdb.Error:
+            logger.error(" Error running query", exc_info=True)
+            raise
+
+    def run_query_with_columns(self, sql, params=None):
+        try:
+            logger.info(f"Executing SQL query with columns: {sql}")
+            with self.connection() as conn:
+                result = conn.execute(duckdb_sql(sql), params)
+                columns = [desc[0] for desc in result.description] if result.description else []
+                results = result.fetchall()
+            logger.info(f"Query executed. Columns: {columns}, Rows: {len(results)}")
+            return results, columns
+        except duckdb.Error:
+            logger.error("Error running query with columns", exc_info=True)
+            raise
+
+    def execute(self, sql, params=None):
+        try:
+            logger.info(f"Executing SQL statement: {sql}")
+            with self.connection() as conn:
+                rows = conn.execute(duckdb_sql(sql), params).fetchall()
+            rowcount = rows[0][0] if rows and len(rows[0]) == 1 and isinstance(rows[0][0], int) else -1
+            logger.info(f"Statement executed. Rows affected: {rowcount}")
+            return rowcount
+        except duckdb.Error:
+            logger.error("Error executing statement", exc_info=True)
+            raise
+
+    def executemany(self, sql, rows):
+        try:
+            logger.info(f"Executing SQL statement for {len(rows)} rows: {sql}")
+            with self.transaction() as cursor:
+                cursor.executemany(sql, rows)
+            logger.info(f"Statement executed. Rows: {len(rows)}")
+            return len(rows)
+        except duckdb.Error:
+            logger.error("Error executing statement", exc_info=True)
+            raise
+
+    def insert_data(self, table_name, records, mode="ignore"):
+        # Rewrites each affected month file with the batch merged in: new keys
+        # are appended; with mode="upsert" rows whose content hash changed are
+        # replaced, otherwise existing rows win (INSERT IGNORE semantics).
+        frame = as_frame(table_name, records)
+        if len(frame) == 0:
+            logger.warning(f"No records to insert into `{table_name}`.")
+            return {"loaded": 0, "updated": 0, "unchanged": 0}
+
+        frame = frame.drop_duplicates(subset=list(KEY_COLUMNS), keep="last" if mode == "upsert" else "first")
+        frame = frame.assign(row_hash=frame_row_hashes(frame))
+        months = frame["report_date"].dt.strftime("%Y-%m")
+        totals = {"loaded": 0, "updated": 0, "unchanged": 0}
+        with self.connection() as conn:
+            for month, batch in frame.groupby(months, sort=True):
+                counts = self._merge_month(conn, table_name, month, batch, mode)
+                for key in totals:
+                    totals[key] += counts[key]
+        totals["unchanged"] += len(records) - len(frame)
+
+        summary = (f"Loaded {totals['loaded']}, updated {totals['updated']}, "
+                   f"unchanged {totals['unchanged']} rows in `{table_name}`.")
+        logger.info(summary)
+        return totals
+
+    def _merge_month(self, conn, table_name, month, batch, mode):
+        schema = SCHEMAS[table_name]
+        columns = schema.column_names + ["row_hash"]
+        casts = ", ".join(f"CAST({column} AS {self._sql_type(dtype)}) AS {column}"
+                          for column, dtype in schema.columns.items())
+        conn.register("incoming_frame", batch)
+        conn.execute(f"CREATE OR REPLACE TEMP TABLE incoming AS SELECT {casts}, row_hash FROM incoming_frame")
+        conn.unregister("incoming_frame")
+
+        path = os.path.join(self._table_dir(table_name), f"{month}.parquet")
+        if os.path.exists(path):
+            conn.execute(f"CREATE OR REPLACE TEMP TABLE existing AS SELECT * FROM read_parquet('{path}')")
+        else:
+            conn.execute("CREATE OR REPLACE TEMP TABLE existing AS SELECT * FROM incoming WHERE false")
+
+        join = "e.country_name = i.country_name AND e.report_date = i.report_date"
+        new_count, changed_count = conn.execute(
+            f"""
+            SELECT COUNT(*) FILTER (WHERE e.report_date IS NULL),
+                   COUNT(*) FILTER (WHERE e.report_date IS NOT NULL AND e.row_hash IS DISTINCT FROM i.row_hash)
+            FROM incoming i LEFT JOIN existing e ON {join}
+            """
+        ).fetchone()
+        if mode != "upsert":
+            changed_count = 0
+
+        if new_count or changed_count:
+            column_list = ", ".join(columns)
+            keep_existing = "e.row_hash IS NOT DISTINCT FROM i.row_hash" if mode == "upsert" else "true"
+            merged = f"""
+                SELECT {column_list} FROM existing e
+                WHERE NOT EXISTS (SELECT 1 FROM incoming i WHERE {join} AND NOT ({keep_existing}))
+                UNION ALL
+                SELECT {", ".join(f"i.{column}" for column in columns)} FROM incoming i
+                WHERE NOT EXISTS (SELECT 1 FROM existing e WHERE {join} AND {keep_existing})
+                ORDER BY country_name, report_date
+            """
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            conn.execute(f"COPY ({merged}) TO '{tmp_path}' (FORMAT PARQUET)")
+            os.replace(tmp_path, path)
+
+        return {"loaded": new_count, "updated": changed_count,
+                "unchanged": len(batch) - new_count - changed_count}
+
+    def drop_table(self, table_name):
+        if table_name in SCHEMAS:
+            shutil.rmtree(self._table_dir(table_name), ignore_errors=True)
+            logger.info(f"Removed Parquet files for `{table_name}`.")
+        else:
+            self.execute(f"DROP TABLE IF EXISTS {table_name}")
+
+    def _table_dir(self, table_name):
+        return os.path.join(self.data_dir, table_name)
+
+    @staticmethod
+    def _sql_type(dtype):
+        return SQL_TYPES.get(dtype, "BIGINT")
@@ -1,41 +1,182 @@
-import logging
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from etl import run_metrics
+from etl.page_decoder import DECODERS, DEFAULT_DECODER, decode_page
+from etl.schema import SCHEMAS
+from utils.logger import get_logger
+
+logger = get_logger("APIClient")
+
+DEFAULT_PAGE_SIZE = 1000
+DEFAULT_TIMEOUT = 30
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+DEFAULT_POOL_SIZE = 10
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+ENDPOINT_SCHEMAS = {schema.endpoint: schema for schema in SCHEMAS.values()}
+
+
+class FetchError(RuntimeError):
+    # A page could not be fetched even after retries. Raised instead of ending
+    # the page loop, so a failed page never passes for the end of the data.
+    pass
 
-logging.basicConfig(
-    filename='etl.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
 
 class APIClient:
-    def __init__(self, base_url):
+    def __init__(self, base_url, page_size=DEFAULT_PAGE_SIZE, timeout=DEFAULT_TIMEOUT,
+                 max_retries=DEFAULT_MAX_RETRIES, backoff_factor=DEFAULT_BACKOFF_FACTOR,
+                 pool_size=DEFAULT_POOL_SIZE, cache=None, offline=False, decoder=DEFAULT_DECODER):
         self.base_url = base_url
-        logging.info(f"APIClient initialized with base URL: {self.base_url}")
+        self.page_size = page_size
+        self.timeout = timeout
+        self.cache = cache
+        self.offline = offline
+        if decoder not in DECODERS:
+            raise ValueError(f"JSON decoder '{decoder}' is not available; choose from {', '.join(DECODERS)}.")
+        self.decoder = decoder
+        self.session = self._build_session(max_retries, backoff_factor, pool_size)
+        logger.info(
+            f"APIClient initialized with base URL: {self.base_url} "
+            f"(timeout={timeout}s, retries={max_retries}, pool_size={pool_size}, decoder={decoder})"
+        )
 
-    def fetch_cases(self):
-        url = f"{self.base_url}/cases"
-        try:
-            response = requests.get(url)
-            if response.status_code == 200:
-                logging.info("Successfully fetched cases data.")
-                return response.json()
+    @staticmethod
+    def _build_session(max_retries, backoff_factor, pool_size):
+        # One pooled session shared by every request (and every fetch thread),
+        # retrying connection errors and 5xx responses with exponential backoff.
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset(["GET"]),
+            backoff_factor=backoff_factor,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def close(self):
+        self.session.close()
+
+    def fetch_cases(self, country=None, start_date=None, end_date=None):
+        return self.fetch_pages("cases", country, start_date, end_date)
+
+    def fetch_vaccinations(self, country=None, start_date=None, end_date=None):
+        return self.fetch_pages("vaccinations", country, start_date, end_date)
+
+    def fetch_pages(self, endpoint, country=None, start_date=None, end_date=None, page_size=None):
+        # Generator of record pages, each a DataFrame of the endpoint's schema
+        # columns decoded straight from the response body (etl/page_decoder.py).
+        # Filters are sent as query parameters and re-applied locally, so
+        # servers that ignore them still yield only the requested country and
+        # date range.
+        schema = ENDPOINT_SCHEMAS[endpoint]
+        url = f"{self.base_url}/{endpoint}"
+        page_size = page_size or self.page_size
+        params = {"limit": page_size, "offset": 0}
+        if country:
+            params["country"] = country
+        if start_date:
+            params["start_date"] = start_date
+        if end_date:
+            params["end_date"] = end_date
+
+        page_number = 0
+        total_records = 0
+        previous = None
+        while True:
+            body = self._get_page(url, params, endpoint)
+            with run_metrics.timed("fetch"):
+                records, next_cursor = decode_page(body, schema, self.decoder)
+            if records.empty:
+                break
+            if previous is not None and records.equals(previous):
+                # The server ignored offset (or cursor) and sent the same page
+                # again; paging on would never end.
+                logger.warning(f"{endpoint}: page {page_number + 1} repeats page {page_number}; "
+                               f"the server does not page this request. Stopping.")
+                break
+            previous = records
+            page_number += 1
+            filtered = self._filter_records(records, country, start_date, end_date)
+            if len(filtered) != len(records):
+                logger.info(
+                    f"{endpoint}: page {page_number} filtered client-side "
+                    f"({len(records)} -> {len(filtered)} records)."
+                )
+            total_records += len(filtered)
+            run_metrics.count("rows_fetched", len(filtered))
+            if not filtered.empty:
+                yield filtered
+
+            if next_cursor:
+                params.pop("offset", None)
+                params["cursor"] = next_cursor
+            elif len(records) == page_size:
+                params["offset"] += page_size
             else:
-                logging.warning(f"Failed to fetch cases. Status code: {response.status_code}")
-                return []
-        except Exception as e:
-            logging.error(f"Error fetching cases: {e}")
-            return []
+                # A short page ends offset paging; an oversized one means the
+                # server ignored `limit` and already returned everything.
+                break
+
+        logger.info(f"Successfully fetched {total_records} {endpoint} records in {page_number} page(s).")
+
+    def _get_page(self, url, params, endpoint):
+        with run_metrics.timed("fetch"):
+            return self._read_page(url, params, endpoint)
+
+    def _read_page(self, url, params, endpoint):
+        cached = self.cache.get(url, params) if self.cache else None
+        if self.offline:
+            # A miss is a failure, not an empty result: the data exists
+            # upstream, it just was never cached.
+            if cached is None:
+                logger.error(f"Offline: no cached {endpoint} response for {params}.")
+                raise FetchError(f"Offline: no cached {endpoint} response for {params}")
+            return cached.body()
+        if cached and cached.is_fresh:
+            logger.info(f"Serving {endpoint} page from cache (within TTL).")
+            return cached.body()
 
-    def fetch_vaccinations(self):
-        url = f"{self.base_url}/vaccinations"
         try:
-            response = requests.get(url)
-            if response.status_code == 200:
-                logging.info("Successfully fetched vaccination data.")
-                return response.json()
-            else:
-                logging.warning(f"Failed to fetch vaccinations. Status code: {response.status_code}")
-                return []
+            headers = cached.conditional_headers() if cached else {}
+            response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            if response.status_code == 304 and cached:
+                logger.info(f"{endpoint} unchanged upstream (304); serving cached page.")
+                self.cache.revalidated(cached)
+                return cached.body()
         except Exception as e:
-            logging.error(f"Error fetching vaccinations: {e}")
-            return []
+            logger.error(f"Error fetching {endpoint}: {e}")
+            raise FetchError(f"Error fetching {endpoint} {params}: {e}") from e
+        if response.status_code != 200:
+            logger.error(f"Failed to fetch {endpoint}. Status code: {response.status_code}")
+            raise FetchError(f"Failed to fetch {endpoint} {params}: status code {response.status_code}")
+        run_metrics.count("bytes_fetched", len(response.content))
+        if self.cache:
+            self.cache.store(url, params, response.content, response.headers)
+        return response.content
+
+    @staticmethod
+    def _filter_records(records, country=None, start_date=None, end_date=None):
+        if not (country or start_date or end_date):
+            return records
+
+        keep = np.ones(len(records), dtype=bool)
+        if country:
+            names = records["country_name"].astype("string").str.lower()
+            keep &= (names == country.lower()).fillna(False).to_numpy(dtype=bool)
+        if start_date or end_date:
+            # ISO dates compare correctly as strings; timestamps are cut to the day.
+            report_dates = records["report_date"].astype("string").fillna("").str[:10]
+            if start_date:
+                keep &= (report_dates >= start_date).to_numpy(dtype=bool)
+            if end_date:
+                keep &= (report_dates <= end_date).to_numpy(dtype=bool)
+        return records if keep.all() else records[keep].reset_index(drop=True)
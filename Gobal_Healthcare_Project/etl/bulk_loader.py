@@ -0,0 +1,151 @@
+# etl/bulk_loader.py
+
+import hashlib
+import math
+import os
+import tempfile
+import time
+
+from utils.logger import get_logger
+
+logger = get_logger("BulkLoader")
+
+DEFAULT_CHUNK_SIZE = 5000
+CSV_NULL = "\\N"
+
+CREATE_CHECKPOINT_TABLE = """
+    CREATE TABLE IF NOT EXISTS etl_load_checkpoints (
+        table_name VARCHAR(64) NOT NULL,
+        batch_key CHAR(32) NOT NULL,
+        chunks_committed INT NOT NULL,
+        total_chunks INT NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (table_name, batch_key)
+    )
+"""
+
+
+class BulkLoader:
+    # Writes a batch in fixed-size chunks, one transaction per chunk. The chunk
+    # counter is committed together with each chunk, so re-running the same
+    # batch after a failure resumes from the first uncommitted chunk. When a
+    # RollupStore is given, the summary tables are refreshed in the same
+    # transaction, so they never disagree with the committed rows.
+
+    def __init__(self, db_handler, chunk_size=DEFAULT_CHUNK_SIZE, use_load_data=False, mode="ignore",
+                 rollups=None):
+        self.db_handler = db_handler
+        self.chunk_size = chunk_size
+        self.use_load_data = use_load_data
+        self.mode = mode
+        self.rollups = rollups
+        self.db_handler.execute(CREATE_CHECKPOINT_TABLE)
+
+    def load(self, table_name, records):
+        from storage_backend import as_frame
+        records = as_frame(table_name, records)
+        total_chunks = math.ceil(len(records) / self.chunk_size)
+        batch_key = self._batch_key(table_name, records)
+        start_chunk = self._committed_chunks(table_name, batch_key)
+        if start_chunk:
+            print(f" Resuming `{table_name}` load at chunk {start_chunk + 1}/{total_chunks}.")
+            logger.info(f"Resuming {table_name} batch {batch_key} after {start_chunk} committed chunk(s).")
+
+        totals = {"loaded": 0, "updated": 0, "unchanged": 0}
+        for index in range(start_chunk, total_chunks):
+            chunk = records.iloc[index * self.chunk_size:(index + 1) * self.chunk_size]
+            started = time.perf_counter()
+            try:
+                counts = self._commit_chunk(table_name, batch_key, chunk, index + 1, total_chunks)
+            except Exception as e:
+                logger.error(f"{table_name}: chunk {index + 1}/{total_chunks} failed and was rolled back: {e}")
+                print(f"❌ `{table_name}` chunk {index + 1}/{total_chunks} failed: {e}")
+                raise
+
+            elapsed = time.perf_counter() - started
+            rate = len(chunk) / elapsed if elapsed > 0 else float("inf")
+            for key in totals:
+                totals[key] += counts[key]
+            message = (f"{table_name}: chunk {index + 1}/{total_chunks} committed, {len(chunk)} rows "
+                       f"in {elapsed:.2f}s ({rate:,.0f} rows/s)")
+            print(f" {message}")
+            logger.info(message)
+
+        self._clear_checkpoint(table_name, batch_key)
+        return totals
+
+    def _commit_chunk(self, table_name, batch_key, chunk, chunk_number, total_chunks):
+        # The chunk and its checkpoint row share one transaction.
+        if self.use_load_data:
+            try:
+                with self.db_handler.transaction() as cursor:
+                    counts = self._load_data_infile(cursor, table_name, chunk)
+                    self._refresh_rollups(cursor, table_name, chunk)
+                    self._save_checkpoint(cursor, table_name, batch_key, chunk_number, total_chunks)
+                return counts
+            except Exception as e:
+                # LOAD DATA LOCAL is often disabled server-side; fall back for
+                # the rest of the run instead of failing every chunk.
+                self.use_load_data = False
+                logger.warning(f"LOAD DATA LOCAL INFILE unavailable, falling back to batched inserts: {e}")
+                print(f" ⚠️ LOAD DATA LOCAL INFILE unavailable ({e}); using batched inserts.")
+
+        with self.db_handler.transaction() as cursor:
+            counts = self.db_handler.write_records(cursor, table_name, chunk, self.mode)
+            self._refresh_rollups(cursor, table_name, chunk)
+            self._save_checkpoint(cursor, table_name, batch_key, chunk_number, total_chunks)
+        return counts
+
+    def _refresh_rollups(self, cursor, table_name, chunk):
+        if self.rollups is not None:
+            self.rollups.refresh(cursor, table_name, chunk)
+
+    def _load_data_infile(self, cursor, table_name, chunk):
+        # The typed chunk is written column-wise by pandas, never as per-row tuples.
+        from storage_backend import frame_row_hashes
+        out = chunk.assign(
+            report_date=chunk["report_date"].dt.strftime("%Y-%m-%d"),
+            row_hash=frame_row_hashes(chunk)
+        )
+        fd, path = tempfile.mkstemp(suffix=".csv", prefix=f"{table_name}_")
+        try:
+            with os.fdopen(fd, "w", newline="", encoding="utf-8") as f:
+                out.to_csv(f, header=False, index=False, na_rep=CSV_NULL, lineterminator="\n",
+                           date_format="%Y-%m-%d %H:%M:%S")
+            return self.db_handler.load_csv(cursor, table_name, path, len(chunk), self.mode)
+        finally:
+            os.remove(path)
+
+    @staticmethod
+    def _batch_key(table_name, records):
+        # Covers every row's content (not etl_timestamp), so only a re-run of
+        # the same data resumes; a re-fetch with corrected rows is a new batch.
+        from storage_backend import frame_row_hashes
+        digest = hashlib.md5(f"{table_name}|{len(records)}".encode("utf-8"))
+        for row_hash in frame_row_hashes(records):
+            digest.update(row_hash.encode("ascii"))
+        return digest.hexdigest()
+
+    def _committed_chunks(self, table_name, batch_key):
+        rows = self.db_handler.run_query(
+            "SELECT chunks_committed FROM etl_load_checkpoints WHERE table_name = %s AND batch_key = %s",
+            (table_name, batch_key)
+        )
+        return rows[0][0] if rows else 0
+
+    def _save_checkpoint(self, cursor, table_name, batch_key, chunks_committed, total_chunks):
+        cursor.execute(
+            """
+            INSERT INTO etl_load_checkpoints (table_name, batch_key, chunks_committed, total_chunks)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE chunks_committed = VALUES(chunks_committed)
+            """,
+            (table_name, batch_key, chunks_committed, total_chunks)
+        )
+
+    def _clear_checkpoint(self, table_name, batch_key):
+        self.db_handler.execute(
+            "DELETE FROM etl_load_checkpoints WHERE table_name = %s AND batch_key = %s",
+            (table_name, batch_key)
+        )
+
@@ -0,0 +1,325 @@
+# etl/daemon.py
+
+import configparser
+import json
+import queue
+import random
+import shlex
+import threading
+from datetime import date, datetime, time, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from etl.fetch_engine import ENDPOINTS
+from utils.logger import get_logger
+
+logger = get_logger("ETLDaemon")
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_JITTER_SECONDS = 30
+DEFAULT_START_DATE = "2020-01-01"
+JOB_SECTION_PREFIX = "job:"
+
+SCHEDULE_ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+}
+# (name, lowest, highest) of the five cron fields; weekday 0 and 7 are Sunday.
+CRON_FIELDS = (("minute", 0, 59), ("hour", 0, 23), ("day", 1, 31), ("month", 1, 12), ("weekday", 0, 7))
+
+
+def _parse_cron_field(text, name, low, high):
+    values = set()
+    for part in text.split(","):
+        part, has_step, step = part.partition("/")
+        try:
+            step = int(step) if has_step else 1
+            if part == "*":
+                start, end = low, high
+            elif "-" in part:
+                start, end = (int(bound) for bound in part.split("-", 1))
+            else:
+                start = int(part)
+                end = high if has_step else start
+        except ValueError:
+            raise ValueError(f"Invalid {name} field '{text}' in schedule.") from None
+        if step < 1 or start < low or end > high or start > end:
+            raise ValueError(f"Invalid {name} field '{text}' in schedule (allowed {low}-{high}).")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    # Standard five-field cron expression (minute hour day month weekday) in
+    # local time, with *, lists, ranges and steps, plus @hourly/@daily/
+    # @weekly/@monthly. As in cron, when both day and weekday are restricted
+    # a day matching either one fires.
+
+    def __init__(self, expression):
+        self.expression = expression.strip()
+        fields = SCHEDULE_ALIASES.get(self.expression, self.expression).split()
+        if len(fields) != len(CRON_FIELDS):
+            raise ValueError(f"Schedule '{expression}' must have {len(CRON_FIELDS)} fields.")
+        minutes, hours, days, months, weekdays = (
+            _parse_cron_field(text, *spec) for text, spec in zip(fields, CRON_FIELDS)
+        )
+        self.minutes = sorted(minutes)
+        self.hours = sorted(hours)
+        self.days = days
+        self.months = months
+        self.weekdays = {weekday % 7 for weekday in weekdays}
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    def _day_matches(self, day):
+        if day.month not in self.months:
+            return False
+        day_ok = day.day in self.days
+        weekday_ok = (day.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, moment):
+        # First matching minute strictly after `moment`.
+        earliest = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = earliest.date()
+        # Eight years covers schedules that only match on 29 February.
+        for _ in range(366 * 8):
+            if self._day_matches(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        candidate = datetime.combine(day, time(hour, minute))
+                        if candidate >= earliest:
+                            return candidate
+            day += timedelta(days=1)
+        raise ValueError(f"Schedule '{self.expression}' never fires.")
+
+
+class Job:
+    # One scheduled fetch_data run, from a [job:<name>] section of config.ini.
+    # The run always ends today; watermarks make repeated runs incremental.
+
+    def __init__(self, name, schedule, countries, datasets=ENDPOINTS, start_date=DEFAULT_START_DATE,
+                 options=(), jitter_seconds=DEFAULT_JITTER_SECONDS):
+        unknown = [dataset for dataset in datasets if dataset not in ENDPOINTS]
+        if unknown:
+            raise ValueError(f"Job '{name}': unknown dataset(s) {', '.join(unknown)}; "
+                             f"expected {', '.join(ENDPOINTS)}.")
+        if not countries:
+            raise ValueError(f"Job '{name}' has no countries.")
+        self.name = name
+        self.schedule = CronSchedule(schedule)
+        self.countries = list(countries)
+        self.datasets = list(datasets)
+        self.start_date = start_date
+        self.options = list(options)
+        self.jitter_seconds = jitter_seconds
+
+    def fetch_argv(self, end_date=None):
+        end_date = end_date or date.today().isoformat()
+        return (["fetch_data", ",".join(self.countries), self.start_date, end_date,
+                 "--datasets", ",".join(self.datasets)] + self.options)
+
+    def next_run(self, after):
+        return self.schedule.next_after(after) + timedelta(seconds=random.uniform(0, self.jitter_seconds))
+
+
+def _split_list(value):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def load_jobs(config_path="config.ini"):
+    # [serve] holds the control endpoint and default jitter; every
+    # [job:<name>] section is one job.
+    config = configparser.ConfigParser()
+    config.read(config_path)
+    settings = {
+        "host": config.get("serve", "host", fallback=DEFAULT_HOST),
+        "port": config.getint("serve", "port", fallback=DEFAULT_PORT),
+        "jitter_seconds": config.getfloat("serve", "jitter_seconds", fallback=DEFAULT_JITTER_SECONDS),
+    }
+    jobs = []
+    for section in config.sections():
+        if not section.startswith(JOB_SECTION_PREFIX):
+            continue
+        options = config[section]
+        jobs.append(Job(
+            section[len(JOB_SECTION_PREFIX):].strip(),
+            options.get("schedule", ""),
+            _split_list(options.get("countries", "")),
+            datasets=_split_list(options.get("datasets", ",".join(ENDPOINTS))),
+            start_date=options.get("start_date", DEFAULT_START_DATE),
+            options=shlex.split(options.get("options", "")),
+            jitter_seconds=options.getfloat("jitter_seconds", settings["jitter_seconds"]),
+        ))
+    return jobs, settings
+
+
+class JobState:
+    def __init__(self, next_run):
+        self.next_run = next_run
+        self.running = False
+        self.queued = False
+        self.runs = 0
+        self.skipped = 0
+        self.last_trigger = None
+        self.last_started = None
+        self.last_finished = None
+        self.last_status = None
+        self.last_duration = None
+        self.last_error = None
+
+    def as_dict(self):
+        def iso(moment):
+            return moment.isoformat(timespec="seconds") if moment else None
+        return {
+            "next_run": iso(self.next_run), "running": self.running, "queued": self.queued,
+            "runs": self.runs, "skipped": self.skipped, "last_trigger": self.last_trigger,
+            "last_started": iso(self.last_started), "last_finished": iso(self.last_finished),
+            "last_status": self.last_status,
+            "last_duration_seconds": None if self.last_duration is None else round(self.last_duration, 3),
+            "last_error": self.last_error,
+        }
+
+
+class ETLDaemon:
+    # Runs jobs on their schedules inside one long-lived process, so the API
+    # session, response cache, connection pool and imports stay warm between
+    # runs. Jobs run one at a time on a single runner thread: run metrics track
+    # one active run per process, and a job is never queued again while it is
+    # still queued or running (the extra trigger is counted as skipped).
+    # A small HTTP server on localhost reports status and triggers runs:
+    #   GET  /status           jobs, next run times and last results (JSON)
+    #   POST /jobs/<name>/run  queue a run now (409 if already queued/running)
+
+    def __init__(self, jobs, run_job, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.jobs = {job.name: job for job in jobs}
+        self.run_job = run_job
+        self.host = host
+        self.port = port
+        self.started_at = None
+        now = datetime.now()
+        self.states = {job.name: JobState(job.next_run(now)) for job in jobs}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._server = None
+
+    def trigger(self, name, reason="manual"):
+        with self._lock:
+            state = self.states[name]
+            if state.queued or state.running:
+                state.skipped += 1
+                logger.warning(f"Job {name} is still queued or running; {reason} trigger skipped.")
+                return False
+            state.queued = True
+            state.last_trigger = reason
+        self._queue.put(name)
+        logger.info(f"Job {name} queued ({reason}).")
+        return True
+
+    def status(self):
+        with self._lock:
+            return {
+                "started_at": self.started_at.isoformat(timespec="seconds") if self.started_at else None,
+                "jobs": {name: state.as_dict() for name, state in self.states.items()},
+            }
+
+    def serve_forever(self):
+        self.started_at = datetime.now()
+        self._server = ThreadingHTTPServer((self.host, self.port), _control_handler(self))
+        threads = [
+            threading.Thread(target=self._server.serve_forever, name="daemon-control", daemon=True),
+            threading.Thread(target=self._schedule_loop, name="daemon-schedule", daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+        logger.info(f"Daemon serving {len(self.jobs)} job(s); control endpoint http://{self.host}:{self.port}.")
+        try:
+            self._run_loop()
+        finally:
+            self._server.shutdown()
+            self._server.server_close()
+            logger.info("Daemon stopped.")
+
+    def stop(self):
+        self._stop.set()
+
+    def _schedule_loop(self):
+        while not self._stop.is_set():
+            now = datetime.now()
+            for name, job in self.jobs.items():
+                if self.states[name].next_run <= now:
+                    self.trigger(name, reason="schedule")
+                    with self._lock:
+                        self.states[name].next_run = job.next_run(now)
+            with self._lock:
+                upcoming = min((state.next_run for state in self.states.values()), default=None)
+            # Wake at the next due job, and at least once a minute in case the
+            # clock jumps.
+            wait = 60 if upcoming is None else (upcoming - datetime.now()).total_seconds()
+            self._stop.wait(min(max(wait, 0.1), 60))
+
+    def _run_loop(self):
+        # The current job always finishes; stop() takes effect between jobs.
+        while not self._stop.is_set():
+            try:
+                name = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            state = self.states[name]
+            with self._lock:
+                state.queued = False
+                state.running = True
+                state.last_started = datetime.now()
+            started = datetime.now()
+            status, error = None, None
+            try:
+                status = self.run_job(self.jobs[name])
+            except Exception as e:
+                logger.exception(f"Job {name} raised an error.")
+                status, error = "failed", str(e)
+            with self._lock:
+                state.running = False
+                state.runs += 1
+                state.last_finished = datetime.now()
+                state.last_duration = (state.last_finished - started).total_seconds()
+                state.last_status = status
+                state.last_error = error
+            logger.info(f"Job {name} finished: {status} in {state.last_duration:.2f}s.")
+
+
+def _control_handler(daemon):
+    class ControlHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") == "/status":
+                self._reply(200, daemon.status())
+            else:
+                self._reply(404, {"error": f"Unknown path {self.path}"})
+
+        def do_POST(self):
+            parts = self.path.strip("/").split("/")
+            if len(parts) != 3 or parts[0] != "jobs" or parts[2] != "run":
+                self._reply(404, {"error": f"Unknown path {self.path}"})
+            elif parts[1] not in daemon.jobs:
+                self._reply(404, {"error": f"Unknown job '{parts[1]}'"})
+            elif daemon.trigger(parts[1]):
+                self._reply(202, {"job": parts[1], "queued": True})
+            else:
+                self._reply(409, {"job": parts[1], "queued": False, "reason": "already queued or running"})
+
+        def _reply(self, code, payload):
+            body = json.dumps(payload, indent=2).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.info(f"Control request from {self.client_address[0]}: {format % args}")
+
+    return ControlHandler
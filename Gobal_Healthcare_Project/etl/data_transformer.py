@@ -1,82 +1,96 @@
 # etl/data_transformer.py
 
-import pandas as pd
-import logging
-from datetime import datetime
-
-logging.basicConfig(
-    filename='etl.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
-
-class DataTransformer:
-
-    def transform_cases(self, raw_data):
-        logging.info("Starting transformation of cases data.")
-        df = pd.DataFrame(raw_data)
-
-        df = df.rename(columns={
-            "report_date": "report_date",
-            "country_name": "country_name",
-            "total_cases": "total_cases",
-            "new_cases": "new_cases",
-            "total_deaths": "total_deaths",
-            "new_deaths": "new_deaths",
-            "etl_timestamp": "etl_timestamp"
-        })
-
-        initial_count = len(df)
-        df = df.dropna(subset=["report_date", "country_name", "total_cases"])
-        filtered_count = len(df)
-
-        logging.info(f"Cases: Dropped {initial_count - filtered_count} records due to missing values.")
+import threading
 
-        try:
-            df["report_date"] = pd.to_datetime(df["report_date"]).dt.date
-            df["etl_timestamp"] = pd.to_datetime(df["etl_timestamp"])
-        except Exception as e:
-            logging.error(f"Cases: Error in date conversion: {e}")
-            return []
-
-        records = list(df[[
-            "report_date", "country_name", "total_cases",
-            "new_cases", "total_deaths", "new_deaths", "etl_timestamp"
-        ]].itertuples(index=False, name=None))
-
-        logging.info(f"Cases: Successfully transformed {len(records)} records.")
-        return records
+import pandas as pd
 
-    def transform_vaccinations(self, raw_data):
-        logging.info("Starting transformation of vaccination data.")
-        df = pd.DataFrame(raw_data)
+from etl import run_metrics, validation
+from etl.schema import SCHEMAS, DATE, TIMESTAMP, CATEGORY
+from utils.logger import get_logger
 
-        df = df.rename(columns={
-            "report_date": "report_date",
-            "country_name": "country_name",
-            "total_vaccinations": "total_vaccinations",
-            "people_vaccinated": "people_vaccinated",
-            "people_fully_vaccinated": "people_fully_vaccinated",
-            "etl_timestamp": "etl_timestamp"
-        })
+logger = get_logger("DataTransformer")
 
-        initial_count = len(df)
-        df = df.dropna(subset=["report_date", "country_name", "total_vaccinations"])
-        filtered_count = len(df)
+LABELS = {"daily_cases": "Cases", "vaccination_data": "Vaccinations"}
 
-        logging.info(f"Vaccinations: Dropped {initial_count - filtered_count} records due to missing values.")
 
+class DataTransformer:
+    # Casts raw API records to the table schema and runs the validation rules
+    # (etl/validation.py). Rows failing a rule go to the quarantine store, if
+    # one is given, with the failed rules; the rest of the batch proceeds.
+
+    def __init__(self, quarantine=None):
+        self.quarantine = quarantine
+        self.rule_counts = {}
+        self._lock = threading.Lock()
+
+    def transform_cases(self, raw_data, since=None):
+        return self.transform("daily_cases", raw_data, since)
+
+    def transform_vaccinations(self, raw_data, since=None):
+        return self.transform("vaccination_data", raw_data, since)
+
+    def transform(self, table_name, raw_data, since=None):
+        # Returns a typed DataFrame in the table's column order; rows are only
+        # turned into DB parameters by the loader, one chunk at a time.
+        with run_metrics.timed("transform"):
+            df, skipped = self._transform(table_name, raw_data, since)
+        run_metrics.count("rows_transformed", len(df))
+        run_metrics.count("rows_dropped", len(raw_data) - len(df) - skipped)
+        run_metrics.count("rows_skipped", skipped)
+        return df
+
+    def _transform(self, table_name, raw_data, since=None):
+        schema = SCHEMAS[table_name]
+        label = LABELS.get(table_name, table_name)
+        logger.info(f"Starting transformation of {label.lower()} data.")
+
+        raw = raw_data if isinstance(raw_data, pd.DataFrame) else pd.DataFrame(raw_data)
+        raw = raw.reset_index(drop=True).reindex(columns=schema.column_names)
+        df = pd.DataFrame({
+            column: self._cast(raw[column], dtype, schema.date_formats.get(column))
+            for column, dtype in schema.columns.items()
+        }, index=raw.index)
+
+        result = validation.validate(table_name, df, raw)
+        if result.counts:
+            self._quarantine(table_name, label, result)
+
+        df = self._drop_loaded(result.valid, since, label)
+        skipped = len(result.valid) - len(df)
+        df = df.reset_index(drop=True)
+
+        logger.info(f"{label}: Successfully transformed {len(df)} records.")
+        return df, skipped
+
+    def _quarantine(self, table_name, label, result):
+        with self._lock:
+            table_counts = self.rule_counts.setdefault(table_name, {})
+            for rule, total in result.counts.items():
+                table_counts[rule] = table_counts.get(rule, 0) + total
+        logger.warning(f"{label}: {len(result.quarantined)} records failed validation "
+                       f"({validation.describe(result.counts)}).")
+        if self.quarantine is None:
+            return
         try:
-            df["report_date"] = pd.to_datetime(df["report_date"]).dt.date
-            df["etl_timestamp"] = pd.to_datetime(df["etl_timestamp"])
+            self.quarantine.save(table_name, result.quarantined)
         except Exception as e:
-            logging.error(f"Vaccinations: Error in date conversion: {e}")
-            return []
-
-        records = list(df[[
-            "report_date", "country_name", "total_vaccinations",
-            "people_vaccinated", "people_fully_vaccinated", "etl_timestamp"
-        ]].itertuples(index=False, name=None))
-
-        logging.info(f"Vaccinations: Successfully transformed {len(records)} records.")
-        return records
+            # The valid rows still load; only the quarantine copy is lost.
+            logger.error(f"{label}: could not write {len(result.quarantined)} records to quarantine: {e}")
+
+    @staticmethod
+    def _cast(series, dtype, date_format=None):
+        if dtype in (DATE, TIMESTAMP):
+            parsed = pd.to_datetime(series, format=date_format, errors="coerce", utc=True).dt.tz_localize(None)
+            return parsed.dt.normalize() if dtype == DATE else parsed
+        if dtype == CATEGORY:
+            return series.astype("string").str.strip().replace("", pd.NA).astype(CATEGORY)
+        return pd.to_numeric(series, errors="coerce").round().astype(dtype)
+
+    def _drop_loaded(self, df, since, label):
+        # Incremental loads: keep only rows newer than the table's watermark.
+        if since is None:
+            return df
+        before = len(df)
+        df = df[df["report_date"] > pd.Timestamp(since)]
+        logger.info(f"{label}: Skipped {before - len(df)} records at or before watermark {since}.")
+        return df
@@ -0,0 +1,187 @@
+# etl/file_source.py
+
+import gzip
+import io
+import json
+import os
+from datetime import datetime
+
+from etl import run_metrics
+from etl.schema import SCHEMAS
+from utils.logger import get_logger
+
+logger = get_logger("FileSource")
+
+FILE_FORMATS = ("csv", "ndjson", "json")
+EXTENSIONS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson", ".json": "json"}
+DEFAULT_FILE_CHUNK_SIZE = 50000
+JSON_READ_SIZE = 2 ** 20
+# Longest a single JSON-array record may be (characters); a record that still
+# does not decode at this size is malformed, not just split across reads.
+MAX_JSON_RECORD_SIZE = 2 ** 24
+
+# Our World in Data column names that differ from ours; every other source
+# column maps onto the schema column of the same name.
+OWID_COLUMNS = {"location": "country_name", "date": "report_date"}
+# OWID's continent, income-group and world rows carry iso_codes like OWID_WRL.
+AGGREGATE_PREFIX = "OWID_"
+ISO_CODE = "iso_code"
+SCHEMA_COLUMNS = {column for schema in SCHEMAS.values() for column in schema.column_names}
+
+
+def detect_format(path):
+    name = path.lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    file_format = EXTENSIONS.get(os.path.splitext(name)[1])
+    if file_format is None:
+        raise ValueError(f"Cannot tell the format of '{path}' from its extension; "
+                         f"specify one of {', '.join(FILE_FORMATS)}.")
+    return file_format
+
+
+def iter_json_array(stream, read_size=JSON_READ_SIZE, max_record_size=MAX_JSON_RECORD_SIZE):
+    # Records of a top-level JSON array, decoded one at a time from a text
+    # stream, so only about read_size characters (at most max_record_size for
+    # one record) are held at once.
+    decoder = json.JSONDecoder()
+    buffer = ""
+    while not buffer:
+        # Leading whitespace may fill whole reads.
+        block = stream.read(read_size)
+        if not block:
+            break
+        buffer = block.lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("JSON input must be a top-level array of records (use ndjson for one record per line).")
+    position = 1
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if position == len(buffer):
+            buffer, position = stream.read(read_size), 0
+            if not buffer:
+                raise ValueError("JSON array is not terminated.")
+            continue
+        if buffer[position] == "]":
+            return
+        try:
+            record, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError as e:
+            # The record continues in the next block, unless it is malformed.
+            if len(buffer) - position >= max_record_size:
+                raise ValueError(f"Malformed JSON record (no valid record within {max_record_size:,} "
+                                 f"characters): {e.msg}") from e
+            more = stream.read(read_size)
+            if not more:
+                raise
+            buffer, position = buffer[position:] + more, 0
+            continue
+        yield record
+        position = end
+
+
+class FileSource:
+    # File counterpart of APIClient for backfills from local dumps: streams a
+    # CSV, NDJSON or JSON-array file (optionally gzipped) in chunks of
+    # chunk_size rows, renames source columns onto the table schemas and
+    # yields (table_name, frame) batches for the streaming pipeline. One file
+    # can feed several tables: an OWID file has both case and vaccination
+    # columns. Reading is recorded as the run's fetch stage. pandas is imported
+    # by the methods so the CLI can read FILE_FORMATS without it.
+
+    def __init__(self, path, file_format=None, column_map=None, chunk_size=DEFAULT_FILE_CHUNK_SIZE,
+                 countries=None, keep_aggregates=False):
+        self.path = path
+        self.file_format = file_format or detect_format(path)
+        if self.file_format not in FILE_FORMATS:
+            raise ValueError(f"Unknown file format '{self.file_format}'; expected one of {', '.join(FILE_FORMATS)}.")
+        self.column_map = {**OWID_COLUMNS, **(column_map or {})}
+        unknown = sorted(set(self.column_map.values()) - SCHEMA_COLUMNS)
+        if unknown:
+            raise ValueError(f"Cannot map onto unknown column(s): {', '.join(unknown)}.")
+        self.chunk_size = chunk_size
+        self.countries = {country.lower() for country in countries} if countries else None
+        self.keep_aggregates = keep_aggregates
+        self.rows_read = 0
+        self.rows_skipped = 0
+        self.bytes_read = 0
+
+    def batches(self, tables=None):
+        # tables: the tables to load; by default every table whose required
+        # columns the file has.
+        import pandas as pd
+        ingested_at = pd.Timestamp(datetime.now().replace(microsecond=0))
+        for chunk in self._chunks():
+            chunk = self._select_rows(chunk.rename(columns=self.column_map))
+            targets = tables or [name for name, schema in SCHEMAS.items()
+                                 if all(column in chunk for column in schema.required)]
+            for table_name in targets:
+                frame = self._project(chunk, table_name, ingested_at)
+                if not frame.empty:
+                    yield table_name, frame
+
+    def _chunks(self):
+        with open(self.path, "rb") as raw:
+            binary = gzip.GzipFile(fileobj=raw) if self.path.lower().endswith(".gz") else raw
+            with io.TextIOWrapper(binary, encoding="utf-8", newline="") as text:
+                reader = self._reader(text)
+                while True:
+                    with run_metrics.timed("fetch"):
+                        chunk = next(reader, None)
+                    if chunk is None:
+                        break
+                    # Bytes of the file on disk (compressed, for .gz) consumed so far.
+                    position = raw.tell()
+                    run_metrics.count("bytes_fetched", position - self.bytes_read)
+                    run_metrics.count("rows_fetched", len(chunk))
+                    self.bytes_read = position
+                    self.rows_read += len(chunk)
+                    logger.info(f"{self.path}: read {self.rows_read} rows ({position / 2 ** 20:.1f} MB).")
+                    yield chunk
+
+    def _reader(self, text):
+        import pandas as pd
+        if self.file_format == "csv":
+            # Only columns that map onto a schema are parsed.
+            return iter(pd.read_csv(text, chunksize=self.chunk_size, usecols=self._wanted, low_memory=False))
+        if self.file_format == "ndjson":
+            # Values stay as read; the transformer does all the casting.
+            return iter(pd.read_json(text, lines=True, chunksize=self.chunk_size, dtype=False,
+                                     convert_dates=False))
+        return self._json_array_chunks(text)
+
+    def _wanted(self, column):
+        return self.column_map.get(column, column) in SCHEMA_COLUMNS or column == ISO_CODE
+
+    def _json_array_chunks(self, text):
+        import pandas as pd
+        records = []
+        for record in iter_json_array(text):
+            records.append(record)
+            if len(records) == self.chunk_size:
+                yield pd.DataFrame(records)
+                records = []
+        if records:
+            yield pd.DataFrame(records)
+
+    def _select_rows(self, chunk):
+        import pandas as pd
+        keep = pd.Series(True, index=chunk.index)
+        if not self.keep_aggregates and ISO_CODE in chunk:
+            keep &= ~chunk[ISO_CODE].astype("string").str.startswith(AGGREGATE_PREFIX).fillna(False)
+        if self.countries is not None and "country_name" in chunk:
+            keep &= chunk["country_name"].astype("string").str.lower().isin(self.countries).fillna(False)
+        self.rows_skipped += int((~keep).sum())
+        return chunk[keep]
+
+    @staticmethod
+    def _project(chunk, table_name, ingested_at):
+        # Rows with no value in any of the table's metrics carry nothing for
+        # it (e.g. vaccination columns before 2021 in an OWID file).
+        schema = SCHEMAS[table_name]
+        metrics = [column for column in schema.metric_columns if column in chunk]
+        frame = chunk[chunk[metrics].notna().any(axis=1)].reindex(columns=schema.column_names)
+        if "etl_timestamp" not in chunk:
+            frame["etl_timestamp"] = ingested_at
+        return frame
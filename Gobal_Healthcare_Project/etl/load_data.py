@@ -1,31 +1,96 @@
 # etl/load_data.py
 
-import logging
+from etl import run_metrics
+from etl.bulk_loader import DEFAULT_CHUNK_SIZE
+from utils.logger import get_logger
+
+logger = get_logger("DataLoader")
+
+LOAD_MODES = ("ignore", "upsert")
+LABELS = {"daily_cases": "cases", "vaccination_data": "vaccination"}
 
-logging.basicConfig(
-    filename='etl.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
 
 class DataLoader:
-    def __init__(self, db_handler):
+    def __init__(self, db_handler, watermarks=None, mode="ignore", chunk_size=DEFAULT_CHUNK_SIZE,
+                 use_load_data=False, rollups=None):
         self.db_handler = db_handler
+        self.watermarks = watermarks
+        self.mode = mode
+        # Chunked, checkpointed loads are MySQL-specific; other storage
+        # backends take the whole batch through insert_data().
+        self.bulk_loader = None
+        if db_handler.dialect == "mysql":
+            from etl.bulk_loader import BulkLoader
+            self.bulk_loader = BulkLoader(db_handler, chunk_size=chunk_size, use_load_data=use_load_data, mode=mode,
+                                          rollups=rollups)
+        self.totals = {}
+        self.failures = []
+        self._failed = set()
+        self._pending_marks = {}
 
     def load_cases(self, cases_data):
-        record_count = len(cases_data)
-        logging.info(f"Loading {record_count} records into 'daily_cases' table.")
-        try:
-            self.db_handler.insert_data("daily_cases", cases_data)
-            logging.info("Successfully loaded cases data.")
-        except Exception as e:
-            logging.error(f"Error loading cases data: {e}")
+        self.load("daily_cases", cases_data)
 
     def load_vaccinations(self, vacc_data):
-        record_count = len(vacc_data)
-        logging.info(f"Loading {record_count} records into 'vaccination_data' table.")
+        self.load("vaccination_data", vacc_data)
+
+    def load(self, table_name, records):
+        label = LABELS.get(table_name, table_name)
+        record_count = len(records)
+        logger.info(f"Loading {record_count} records into '{table_name}' table.")
+        if record_count == 0:
+            logger.warning(f"No records to insert into `{table_name}`.")
+            return True
         try:
-            self.db_handler.insert_data("vaccination_data", vacc_data)
-            logging.info("Successfully loaded vaccination data.")
+            with run_metrics.timed("load"):
+                if self.bulk_loader is not None:
+                    counts = self.bulk_loader.load(table_name, records)
+                else:
+                    counts = self.db_handler.insert_data(table_name, records, self.mode)
+            run_metrics.count("rows_affected", counts.get("loaded", 0) + counts.get("updated", 0))
+            self._record_counts(table_name, counts)
+            self._track_watermark(table_name, records)
+            logger.info(f"Successfully loaded {label} data.")
+            return True
         except Exception as e:
-            logging.error(f"Error loading vaccination data: {e}")
+            # Committed chunks stay in place and the affected countries'
+            # watermarks are held back, so the next run re-fetches this batch
+            # and resumes after them.
+            self.failures.append((table_name, str(e)))
+            for country in records["country_name"].unique():
+                self.mark_failed(table_name, country)
+            logger.error(f"Error loading {label} data: {e}")
+            return False
+
+    def mark_failed(self, table_name, country):
+        self._failed.add((table_name, str(country).lower()))
+
+    def commit_watermarks(self):
+        # Batches can arrive out of date order (shards, pages), so marks are
+        # only advanced once a run is over, and never for a (table, country)
+        # that had a failed batch.
+        if self.watermarks is None:
+            return
+        import pandas as pd
+        for table_name, frames in self._pending_marks.items():
+            latest = pd.concat(frames, ignore_index=True)
+            latest["country_name"] = latest["country_name"].astype(str)
+            failed = {country for table, country in self._failed if table == table_name}
+            latest = latest[~latest["country_name"].str.lower().isin(failed)]
+            if not latest.empty:
+                self.watermarks.advance(table_name, latest)
+        self._pending_marks = {}
+
+    def _record_counts(self, table_name, counts):
+        totals = self.totals.setdefault(table_name, {"loaded": 0, "updated": 0, "unchanged": 0})
+        for key in totals:
+            totals[key] += counts.get(key, 0)
+
+    def _track_watermark(self, table_name, records):
+        if self.watermarks is None:
+            return
+        latest = records.groupby("country_name", observed=True).agg(
+            report_date=("report_date", "max"),
+            etl_timestamp=("etl_timestamp", "max")
+        ).reset_index()
+        self._pending_marks.setdefault(table_name, []).append(latest)
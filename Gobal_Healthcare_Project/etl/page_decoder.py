@@ -0,0 +1,86 @@
+# etl/page_decoder.py
+
+import json
+from functools import lru_cache
+from operator import attrgetter
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from etl.schema import COUNT, CATEGORY
+
+# Optional faster decoders, used when installed: msgspec decodes a page into
+# slotted records holding only the schema's fields (other keys are skipped
+# while parsing); orjson parses the same dicts as json, faster.
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+DECODERS = tuple(name for name, module in (("msgspec", msgspec), ("orjson", orjson), ("json", json)) if module)
+DEFAULT_DECODER = DECODERS[0]
+
+
+def decode_page(body, schema, decoder=DEFAULT_DECODER):
+    # API page body (bytes) -> (DataFrame of the schema's columns, next page
+    # cursor). Records only live while their page is decoded: the frame holds
+    # clean metric columns as float64 and country names as a categorical, and
+    # leaves anything that does not parse as the raw values, so validation
+    # still sees what the API sent.
+    if decoder == "msgspec":
+        records, cursor = _msgspec_decoder(tuple(schema.column_names)).decode(body) or [], None
+        if not isinstance(records, list):
+            records, cursor = records.data or records.results or [], records.next_cursor or records.next
+        columns = {column: list(map(attrgetter(column), records)) for column in schema.column_names}
+    else:
+        payload = orjson.loads(body) if decoder == "orjson" else json.loads(body)
+        records, cursor = _unpack(payload)
+        columns = {column: [record.get(column) for record in records] for column in schema.column_names}
+    return to_frame(columns, schema, len(records)), cursor
+
+
+def to_frame(columns, schema, length):
+    data = {}
+    for column, dtype in schema.columns.items():
+        values = columns.get(column, ())
+        if len(values) != length:
+            values = [None] * length
+        data[column] = _column(values, dtype)
+    return pd.DataFrame(data, index=pd.RangeIndex(length))
+
+
+def _column(values, dtype):
+    if dtype == COUNT:
+        try:
+            return np.array(values, dtype=np.float64)
+        except (TypeError, ValueError):
+            pass
+    elif dtype == CATEGORY:
+        return pd.Categorical(values)
+    return np.array(values, dtype=object)
+
+
+def _unpack(payload):
+    # Plain JSON arrays use offset/limit paging; envelope responses may
+    # carry a cursor for the next page instead.
+    if isinstance(payload, dict):
+        records = payload.get("data") or payload.get("results") or []
+        return records, payload.get("next_cursor") or payload.get("next")
+    return payload or [], None
+
+
+@lru_cache(maxsize=None)
+def _msgspec_decoder(column_names):
+    # Fields are typed Any so unparseable values reach validation instead of
+    # failing the whole page.
+    record = msgspec.defstruct("Record", [(column, Any, None) for column in column_names])
+    envelope = msgspec.defstruct("Envelope", [
+        ("data", Optional[list[record]], None), ("results", Optional[list[record]], None),
+        ("next_cursor", Any, None), ("next", Any, None),
+    ])
+    return msgspec.json.Decoder(Optional[list[record] | envelope])
@@ -0,0 +1,151 @@
+# etl/pipeline.py
+
+import queue
+import threading
+import time
+from utils.logger import get_logger
+
+logger = get_logger("StreamingPipeline")
+
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_QUEUE_SIZE = 2
+_DONE = object()
+
+
+class PipelineAborted(Exception):
+    pass
+
+
+class StreamingPipeline:
+    # API page (or file chunk) -> DataTransformer -> DataLoader as three
+    # overlapping stages connected by bounded queues. At most queue_size
+    # batches wait between stages, so peak memory depends on batch_size, not
+    # on the history length.
+
+    def __init__(self, api_client, transformer, loader, batch_size=DEFAULT_BATCH_SIZE,
+                 queue_size=DEFAULT_QUEUE_SIZE):
+        self.api_client = api_client
+        self.transformer = transformer
+        self.loader = loader
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+
+    def run(self, table_name, endpoint, country, start_date, end_date, since=None):
+        def batches():
+            pages = self.api_client.fetch_pages(endpoint, country, start_date, end_date, page_size=self.batch_size)
+            for batch in rebatch(pages, self.batch_size):
+                yield table_name, batch
+
+        return self.run_batches(batches(), since, description=f"{endpoint} for {country}")
+
+    def run_batches(self, batches, since=None, description="batches"):
+        # batches: any iterable of (table_name, records), e.g. API pages or the
+        # chunks of a local file (etl/file_source.py); it is consumed on the
+        # extract thread.
+        raw_batches = queue.Queue(maxsize=self.queue_size)
+        frames = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        errors = []
+
+        def extract():
+            for item in batches:
+                self._put(raw_batches, item, stop)
+
+        def transform():
+            while True:
+                item = self._get(raw_batches, stop)
+                if item is _DONE:
+                    break
+                table_name, batch = item
+                self._put(frames, (table_name, self.transformer.transform(table_name, batch, since)), stop)
+
+        stages = [
+            self._start_stage("extract", extract, raw_batches, stop, errors),
+            self._start_stage("transform", transform, frames, stop, errors),
+        ]
+
+        started = time.perf_counter()
+        count = rows = 0
+        try:
+            while True:
+                item = self._get(frames, stop)
+                if item is _DONE:
+                    break
+                table_name, frame = item
+                if not self.loader.load(table_name, frame):
+                    raise PipelineAborted(f"load of batch {count + 1} into `{table_name}` failed")
+                count += 1
+                rows += len(frame)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            stop.set()
+            for stage in stages:
+                stage.join()
+
+        elapsed = time.perf_counter() - started
+        if errors:
+            logger.error(f"Streaming {description} stopped after {count} batch(es): {errors[0]}")
+            raise errors[0]
+        logger.info(f"Streamed {rows} rows of {description} in {count} batch(es), {elapsed:.2f}s.")
+        return rows
+
+    def _start_stage(self, name, target, output, stop, errors):
+        def runner():
+            try:
+                target()
+            except PipelineAborted:
+                pass
+            except Exception as e:
+                logger.error(f"Streaming pipeline stage '{name}' failed: {e}")
+                errors.append(e)
+                stop.set()
+            finally:
+                self._put(output, _DONE, stop, force=True)
+
+        thread = threading.Thread(target=runner, name=f"pipeline-{name}", daemon=True)
+        thread.start()
+        return thread
+
+    @staticmethod
+    def _put(q, item, stop, force=False):
+        # Blocks while the downstream stage is busy (back-pressure), but gives
+        # up once the pipeline is stopping so no stage waits forever.
+        while True:
+            if stop.is_set() and not force:
+                raise PipelineAborted()
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if stop.is_set():
+                    return
+
+    @staticmethod
+    def _get(q, stop):
+        while True:
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                if stop.is_set():
+                    raise PipelineAborted()
+
+
+def rebatch(pages, batch_size):
+    # Regroups pages of any size (record lists or DataFrames) into batches of
+    # exactly batch_size records.
+    buffer = None
+    for page in pages:
+        buffer = page if buffer is None else _join(buffer, page)
+        while len(buffer) >= batch_size:
+            yield buffer[:batch_size]
+            buffer = buffer[batch_size:]
+    if buffer is not None and len(buffer):
+        yield buffer
+
+
+def _join(first, second):
+    if isinstance(first, list):
+        return first + second
+    import pandas as pd
+    return pd.concat([first, second], ignore_index=True)
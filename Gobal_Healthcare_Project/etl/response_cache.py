@@ -0,0 +1,144 @@
+# etl/response_cache.py
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from utils.logger import get_logger
+
+logger = get_logger("ResponseCache")
+
+DEFAULT_CACHE_DIR = os.path.join("cache", "http")
+DEFAULT_TTL_SECONDS = 300
+DEFAULT_MAX_AGE_DAYS = 7
+DEFAULT_MAX_SIZE_MB = 512
+EVICTION_INTERVAL_SECONDS = 60
+
+
+class CachedResponse:
+    def __init__(self, cache, key, meta):
+        self.cache = cache
+        self.key = key
+        self.meta = meta
+
+    @property
+    def is_fresh(self):
+        return time.time() - self.meta["stored_at"] < self.cache.ttl_seconds
+
+    def conditional_headers(self):
+        headers = {}
+        if self.meta.get("etag"):
+            headers["If-None-Match"] = self.meta["etag"]
+        if self.meta.get("last_modified"):
+            headers["If-Modified-Since"] = self.meta["last_modified"]
+        return headers
+
+    def body(self):
+        with gzip.open(self.cache._body_path(self.key), "rb") as f:
+            return f.read()
+
+
+class ResponseCache:
+    # On-disk cache of raw API response bodies, keyed by URL and query
+    # parameters. Bodies are stored gzip-compressed next to a small metadata
+    # file holding the validators (ETag / Last-Modified) used to revalidate.
+    # Entries within ttl_seconds are served without a request; older ones are
+    # revalidated. Entries unused for max_age_days, or beyond max_size_mb in
+    # total (least recently used first), are evicted.
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttl_seconds=DEFAULT_TTL_SECONDS,
+                 max_age_days=DEFAULT_MAX_AGE_DAYS, max_size_mb=DEFAULT_MAX_SIZE_MB):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_age_seconds = max_age_days * 86400
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._last_eviction = 0.0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(url, params=None):
+        canonical = json.dumps([url, sorted((params or {}).items())], default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, url, params=None):
+        key = self.make_key(url, params)
+        try:
+            with open(self._meta_path(key), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(self._body_path(key)):
+            return None
+        os.utime(self._meta_path(key))  # last access, for LRU eviction
+        return CachedResponse(self, key, meta)
+
+    def store(self, url, params, body, headers):
+        key = self.make_key(url, params)
+        meta = {
+            "url": url,
+            "params": params,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "stored_at": time.time(),
+        }
+        with self._lock:
+            self._atomic_write(self._body_path(key), gzip.compress(body))
+            self._atomic_write(self._meta_path(key), json.dumps(meta, default=str).encode("utf-8"))
+            if time.time() - self._last_eviction > EVICTION_INTERVAL_SECONDS:
+                self.evict()
+
+    def revalidated(self, entry):
+        # A 304 proves the cached body is current; restart its TTL.
+        entry.meta["stored_at"] = time.time()
+        with self._lock:
+            self._atomic_write(self._meta_path(entry.key), json.dumps(entry.meta, default=str).encode("utf-8"))
+
+    def evict(self):
+        now = time.time()
+        self._last_eviction = now
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".meta.json"):
+                continue
+            key = name[:-len(".meta.json")]
+            try:
+                last_used = os.path.getmtime(self._meta_path(key))
+                size = os.path.getsize(self._body_path(key))
+            except OSError:
+                self._remove(key)
+                continue
+            if now - last_used > self.max_age_seconds:
+                self._remove(key)
+                continue
+            entries.append((last_used, size, key))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(key)
+            total -= size
+
+    def _remove(self, key):
+        for path in (self._meta_path(key), self._body_path(key)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        logger.info(f"ResponseCache: evicted {key[:12]}.")
+
+    def _body_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.body.gz")
+
+    def _meta_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.meta.json")
+
+    @staticmethod
+    def _atomic_write(path, data):
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
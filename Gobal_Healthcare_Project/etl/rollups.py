@@ -0,0 +1,196 @@
+# etl/rollups.py
+
+from etl.schema import SCHEMAS
+from utils.logger import get_logger
+
+logger = get_logger("RollupStore")
+
+PERIODS = ("week", "month")
+
+# SQL expression for the first day of each period containing report_date.
+PERIOD_START_SQL = {
+    "week": "DATE_SUB(report_date, INTERVAL WEEKDAY(report_date) DAY)",
+    "month": "DATE_SUB(report_date, INTERVAL DAYOFMONTH(report_date) - 1 DAY)",
+}
+
+
+# One row per fact table whose rollup and summary tables have been fully
+# rebuilt from it; from then on the loader keeps them complete.
+ROLLUP_STATE_TABLE = "etl_rollup_state"
+
+CREATE_ROLLUP_STATE = f"""
+    CREATE TABLE IF NOT EXISTS {ROLLUP_STATE_TABLE} (
+        table_name VARCHAR(64) NOT NULL PRIMARY KEY,
+        rebuilt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+def rollup_table(table_name):
+    return f"{table_name}_rollup"
+
+
+def summary_table(table_name):
+    return f"{table_name}_summary"
+
+
+def summary_available(db_handler, table_name):
+    # Readers use the rollup and summary tables only after a full rebuild;
+    # incremental refreshes alone cover just the periods and countries they
+    # touched. Otherwise they fall back to aggregating the fact table. Only
+    # MySQL keeps rollup tables.
+    if db_handler.dialect != "mysql":
+        return False
+    try:
+        return bool(db_handler.run_query(
+            f"SELECT 1 FROM {ROLLUP_STATE_TABLE} WHERE table_name = %s", (table_name,)))
+    except Exception:
+        return False
+
+
+def _aggregate_columns(metrics):
+    return [f"sum_{m}" for m in metrics] + [f"max_{m}" for m in metrics]
+
+
+def _period_bounds(dates, period):
+    # Weeks run Monday to Sunday.
+    periods = dates.dt.to_period("W-SUN" if period == "week" else "M")
+    return periods.dt.start_time, periods.dt.end_time.dt.normalize()
+
+
+class RollupStore:
+    # Per-table summary tables kept in step with the fact tables by the loader:
+    #   <table>_rollup   one row per (period, period_start, country) with the
+    #                    day count and SUM / MAX of every metric, for weeks and
+    #                    months;
+    #   <table>_summary  one row per country with all-time SUM / MAX and the
+    #                    latest snapshot of every metric.
+    # refresh() recomputes only the periods a chunk touched, in the chunk's
+    # own transaction, and rebuilds the summary rows from the monthly rollup,
+    # so leaderboard and map queries read O(countries) rows. A table that has
+    # never been rebuilt (new rollup tables next to existing fact data) is
+    # rebuilt here once, before the first refresh.
+
+    def __init__(self, db_handler):
+        self.db_handler = db_handler
+        self.db_handler.execute(CREATE_ROLLUP_STATE)
+        for table_name in SCHEMAS:
+            for statement in create_rollup_tables(table_name):
+                self.db_handler.execute(statement)
+        for table_name in SCHEMAS:
+            if not summary_available(self.db_handler, table_name):
+                self.rebuild(table_name)
+
+    def refresh(self, cursor, table_name, chunk):
+        spans = chunk.groupby("country_name", observed=True)["report_date"].agg(["min", "max"]).reset_index()
+        if spans.empty:
+            return
+        for period in PERIODS:
+            first, _ = _period_bounds(spans["min"], period)
+            _, last = _period_bounds(spans["max"], period)
+            for country, start, end in zip(spans["country_name"].astype(str), first, last):
+                self._refresh_periods(cursor, table_name, period, country, start.date(), end.date())
+        self._refresh_summary(cursor, table_name, list(spans["country_name"].astype(str)))
+
+    def rebuild(self, table_name):
+        # Full recompute from the fact table; marks the summaries complete.
+        with self.db_handler.transaction() as cursor:
+            cursor.execute(f"DELETE FROM {rollup_table(table_name)}")
+            cursor.execute(f"DELETE FROM {summary_table(table_name)}")
+            for period in PERIODS:
+                self._refresh_periods(cursor, table_name, period)
+            cursor.execute(f"SELECT DISTINCT country_name FROM {rollup_table(table_name)}")
+            countries = [row[0] for row in cursor.fetchall()]
+            if countries:
+                self._refresh_summary(cursor, table_name, countries)
+            cursor.execute(
+                f"INSERT INTO {ROLLUP_STATE_TABLE} (table_name) VALUES (%s) "
+                f"ON DUPLICATE KEY UPDATE rebuilt_at = CURRENT_TIMESTAMP",
+                (table_name,)
+            )
+        logger.info(f"Rebuilt rollups for {table_name}: {len(countries)} countries.")
+        return len(countries)
+
+    def _refresh_periods(self, cursor, table_name, period, country=None, start=None, end=None):
+        metrics = SCHEMAS[table_name].metric_columns
+        period_start = PERIOD_START_SQL[period]
+        values = ["first_report_date", "last_report_date", "days"] + _aggregate_columns(metrics)
+        columns = ", ".join(["period", "period_start", "country_name"] + values)
+        aggregates = ", ".join([f"SUM({m})" for m in metrics] + [f"MAX({m})" for m in metrics])
+        updates = ", ".join(f"{column} = VALUES({column})" for column in values)
+        where, params = "", [period]
+        if country is not None:
+            where = "WHERE country_name = %s AND report_date BETWEEN %s AND %s"
+            params += [country, start, end]
+        cursor.execute(
+            f"""
+            INSERT INTO {rollup_table(table_name)} ({columns})
+            SELECT %s, {period_start}, country_name, MIN(report_date), MAX(report_date), COUNT(*), {aggregates}
+            FROM {table_name}
+            {where}
+            GROUP BY {period_start}, country_name
+            ON DUPLICATE KEY UPDATE {updates}
+            """,
+            params
+        )
+
+    def _refresh_summary(self, cursor, table_name, countries):
+        metrics = SCHEMAS[table_name].metric_columns
+        placeholders = ", ".join(["%s"] * len(countries))
+        values = ["first_report_date", "last_report_date", "days"] + _aggregate_columns(metrics)
+        columns = ", ".join(["country_name"] + values)
+        aggregates = ", ".join([f"SUM(sum_{m})" for m in metrics] + [f"MAX(max_{m})" for m in metrics])
+        updates = ", ".join(f"{column} = VALUES({column})" for column in values)
+        cursor.execute(
+            f"""
+            INSERT INTO {summary_table(table_name)} ({columns})
+            SELECT country_name, MIN(first_report_date), MAX(last_report_date), SUM(days), {aggregates}
+            FROM {rollup_table(table_name)}
+            WHERE period = 'month' AND country_name IN ({placeholders})
+            GROUP BY country_name
+            ON DUPLICATE KEY UPDATE {updates}
+            """,
+            countries
+        )
+        latest = ", ".join(f"s.latest_{m} = t.{m}" for m in metrics)
+        cursor.execute(
+            f"""
+            UPDATE {summary_table(table_name)} s
+            JOIN {table_name} t
+              ON t.country_name = s.country_name AND t.report_date = s.last_report_date
+            SET {latest}
+            WHERE s.country_name IN ({placeholders})
+            """,
+            countries
+        )
+
+
+def create_rollup_tables(table_name):
+    metrics = SCHEMAS[table_name].metric_columns
+    sums = "".join(f"        sum_{m} BIGINT,\n" for m in metrics)
+    maxes = "".join(f"        max_{m} BIGINT,\n" for m in metrics)
+    latest = "".join(f"        latest_{m} BIGINT,\n" for m in metrics)
+    return [
+        f"""
+    CREATE TABLE IF NOT EXISTS {rollup_table(table_name)} (
+        period ENUM('week', 'month') NOT NULL,
+        period_start DATE NOT NULL,
+        country_name VARCHAR(255) NOT NULL,
+        first_report_date DATE NOT NULL,
+        last_report_date DATE NOT NULL,
+        days INT NOT NULL,
+{sums}{maxes}        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (period, country_name, period_start)
+    )
+""",
+        f"""
+    CREATE TABLE IF NOT EXISTS {summary_table(table_name)} (
+        country_name VARCHAR(255) NOT NULL,
+        first_report_date DATE NOT NULL,
+        last_report_date DATE NOT NULL,
+        days INT NOT NULL,
+{sums}{maxes}{latest}        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (country_name)
+    )
+""",
+    ]
@@ -0,0 +1,286 @@
+# etl/run_metrics.py
+
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+from utils.logger import get_logger
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = get_logger("RunMetrics")
+
+STAGES = ("fetch", "transform", "load")
+# rows_dropped: rows rejected by validation; rows_skipped: rows already
+# loaded (at or before the watermark) on incremental runs.
+COUNTERS = ("rows_fetched", "rows_transformed", "rows_dropped", "rows_skipped", "bytes_fetched", "rows_affected")
+SUCCESS = "success"
+PARTIAL = "partial"
+FAILED = "failed"
+
+RUN_COLUMNS = (["run_id", "command", "status", "started_at", "finished_at", "duration_seconds"]
+               + [f"{stage}_seconds" for stage in STAGES] + list(COUNTERS) + ["peak_rss_mb"])
+
+CREATE_RUNS_TABLE = {
+    "mysql": """
+        CREATE TABLE IF NOT EXISTS etl_runs (
+            run_id CHAR(32) NOT NULL PRIMARY KEY,
+            command VARCHAR(64) NOT NULL,
+            status VARCHAR(16) NOT NULL,
+            started_at DATETIME NOT NULL,
+            finished_at DATETIME NULL,
+            duration_seconds DOUBLE,
+            fetch_seconds DOUBLE,
+            transform_seconds DOUBLE,
+            load_seconds DOUBLE,
+            rows_fetched BIGINT,
+            rows_transformed BIGINT,
+            rows_dropped BIGINT,
+            rows_skipped BIGINT,
+            bytes_fetched BIGINT,
+            rows_affected BIGINT,
+            peak_rss_mb DOUBLE,
+            KEY idx_etl_runs_started (started_at)
+        )
+    """,
+    "duckdb": """
+        CREATE TABLE IF NOT EXISTS etl_runs (
+            run_id VARCHAR NOT NULL PRIMARY KEY,
+            command VARCHAR NOT NULL,
+            status VARCHAR NOT NULL,
+            started_at TIMESTAMP NOT NULL,
+            finished_at TIMESTAMP,
+            duration_seconds DOUBLE,
+            fetch_seconds DOUBLE,
+            transform_seconds DOUBLE,
+            load_seconds DOUBLE,
+            rows_fetched BIGINT,
+            rows_transformed BIGINT,
+            rows_dropped BIGINT,
+            rows_skipped BIGINT,
+            bytes_fetched BIGINT,
+            rows_affected BIGINT,
+            peak_rss_mb DOUBLE
+        )
+    """,
+}
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return round(peak / (2 ** 20 if sys.platform == "darwin" else 2 ** 10), 1)
+
+
+class RunMetrics:
+    # Measurements of one ETL run. Stage times are summed over every call in
+    # every thread, so with parallel chains they can exceed the wall time;
+    # they show where the work went (API, pandas or database), not the
+    # critical path.
+
+    def __init__(self, command):
+        self.run_id = uuid.uuid4().hex
+        self.command = command
+        self.status = None
+        self.started_at = datetime.now().replace(microsecond=0)
+        self.finished_at = None
+        self.duration_seconds = None
+        self.stage_seconds = dict.fromkeys(STAGES, 0.0)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.peak_rss_mb = None
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add_time(self, stage, seconds):
+        with self._lock:
+            self.stage_seconds[stage] += seconds
+
+    def count(self, counter, amount):
+        with self._lock:
+            self.counters[counter] += int(amount)
+
+    def finish(self, status):
+        self.status = status
+        self.finished_at = datetime.now().replace(microsecond=0)
+        self.duration_seconds = time.perf_counter() - self._started
+        self.peak_rss_mb = peak_rss_mb()
+
+    def as_row(self):
+        row = {"run_id": self.run_id, "command": self.command, "status": self.status,
+               "started_at": self.started_at, "finished_at": self.finished_at,
+               "duration_seconds": self.duration_seconds, "peak_rss_mb": self.peak_rss_mb}
+        row.update({f"{stage}_seconds": seconds for stage, seconds in self.stage_seconds.items()})
+        row.update(self.counters)
+        return row
+
+    def summary(self):
+        stages = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in self.stage_seconds.items())
+        return (f"{self.command} {self.status} in {self.duration_seconds:.2f}s ({stages}); "
+                f"{self.counters['rows_fetched']:,} rows fetched, {self.counters['rows_dropped']:,} dropped, "
+                f"{self.counters['rows_skipped']:,} skipped, "
+                f"{self.counters['rows_affected']:,} affected, {self.counters['bytes_fetched'] / 2 ** 20:.1f} MB "
+                f"fetched, peak RSS {self.peak_rss_mb} MB.")
+
+
+# The run being recorded in this process, if any. The fetch, transform and
+# load code report into it from whichever thread they run on; with no active
+# run (benchmarks, the dashboard) the calls below do nothing.
+_active = None
+
+
+def start_run(command):
+    global _active
+    _active = RunMetrics(command)
+    return _active
+
+
+def end_run(status):
+    global _active
+    run, _active = _active, None
+    if run is not None:
+        run.finish(status)
+    return run
+
+
+def count(counter, amount):
+    run = _active
+    if run is not None:
+        run.count(counter, amount)
+
+
+@contextmanager
+def timed(stage):
+    run = _active
+    if run is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        run.add_time(stage, time.perf_counter() - started)
+
+
+class RunStore:
+    # etl_runs: one row per recorded run, in the same store as the data.
+
+    def __init__(self, db_handler):
+        self.db_handler = db_handler
+        self.db_handler.execute(CREATE_RUNS_TABLE[db_handler.dialect])
+        self._add_missing_columns()
+
+    def _add_missing_columns(self):
+        # etl_runs tables created before a counter existed get its column.
+        _, columns = self.db_handler.run_query_with_columns("SELECT * FROM etl_runs LIMIT 0")
+        for counter in COUNTERS:
+            if counter not in columns:
+                logger.info(f"Adding {counter} column to etl_runs.")
+                self.db_handler.execute(f"ALTER TABLE etl_runs ADD COLUMN {counter} BIGINT")
+
+    def save(self, run):
+        row = run.as_row()
+        self.db_handler.execute(
+            f"INSERT INTO etl_runs ({', '.join(RUN_COLUMNS)}) VALUES ({', '.join(['%s'] * len(RUN_COLUMNS))})",
+            tuple(row[column] for column in RUN_COLUMNS)
+        )
+        logger.info(f"Run {run.run_id}: {run.summary()}")
+
+    def recent(self, limit=20, command=None):
+        import pandas as pd
+        sql = f"SELECT {', '.join(RUN_COLUMNS)} FROM etl_runs"
+        params = []
+        if command:
+            sql += " WHERE command = %s"
+            params.append(command)
+        sql += " ORDER BY started_at DESC LIMIT %s"
+        params.append(int(limit))
+        return pd.DataFrame(self.db_handler.run_query(sql, tuple(params)), columns=RUN_COLUMNS)
+
+    def latest_per_command(self):
+        import pandas as pd
+        rows = self.db_handler.run_query(
+            f"SELECT {', '.join(f'r.{column}' for column in RUN_COLUMNS)} FROM etl_runs r "
+            f"WHERE r.started_at = (SELECT MAX(started_at) FROM etl_runs WHERE command = r.command)"
+        )
+        return pd.DataFrame(rows, columns=RUN_COLUMNS).drop_duplicates("command")
+
+    def status_counts(self):
+        rows = self.db_handler.run_query("SELECT command, status, COUNT(*) FROM etl_runs GROUP BY command, status")
+        return [(command, status, int(total)) for command, status, total in rows]
+
+
+def percentiles(runs, quantiles=(0.5, 0.9, 0.99)):
+    import pandas as pd
+    columns = ["duration_seconds"] + [f"{stage}_seconds" for stage in STAGES]
+    values = runs[columns].apply(pd.to_numeric, errors="coerce")
+    return values.quantile(list(quantiles)).T
+
+
+def _labels(**labels):
+    escaped = {key: str(value).replace("\\", "\\\\").replace('"', '\\"') for key, value in labels.items()}
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped.items()) + "}"
+
+
+def _number(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def prometheus_text(store):
+    # Text exposition format: the latest run of each command as gauges plus
+    # run counts per command and status, for node_exporter's textfile
+    # collector or any scraper reading the file.
+    import pandas as pd
+    latest = store.latest_per_command()
+    metrics = {
+        "healthcare_etl_runs_total": ("counter", "ETL runs recorded in etl_runs.",
+                                      [(_labels(command=c, status=s), n) for c, s, n in store.status_counts()]),
+        "healthcare_etl_last_run_timestamp_seconds": ("gauge", "Start time of the latest run.", []),
+        "healthcare_etl_last_run_success": ("gauge", "1 if the latest run succeeded.", []),
+        "healthcare_etl_last_run_duration_seconds": ("gauge", "Wall time of the latest run.", []),
+        "healthcare_etl_last_run_stage_seconds": ("gauge", "Time spent per stage in the latest run.", []),
+        "healthcare_etl_last_run_rows": ("gauge", "Rows fetched, transformed, dropped, skipped and affected.", []),
+        "healthcare_etl_last_run_bytes_fetched": ("gauge", "API response bytes fetched in the latest run.", []),
+        "healthcare_etl_last_run_peak_rss_megabytes": ("gauge", "Peak resident memory of the latest run.", []),
+    }
+    def add(name, value, **labels):
+        if value is not None and not pd.isna(value):
+            metrics[name][2].append((_labels(**labels), value))
+
+    for run in latest.itertuples(index=False):
+        add("healthcare_etl_last_run_timestamp_seconds", pd.Timestamp(run.started_at).to_pydatetime().timestamp(),
+            command=run.command)
+        add("healthcare_etl_last_run_success", int(run.status == SUCCESS), command=run.command)
+        add("healthcare_etl_last_run_duration_seconds", run.duration_seconds, command=run.command)
+        for stage in STAGES:
+            add("healthcare_etl_last_run_stage_seconds", getattr(run, f"{stage}_seconds"),
+                command=run.command, stage=stage)
+        for kind in ("fetched", "transformed", "dropped", "skipped", "affected"):
+            add("healthcare_etl_last_run_rows", getattr(run, f"rows_{kind}"), command=run.command, kind=kind)
+        add("healthcare_etl_last_run_bytes_fetched", run.bytes_fetched, command=run.command)
+        add("healthcare_etl_last_run_peak_rss_megabytes", run.peak_rss_mb, command=run.command)
+
+    lines = []
+    for name, (kind, help_text, samples) in metrics.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(f"{name}{labels} {_number(value)}" for labels, value in samples)
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus_file(store, path):
+    # Written atomically so a scraper never reads a half-written file.
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(prometheus_text(store))
+    os.replace(tmp_path, path)
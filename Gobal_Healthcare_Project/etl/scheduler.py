@@ -0,0 +1,91 @@
+# etl/scheduler.py
+
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from utils.logger import get_logger
+
+logger = get_logger("ETLScheduler")
+
+DEFAULT_WORKERS = 4
+
+SUCCESS = "success"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+class TaskResult:
+    def __init__(self, name, status, duration=0.0, value=None, error=None):
+        self.name = name
+        self.status = status
+        self.duration = duration
+        self.value = value
+        self.error = error
+
+
+class ETLScheduler:
+    # Runs a DAG of named tasks on a thread pool. A task starts as soon as all
+    # of its dependencies have succeeded and receives their return values as
+    # positional arguments; if any dependency fails, the task is skipped.
+    # Tasks in independent chains never affect each other.
+
+    def __init__(self, max_workers=DEFAULT_WORKERS):
+        self.max_workers = max_workers
+        self.tasks = {}
+
+    def add_task(self, name, func, depends_on=()):
+        if name in self.tasks:
+            raise ValueError(f"Task '{name}' is already registered.")
+        for dependency in depends_on:
+            if dependency not in self.tasks:
+                raise ValueError(f"Task '{name}' depends on unknown task '{dependency}'.")
+        self.tasks[name] = (func, tuple(depends_on))
+
+    def add_chain(self, chain_name, stages):
+        # stages: [(stage_name, func), ...], e.g. extract -> transform -> load.
+        # Each stage gets the previous stage's return value.
+        previous = ()
+        for stage_name, func in stages:
+            name = f"{chain_name}.{stage_name}"
+            self.add_task(name, func, depends_on=previous)
+            previous = (name,)
+
+    def run(self):
+        results = {}
+        pending = dict(self.tasks)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                for name, (func, depends_on) in list(pending.items()):
+                    states = [results[dep].status if dep in results else None for dep in depends_on]
+                    if any(state in (FAILED, SKIPPED) for state in states):
+                        results[name] = TaskResult(name, SKIPPED, error="upstream task failed")
+                        logger.warning(f"Scheduler: skipping '{name}' because an upstream task failed.")
+                        del pending[name]
+                    elif all(state == SUCCESS for state in states):
+                        args = [results[dep].value for dep in depends_on]
+                        running[executor.submit(self._run_task, name, func, args)] = name
+                        del pending[name]
+
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    results[result.name] = result
+                    del running[future]
+
+        return [results[name] for name in self.tasks]
+
+    @staticmethod
+    def _run_task(name, func, args):
+        started = time.perf_counter()
+        try:
+            value = func(*args)
+        except Exception as e:
+            duration = time.perf_counter() - started
+            logger.error(f"Scheduler: task '{name}' failed after {duration:.2f}s: {e}")
+            return TaskResult(name, FAILED, duration, error=e)
+        duration = time.perf_counter() - started
+        logger.info(f"Scheduler: task '{name}' finished in {duration:.2f}s.")
+        return TaskResult(name, SUCCESS, duration, value=value)
@@ -0,0 +1,61 @@
+# etl/schema.py
+
+# Column layout, dtypes, required fields and date formats for every loaded
+# table, declared once and shared by the transformer, loader and DB layer.
+
+DATE = "date"
+TIMESTAMP = "timestamp"
+COUNT = "Int64"
+CATEGORY = "category"
+
+
+class TableSchema:
+    def __init__(self, name, endpoint, columns, required, date_formats):
+        self.name = name
+        self.endpoint = endpoint
+        self.columns = columns
+        self.required = required
+        self.date_formats = date_formats
+
+    @property
+    def column_names(self):
+        return list(self.columns)
+
+    @property
+    def metric_columns(self):
+        return [column for column, dtype in self.columns.items() if dtype == COUNT]
+
+
+SCHEMAS = {
+    "daily_cases": TableSchema(
+        name="daily_cases",
+        endpoint="cases",
+        columns={
+            "report_date": DATE,
+            "country_name": CATEGORY,
+            "total_cases": COUNT,
+            "new_cases": COUNT,
+            "total_deaths": COUNT,
+            "new_deaths": COUNT,
+            "etl_timestamp": TIMESTAMP,
+        },
+        required=["report_date", "country_name", "total_cases"],
+        date_formats={"report_date": "ISO8601", "etl_timestamp": "ISO8601"},
+    ),
+    "vaccination_data": TableSchema(
+        name="vaccination_data",
+        endpoint="vaccinations",
+        columns={
+            "report_date": DATE,
+            "country_name": CATEGORY,
+            "total_vaccinations": COUNT,
+            "people_vaccinated": COUNT,
+            "people_fully_vaccinated": COUNT,
+            "etl_timestamp": TIMESTAMP,
+        },
+        required=["report_date", "country_name", "total_vaccinations"],
+        date_formats={"report_date": "ISO8601", "etl_timestamp": "ISO8601"},
+    ),
+}
+
+TABLE_COLUMNS = {name: schema.column_names for name, schema in SCHEMAS.items()}
@@ -0,0 +1,187 @@
+# etl/validation.py
+
+import numpy as np
+import pandas as pd
+
+from etl.schema import SCHEMAS
+from utils.logger import get_logger
+
+logger = get_logger("Validation")
+
+# Data-quality rules per table. Each rule returns a boolean mask of the rows
+# that fail it, computed on whole columns of the batch; rows failing any rule
+# are quarantined with the names of every rule they broke, the rest load.
+
+CUMULATIVE_COLUMNS = {
+    "daily_cases": ["total_cases", "total_deaths"],
+    "vaccination_data": ["total_vaccinations"],
+}
+# (smaller, larger): the first may never exceed the second on the same row.
+BOUNDED_COLUMNS = {
+    "daily_cases": [("total_deaths", "total_cases")],
+    "vaccination_data": [("people_fully_vaccinated", "people_vaccinated"),
+                         ("people_vaccinated", "total_vaccinations")],
+}
+
+CREATE_QUARANTINE_TABLE = {
+    "mysql": """
+        CREATE TABLE IF NOT EXISTS quarantine_records (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            table_name VARCHAR(64) NOT NULL,
+            country_name VARCHAR(255) NULL,
+            report_date VARCHAR(32) NULL,
+            reasons VARCHAR(512) NOT NULL,
+            record TEXT NOT NULL,
+            quarantined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            KEY idx_quarantine_table_time (table_name, quarantined_at)
+        )
+    """,
+    "duckdb": """
+        CREATE TABLE IF NOT EXISTS quarantine_records (
+            table_name VARCHAR NOT NULL,
+            country_name VARCHAR,
+            report_date VARCHAR,
+            reasons VARCHAR NOT NULL,
+            record VARCHAR NOT NULL,
+            quarantined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+}
+# Rows already quarantined under the same key are replaced, so re-running the
+# same input does not quarantine its rows twice. Keys may be NULL (unparseable
+# input), hence the NULL-safe comparisons.
+DELETE_QUARANTINE = {
+    "mysql": ("DELETE FROM quarantine_records WHERE table_name = %s "
+              "AND country_name <=> %s AND report_date <=> %s"),
+    "duckdb": ("DELETE FROM quarantine_records WHERE table_name = %s "
+               "AND country_name IS NOT DISTINCT FROM %s AND report_date IS NOT DISTINCT FROM %s"),
+}
+INSERT_QUARANTINE = ("INSERT INTO quarantine_records (table_name, country_name, report_date, reasons, record) "
+                     "VALUES (%s, %s, %s, %s, %s)")
+
+
+class Rule:
+    def __init__(self, name, check, description):
+        self.name = name
+        self.check = check
+        self.description = description
+
+    def failures(self, typed, raw):
+        return np.asarray(self.check(typed, raw).fillna(False), dtype=bool)
+
+
+def _unreadable(typed, raw, column):
+    # Rows the cast left empty although the raw record had a value. Only the
+    # rows that came out empty (usually a handful) are inspected.
+    empty = typed[column].isna()
+    candidates = raw.loc[empty.to_numpy(), column].dropna()
+    filled = candidates.astype("string").str.strip() != ""
+    return filled.reindex(typed.index, fill_value=False)
+
+
+def missing(column):
+    return Rule(f"missing_{column}", lambda typed, raw: typed[column].isna() & ~_unreadable(typed, raw, column),
+                f"{column} is empty")
+
+
+def unparseable(column):
+    return Rule(f"unparseable_{column}", lambda typed, raw: _unreadable(typed, raw, column),
+                f"{column} could not be parsed")
+
+
+def negative(column):
+    return Rule(f"negative_{column}", lambda typed, raw: typed[column] < 0, f"{column} is negative")
+
+
+def exceeds(smaller, larger):
+    return Rule(f"{smaller}_exceeds_{larger}", lambda typed, raw: typed[smaller] > typed[larger],
+                f"{smaller} is greater than {larger}")
+
+
+def decreasing(column):
+    # Compares each row with the same country's previous date in this batch;
+    # the batch is not compared with rows already loaded.
+    def check(typed, raw):
+        known = typed[["country_name", "report_date", column]].dropna()
+        known = known.sort_values(["country_name", "report_date"], kind="stable")
+        previous = known.groupby("country_name", observed=True)[column].shift()
+        return (known[column] < previous).reindex(typed.index, fill_value=False)
+    return Rule(f"decreasing_{column}", check, f"{column} is lower than on the previous day")
+
+
+def future_date(column):
+    return Rule(f"future_{column}", lambda typed, raw: typed[column] > pd.Timestamp.now().normalize(),
+                f"{column} is in the future")
+
+
+def _build_rules():
+    rules = {}
+    for table_name, schema in SCHEMAS.items():
+        table_rules = [missing(column) for column in schema.required]
+        table_rules += [unparseable(column) for column in schema.column_names]
+        table_rules += [negative(column) for column in schema.metric_columns]
+        table_rules += [decreasing(column) for column in CUMULATIVE_COLUMNS.get(table_name, [])]
+        table_rules += [exceeds(smaller, larger) for smaller, larger in BOUNDED_COLUMNS.get(table_name, [])]
+        table_rules.append(future_date("report_date"))
+        rules[table_name] = table_rules
+    return rules
+
+
+RULES = _build_rules()
+
+
+class ValidationResult:
+    def __init__(self, valid, quarantined, counts):
+        self.valid = valid
+        self.quarantined = quarantined
+        self.counts = counts
+
+
+def validate(table_name, typed, raw):
+    # typed: the transformer's cast frame; raw: the same rows before casting
+    # (same index), used to tell missing values from unparseable ones.
+    rules = RULES[table_name]
+    failing = pd.DataFrame({rule.name: rule.failures(typed, raw) for rule in rules}, index=typed.index)
+    bad = failing.any(axis=1).to_numpy()
+    counts = {name: int(total) for name, total in failing.sum().items() if total}
+    if not bad.any():
+        return ValidationResult(typed, typed.iloc[0:0], counts)
+
+    # Reason per failing row: the names of its failed rules, joined with ";".
+    names = np.array([f"{rule.name};" for rule in rules], dtype=object)
+    reasons = pd.Series(failing[bad].to_numpy(dtype=object).dot(names), index=typed.index[bad])
+    quarantined = raw[bad].assign(reasons=reasons.str.rstrip(";"))
+    return ValidationResult(typed[~bad], quarantined, counts)
+
+
+class QuarantineStore:
+    # quarantine_records: rows that failed validation, with the failed rules
+    # and the record as received (JSON), in the same store as the data.
+
+    def __init__(self, db_handler):
+        self.db_handler = db_handler
+        self.db_handler.execute(CREATE_QUARANTINE_TABLE[db_handler.dialect])
+
+    def save(self, table_name, quarantined):
+        if quarantined.empty:
+            return
+        records = quarantined.drop(columns="reasons").to_json(orient="records", lines=True,
+                                                               date_format="iso").splitlines()
+        keys = quarantined.reindex(columns=["country_name", "report_date"]).astype(object)
+        keys = keys.where(keys.notna(), None)
+        rows = [
+            (table_name, None if country is None else str(country)[:255],
+             None if report_date is None else str(report_date)[:32], reasons, record)
+            for (country, report_date), reasons, record
+            in zip(keys.itertuples(index=False, name=None), quarantined["reasons"], records)
+        ]
+        # One transaction, so a failed insert keeps the rows it would replace.
+        with self.db_handler.transaction() as cursor:
+            cursor.executemany(DELETE_QUARANTINE[self.db_handler.dialect],
+                               list(dict.fromkeys(row[:3] for row in rows)))
+            cursor.executemany(INSERT_QUARANTINE, rows)
+        logger.info(f"{table_name}: {len(rows)} rows written to quarantine_records.")
+
+
+def describe(counts):
+    return ", ".join(f"{rule}: {total}" for rule, total in sorted(counts.items()))
@@ -0,0 +1,84 @@
+# etl/watermark.py
+
+import pandas as pd
+from utils.logger import get_logger
+
+logger = get_logger("WatermarkStore")
+
+CREATE_WATERMARK_TABLE = {
+    "mysql": """
+        CREATE TABLE IF NOT EXISTS etl_watermarks (
+            table_name VARCHAR(64) NOT NULL,
+            country_name VARCHAR(255) NOT NULL,
+            last_report_date DATE NOT NULL,
+            last_etl_timestamp TIMESTAMP NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            PRIMARY KEY (table_name, country_name)
+        )
+    """,
+    "duckdb": """
+        CREATE TABLE IF NOT EXISTS etl_watermarks (
+            table_name VARCHAR NOT NULL,
+            country_name VARCHAR NOT NULL,
+            last_report_date DATE NOT NULL,
+            last_etl_timestamp TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (table_name, country_name)
+        )
+    """,
+}
+
+ADVANCE_WATERMARK = {
+    "mysql": """
+        INSERT INTO etl_watermarks (table_name, country_name, last_report_date, last_etl_timestamp)
+        VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            last_report_date = GREATEST(last_report_date, VALUES(last_report_date)),
+            last_etl_timestamp = COALESCE(
+                GREATEST(last_etl_timestamp, VALUES(last_etl_timestamp)),
+                VALUES(last_etl_timestamp), last_etl_timestamp)
+    """,
+    "duckdb": """
+        INSERT INTO etl_watermarks (table_name, country_name, last_report_date, last_etl_timestamp)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (table_name, country_name) DO UPDATE SET
+            last_report_date = GREATEST(etl_watermarks.last_report_date, excluded.last_report_date),
+            last_etl_timestamp = COALESCE(
+                GREATEST(etl_watermarks.last_etl_timestamp, excluded.last_etl_timestamp),
+                excluded.last_etl_timestamp, etl_watermarks.last_etl_timestamp),
+            updated_at = now()
+    """,
+}
+
+
+class WatermarkStore:
+    # Per-table, per-country high-water marks: the latest report_date (and
+    # etl_timestamp) already loaded, so later runs only process newer rows.
+
+    def __init__(self, db_handler):
+        self.db_handler = db_handler
+        self.db_handler.execute(CREATE_WATERMARK_TABLE[db_handler.dialect])
+
+    def get(self, table_name, country_name):
+        rows = self.db_handler.run_query(
+            "SELECT last_report_date FROM etl_watermarks WHERE table_name = %s AND country_name = %s",
+            (table_name, country_name)
+        )
+        return rows[0][0] if rows else None
+
+    def advance(self, table_name, records):
+        # records: a transformed frame (or per-batch maxima); one mark per country.
+        latest = records.groupby("country_name", observed=True).agg(
+            report_date=("report_date", "max"),
+            etl_timestamp=("etl_timestamp", "max")
+        )
+        # One statement batch in one transaction; a backfill can touch
+        # hundreds of countries.
+        rows = [
+            (table_name, country_name, row["report_date"].date(),
+             None if pd.isna(row["etl_timestamp"]) else row["etl_timestamp"].to_pydatetime())
+            for country_name, row in latest.iterrows()
+        ]
+        self.db_handler.executemany(ADVANCE_WATERMARK[self.db_handler.dialect], rows)
+        for _, country_name, report_date, _ in rows:
+            logger.info(f"Watermark for {table_name}/{country_name} advanced to {report_date}.")
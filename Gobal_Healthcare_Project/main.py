@@ -1,32 +1,57 @@
 import configparser
-from mysql_handler import MySQLHandler
-from etl.api_client import APIClient
+from storage_backend import get_storage_backend
 from cli_manager import CLIManager
 from utils.logger import get_logger
 
 logger = get_logger("Main")
 
+
+def build_api_client(config):
+    # Imported here so commands that never call the API skip requests.
+    from etl.api_client import APIClient
+    from etl.page_decoder import DEFAULT_DECODER
+    from etl.response_cache import ResponseCache
+
+    cache = None
+    if config.getboolean("cache", "enabled", fallback=False):
+        cache = ResponseCache(
+            config.get("cache", "directory", fallback="cache/http"),
+            ttl_seconds=config.getint("cache", "ttl_seconds", fallback=300),
+            max_age_days=config.getfloat("cache", "max_age_days", fallback=7),
+            max_size_mb=config.getfloat("cache", "max_size_mb", fallback=512)
+        )
+    api_client = APIClient(
+        config.get("api", "base_url", fallback="http://localhost:3000/api"),
+        page_size=config.getint("api", "page_size", fallback=1000),
+        timeout=config.getfloat("api", "timeout", fallback=30),
+        max_retries=config.getint("api", "max_retries", fallback=3),
+        backoff_factor=config.getfloat("api", "backoff_factor", fallback=0.5),
+        pool_size=config.getint("api", "pool_size", fallback=10),
+        cache=cache,
+        decoder=config.get("api", "decoder", fallback="").strip() or DEFAULT_DECODER
+    )
+    logger.info("API client initialized.")
+    return api_client
+
+
+def build_storage_backend():
+    db_handler = get_storage_backend("config.ini")
+    logger.info(f"Storage backend initialized ({db_handler.dialect}).")
+    return db_handler
+
+
 def main():
     try:
         config = configparser.ConfigParser()
         config.read("config.ini")
         logger.info("Loaded configuration from config.ini.")
 
-        db_config = {
-            "host": config["mysql"]["host"],
-            "user": config["mysql"]["user"],
-            "password": config["mysql"]["password"],
-            "database": config["mysql"]["database"]
-        }
-        logger.info("Database configuration parsed successfully.")
-
-        # Initialize core components
-        db_handler = MySQLHandler(db_config)
-        api_client = APIClient("http://localhost:3000/api")
-        logger.info("ETL components initialized.")
-
-        # Run CLIManager
-        cli = CLIManager(api_client, db_handler)
+        # Core components are built on first use by the command that needs
+        # them, so --help and argument errors never open a connection.
+        metrics_file = config.get("metrics", "prometheus_file", fallback="").strip() or None
+        query_service_url = config.get("query_service", "url", fallback="").strip() or None
+        cli = CLIManager(lambda: build_api_client(config), build_storage_backend, metrics_file=metrics_file,
+                         query_service_url=query_service_url)
         logger.info("Starting CLI manager.")
         cli.run()
 
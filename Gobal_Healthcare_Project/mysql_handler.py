@@ -1,72 +1,413 @@
+import configparser
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
 import mysql.connector
+from mysql.connector.errors import PoolError
+from etl.schema import TABLE_COLUMNS
+from storage_backend import StorageBackend, KEY_COLUMNS, as_frame, frame_row_hashes
 from utils.logger import get_logger 
 
 logger = get_logger("MySQLHandler") 
-class MySQLHandler:
-    def __init__(self, db_config):
+
+MISSING = object()
+
+DEFAULT_POOL_SIZE = 5
+DEFAULT_POOL_TIMEOUT = 30
+_handlers = {}
+_handlers_lock = threading.Lock()
+
+
+def frame_to_records(frame):
+    # DB parameters for one chunk: dates as date, timestamps as datetime and
+    # missing values as None.
+    out = frame.astype(object).where(frame.notna(), None)
+    if "report_date" in frame:
+        out["report_date"] = [value.date() if isinstance(value, datetime) else value for value in out["report_date"]]
+    return list(out.itertuples(index=False, name=None))
+
+
+def load_db_config(config_path="config.ini"):
+    config = configparser.ConfigParser()
+    config.read(config_path)
+    return {
+        "host": config["mysql"]["host"],
+        "port": config.getint("mysql", "port", fallback=3306),
+        "user": config["mysql"]["user"],
+        "password": config["mysql"]["password"],
+        "database": config["mysql"]["database"],
+        "allow_local_infile": config.getboolean("mysql", "allow_local_infile", fallback=False)
+    }, {
+        "pool_size": config.getint("mysql", "pool_size", fallback=DEFAULT_POOL_SIZE),
+        "pool_timeout": config.getfloat("mysql", "pool_timeout", fallback=DEFAULT_POOL_TIMEOUT)
+    }
+
+
+def get_db_handler(config_path="config.ini"):
+    # One handler (and connection pool) per config file per process, shared
+    # by the CLI, the dashboard and the schema tool.
+    with _handlers_lock:
+        if config_path not in _handlers:
+            db_config, pool_options = load_db_config(config_path)
+            _handlers[config_path] = MySQLHandler(db_config, **pool_options)
+        return _handlers[config_path]
+
+
+class PreparedSession:
+    # One prepared cursor per distinct statement: MySQL parses and plans it on
+    # first use, later calls only send the parameters.
+    def __init__(self, conn):
+        self.conn = conn
+        self._cursors = {}
+
+    def run(self, sql, params=None):
+        cursor = self._cursors.get(sql)
+        if cursor is None:
+            cursor = self._cursors[sql] = self.conn.cursor(prepared=True)
+            logger.info(f"Preparing statement: {' '.join(sql.split())}")
+        cursor.execute(sql, params or ())
+        return cursor.fetchall()
+
+    def close(self):
+        for cursor in self._cursors.values():
+            cursor.close()
+        self._cursors = {}
+
+
+class MySQLHandler(StorageBackend):
+    dialect = "mysql"
+
+    def __init__(self, db_config, pool_size=DEFAULT_POOL_SIZE, pool_timeout=DEFAULT_POOL_TIMEOUT):
         self.db_config = db_config
+        self.pool_size = pool_size
+        self.pool_timeout = pool_timeout
+        self._hashed_tables = set()
+        # The pool: up to pool_size connections, each opened on first need, so
+        # commands that never query the database do not pay for handshakes.
+        # Every connection opened is kept in _connections for close().
+        self._idle = queue.LifoQueue()
+        self._connections = []
+        self._pool_lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        # Borrow a pooled connection; it is pinged (and transparently
+        # reconnected if the server dropped it) before being handed out.
+        conn = self._checkout()
         try:
-            self.conn = mysql.connector.connect(**self.db_config)
-            self.cursor = self.conn.cursor()
-            logger.info(" Database connection established.")
-        except mysql.connector.Error as err:
-            logger.error(" Failed to connect to database.", exc_info=True)
+            yield conn
+        finally:
+            self._release(conn)
+
+    @contextmanager
+    def cursor(self):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+
+    @contextmanager
+    def prepared_session(self):
+        # Holds one pooled connection so its server-side prepared statements
+        # survive between calls (returning it to the pool resets the session).
+        with self.connection() as conn:
+            session = PreparedSession(conn)
+            try:
+                yield session
+            finally:
+                session.close()
+
+    @contextmanager
+    def transaction(self):
+        # Cursor on a dedicated connection; commits on success, rolls back on error.
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                yield cursor
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def _checkout(self):
+        deadline = time.monotonic() + self.pool_timeout
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+                break
+            except queue.Empty:
+                conn = self._open_connection()
+                if conn is not None:
+                    break
+            if time.monotonic() >= deadline:
+                logger.error(" Timed out waiting for a pooled database connection.")
+                raise PoolError("Timed out waiting for a pooled database connection")
+            time.sleep(0.05)
+        try:
+            conn.ping(reconnect=True, attempts=3, delay=1)
+        except mysql.connector.Error:
+            self._discard(conn)
+            logger.error(" Pooled connection failed its health check.", exc_info=True)
             raise
+        return conn
+
+    def _open_connection(self):
+        # A new connection if the pool is below pool_size, else None.
+        with self._pool_lock:
+            if len(self._connections) >= self.pool_size:
+                return None
+            try:
+                conn = mysql.connector.connect(**self.db_config)
+            except mysql.connector.Error:
+                logger.error(" Failed to connect to database.", exc_info=True)
+                raise
+            self._connections.append(conn)
+            logger.info(f" Database connection opened ({len(self._connections)}/{self.pool_size}).")
+            return conn
+
+    def _release(self, conn):
+        # Back to the pool with a clean session (no open transaction, session
+        # variables reset), as the driver's pool does with pool_reset_session.
+        try:
+            conn.reset_session()
+        except mysql.connector.Error:
+            self._discard(conn)
+            return
+        self._idle.put(conn)
+
+    def _discard(self, conn):
+        with self._pool_lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        try:
+            conn.close()
+        except mysql.connector.Error:
+            pass  # already gone
 
-    def run_query(self, sql):
+    def run_query(self, sql, params=None):
         try:
             logger.info(f"Executing SQL query: {sql}")
-            self.cursor.execute(sql)
-            results = self.cursor.fetchall()
+            with self.cursor() as cursor:
+                cursor.execute(sql, params)
+                results = cursor.fetchall()
             logger.info(f" Query executed. Rows returned: {len(results)}")
             return results
         except mysql.connector.Error as err:
             logger.error(" Error running query", exc_info=True)
             raise
 
-    def run_query_with_columns(self, sql):
+    def run_query_with_columns(self, sql, params=None):
         try:
             logger.info(f"Executing SQL query with columns: {sql}")
-            self.cursor.execute(sql)
-            results = self.cursor.fetchall()
-            columns = [desc[0] for desc in self.cursor.description]
+            with self.transaction() as cursor:
+                cursor.execute(sql, params)
+                results = cursor.fetchall()
+                columns = [desc[0] for desc in cursor.description] if cursor.description else []
             logger.info(f"Query executed. Columns: {columns}, Rows: {len(results)}")
             return results, columns
         except mysql.connector.Error as err:
             logger.error("Error running query with columns", exc_info=True)
             raise
 
-    def insert_data(self, table_name, records):
-        if not records:
+    def execute(self, sql, params=None):
+        try:
+            logger.info(f"Executing SQL statement: {sql}")
+            with self.transaction() as cursor:
+                cursor.execute(sql, params)
+                rowcount = cursor.rowcount
+            logger.info(f"Statement executed. Rows affected: {rowcount}")
+            return rowcount
+        except mysql.connector.Error as err:
+            logger.error("Error executing statement", exc_info=True)
+            raise
+
+    def executemany(self, sql, rows):
+        try:
+            logger.info(f"Executing SQL statement for {len(rows)} rows: {sql}")
+            with self.transaction() as cursor:
+                cursor.executemany(sql, rows)
+                rowcount = cursor.rowcount
+            logger.info(f"Statement executed. Rows affected: {rowcount}")
+            return rowcount
+        except mysql.connector.Error:
+            logger.error("Error executing statement", exc_info=True)
+            raise
+
+    def insert_data(self, table_name, records, mode="ignore"):
+        # mode="ignore" keeps existing rows untouched (INSERT IGNORE);
+        # mode="upsert" also rewrites rows whose content hash has changed.
+        if records is None or len(records) == 0:
             print("No records to insert.")
             logger.warning(f"No records to insert into `{table_name}`.")
             return
 
-        columns = (
-            ["report_date", "country_name", "total_cases", "new_cases", "total_deaths", "new_deaths", "etl_timestamp"]
-            if table_name == "daily_cases"
-            else ["report_date", "country_name", "total_vaccinations", "people_vaccinated", "people_fully_vaccinated", "etl_timestamp"]
+        try:
+            with self.transaction() as cursor:
+                counts = self.write_records(cursor, table_name, records, mode)
+            summary = (f"Loaded {counts['loaded']}, updated {counts['updated']}, "
+                       f"unchanged {counts['unchanged']} rows in `{table_name}`.")
+            print(summary)
+            logger.info(summary)
+            return counts
+        except mysql.connector.Error as err:
+            print(f"MySQL Error: {err}")
+            logger.error("Error inserting data into database.", exc_info=True)
+            return None
+
+    def write_records(self, cursor, table_name, records, mode="ignore"):
+        # Writes one batch on the caller's transaction cursor without committing.
+        columns = TABLE_COLUMNS[table_name]
+        frame = as_frame(table_name, records)
+        hashed = [record + (digest,) for record, digest in zip(frame_to_records(frame), frame_row_hashes(frame))]
+        self._ensure_row_hash_column(cursor, table_name)
+        if mode == "upsert":
+            return self._upsert(cursor, table_name, columns, hashed)
+        return self._insert_ignore(cursor, table_name, columns, hashed)
+
+    def load_csv(self, cursor, table_name, csv_path, row_count, mode="ignore"):
+        # LOAD DATA LOCAL INFILE into a per-connection staging table, then merge
+        # into the target with one set-based statement. Does not commit.
+        columns = TABLE_COLUMNS[table_name] + ["row_hash"]
+        staging = f"{table_name}_staging"
+        column_list = ", ".join(columns)
+        self._ensure_row_hash_column(cursor, table_name)
+        cursor.execute(
+            f"CREATE TEMPORARY TABLE IF NOT EXISTS {staging} AS SELECT {column_list} FROM {table_name} WHERE 1 = 0"
+        )
+        cursor.execute(f"DELETE FROM {staging}")
+        cursor.execute(
+            f"""
+            LOAD DATA LOCAL INFILE %s INTO TABLE {staging}
+            FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+            LINES TERMINATED BY '\\n'
+            ({column_list})
+            """,
+            (csv_path,)
+        )
+
+        if mode != "upsert":
+            cursor.execute(
+                f"INSERT IGNORE INTO {table_name} ({column_list}) SELECT {column_list} FROM {staging}"
+            )
+            loaded = max(cursor.rowcount, 0)
+            return {"loaded": loaded, "updated": 0, "unchanged": row_count - loaded}
+
+        cursor.execute(
+            f"""
+            SELECT SUM(t.report_date IS NULL), SUM(t.report_date IS NOT NULL AND NOT (t.row_hash <=> s.row_hash))
+            FROM {staging} s
+            LEFT JOIN {table_name} t ON t.country_name = s.country_name AND t.report_date = s.report_date
+            """
         )
+        new_count, changed_count = (int(value or 0) for value in cursor.fetchone())
+        updates = ", ".join(f"{column} = src.{column}" for column in columns if column not in KEY_COLUMNS)
+        cursor.execute(
+            f"""
+            INSERT INTO {table_name} ({column_list})
+            SELECT * FROM (
+                SELECT {", ".join(f"s.{column}" for column in columns)}
+                FROM {staging} s
+                LEFT JOIN {table_name} t ON t.country_name = s.country_name AND t.report_date = s.report_date
+                WHERE t.report_date IS NULL OR NOT (t.row_hash <=> s.row_hash)
+            ) AS src
+            ON DUPLICATE KEY UPDATE {updates}
+            """
+        )
+        return {"loaded": new_count, "updated": changed_count,
+                "unchanged": row_count - new_count - changed_count}
 
-        placeholders = ", ".join(["%s"] * len(columns))
+    def _insert_ignore(self, cursor, table_name, columns, hashed):
+        placeholders = ", ".join(["%s"] * (len(columns) + 1))
         insert_query = f"""
-            INSERT IGNORE INTO {table_name} ({", ".join(columns)})
+            INSERT IGNORE INTO {table_name} ({", ".join(columns)}, row_hash)
             VALUES ({placeholders})
         """
+        logger.info(f"Inserting {len(hashed)} records into `{table_name}`...")
+        cursor.executemany(insert_query, hashed)
+        loaded = max(cursor.rowcount, 0)
+        return {"loaded": loaded, "updated": 0, "unchanged": len(hashed) - loaded}
 
-        try:
-            logger.info(f"Inserting {len(records)} records into `{table_name}`...")
-            self.cursor.executemany(insert_query, records)
-            self.conn.commit()
-            print(f"Inserted {self.cursor.rowcount} rows into `{table_name}`.")
-            logger.info(f"Inserted {self.cursor.rowcount} rows into `{table_name}`.")
-        except mysql.connector.Error as err:
-            print(f"MySQL Error: {err}")
-            logger.error("Error inserting data into database.", exc_info=True)
+    def _upsert(self, cursor, table_name, columns, hashed):
+        # Compare against the hashes already stored for this key range and only
+        # send new or changed rows, so unchanged rows are never rewritten.
+        existing = self._existing_hashes(cursor, table_name, hashed)
+        new_rows, changed_rows = [], []
+        for record in hashed:
+            stored = existing.get((record[1].casefold(), record[0]), MISSING)
+            if stored is MISSING:
+                new_rows.append(record)
+            elif stored != record[-1]:
+                changed_rows.append(record)
+
+        counts = {
+            "loaded": len(new_rows),
+            "updated": len(changed_rows),
+            "unchanged": len(hashed) - len(new_rows) - len(changed_rows)
+        }
+        if new_rows or changed_rows:
+            placeholders = ", ".join(["%s"] * (len(columns) + 1))
+            updates = ", ".join(
+                f"{column} = VALUES({column})" for column in columns if column not in KEY_COLUMNS
+            )
+            upsert_query = f"""
+                INSERT INTO {table_name} ({", ".join(columns)}, row_hash)
+                VALUES ({placeholders})
+                ON DUPLICATE KEY UPDATE {updates}, row_hash = VALUES(row_hash)
+            """
+            logger.info(f"Upserting {len(new_rows)} new and {len(changed_rows)} changed records into `{table_name}`...")
+            cursor.executemany(upsert_query, new_rows + changed_rows)
+        return counts
+
+    def _existing_hashes(self, cursor, table_name, hashed):
+        countries = sorted({record[1] for record in hashed})
+        dates = [record[0] for record in hashed]
+        placeholders = ", ".join(["%s"] * len(countries))
+        cursor.execute(
+            f"""
+            SELECT country_name, report_date, row_hash FROM {table_name}
+            WHERE country_name IN ({placeholders}) AND report_date BETWEEN %s AND %s
+            """,
+            countries + [min(dates), max(dates)]
+        )
+        # Keyed like the unique index: the column's collation ignores case, so a
+        # row differing only in the country's case updates the stored one.
+        return {(country.casefold(), report_date): stored for country, report_date, stored in cursor.fetchall()}
+
+    def _ensure_row_hash_column(self, cursor, table_name):
+        # Tables created before row hashing existed get the column on first use.
+        if table_name in self._hashed_tables:
+            return
+        cursor.execute(
+            """
+            SELECT COUNT(*) FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name = %s AND column_name = 'row_hash'
+            """,
+            (table_name,)
+        )
+        if cursor.fetchone()[0] == 0:
+            logger.info(f"Adding row_hash column to `{table_name}`.")
+            cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN row_hash CHAR(32) NULL")
+        self._hashed_tables.add(table_name)
+
+    def drop_table(self, table_name):
+        self.execute(f"DROP TABLE IF EXISTS {table_name}")
 
     def close(self):
-        if self.cursor:
-            self.cursor.close()
-        if self.conn and self.conn.is_connected():
-            self.conn.close()
-            logger.info("🔒 Database connection closed.")
+        with self._pool_lock:
+            connections, self._connections = self._connections, []
+            self._idle = queue.LifoQueue()
+        if not connections:
+            return
+        for conn in connections:
+            try:
+                conn.close()
+            except mysql.connector.Error:
+                pass  # already gone
+        logger.info("🔒 Database connection pool closed.")
@@ -0,0 +1,118 @@
+from etl.rollups import PERIODS, PERIOD_START_SQL, rollup_table, summary_table
+from etl.schema import SCHEMAS
+
+# Analytics statements for the CLI. Table and metric names are checked against
+# etl.schema before they are placed in the SQL text; every value is a bound
+# parameter. For a given (query, table, metric) the SQL text is therefore
+# constant, so a prepared session parses it once and reuses it.
+
+
+# First day of the period containing report_date, per dialect; date_trunc
+# weeks start on Monday, as in the rollup tables.
+FACT_PERIOD_START_SQL = {
+    "mysql": PERIOD_START_SQL,
+    "duckdb": {period: f"CAST(date_trunc('{period}', report_date) AS DATE)" for period in PERIODS},
+}
+
+
+class QueryError(ValueError):
+    pass
+
+
+def validate_table(table_name):
+    if table_name not in SCHEMAS:
+        raise QueryError(f"Unknown table '{table_name}'; choose from: {', '.join(SCHEMAS)}.")
+    return table_name
+
+
+def validate_metric(table_name, metric):
+    metrics = SCHEMAS[validate_table(table_name)].metric_columns
+    if metric not in metrics:
+        raise QueryError(f"Unknown metric '{metric}' for {table_name}; choose from: {', '.join(metrics)}.")
+    return metric
+
+
+def table_for_metric(metric):
+    # daily_trends and friends accept any metric; the table follows from it.
+    for table_name, schema in SCHEMAS.items():
+        if metric in schema.metric_columns:
+            return table_name
+    metrics = [m for schema in SCHEMAS.values() for m in schema.metric_columns]
+    raise QueryError(f"Unknown metric '{metric}'; choose from: {', '.join(metrics)}.")
+
+
+def country_total(table_name, metric, country, use_summary=False):
+    validate_metric(table_name, metric)
+    if use_summary:
+        return (f"SELECT country_name, sum_{metric} FROM {summary_table(table_name)} WHERE country_name = %s",
+                (country,))
+    return (f"SELECT country_name, SUM({metric}) FROM {table_name} WHERE country_name = %s GROUP BY country_name",
+            (country,))
+
+
+def daily_trends(table_name, metric, country, limit=10):
+    validate_metric(table_name, metric)
+    return (f"SELECT report_date, {metric} FROM {table_name} WHERE country_name = %s "
+            f"ORDER BY report_date LIMIT %s",
+            (country, int(limit)))
+
+
+def top_countries(table_name, metric, n, use_summary=False):
+    validate_metric(table_name, metric)
+    if use_summary:
+        return (f"SELECT country_name, sum_{metric} AS total FROM {summary_table(table_name)} "
+                f"ORDER BY total DESC LIMIT %s",
+                (int(n),))
+    return (f"SELECT country_name, SUM({metric}) AS total FROM {table_name} "
+            f"GROUP BY country_name ORDER BY total DESC LIMIT %s",
+            (int(n),))
+
+
+def period_rollup(table_name, metric, country, period, limit=12, facts_dialect=None):
+    validate_metric(table_name, metric)
+    if period not in PERIODS:
+        raise QueryError(f"Unknown period '{period}'; choose from: {', '.join(PERIODS)}.")
+    if facts_dialect:
+        # Without (complete) rollup tables, aggregate the fact data directly.
+        return (f"SELECT {FACT_PERIOD_START_SQL[facts_dialect][period]} AS period_start, COUNT(*) AS days, "
+                f"SUM({metric}), MAX({metric}) FROM {table_name} WHERE country_name = %s "
+                f"GROUP BY period_start ORDER BY period_start DESC LIMIT %s",
+                (country, int(limit)))
+    return (f"SELECT period_start, days, sum_{metric}, max_{metric} FROM {rollup_table(table_name)} "
+            f"WHERE period = %s AND country_name = %s ORDER BY period_start DESC LIMIT %s",
+            (period, country, int(limit)))
+
+
+def report_source(table_name, metrics, countries, start_date=None, end_date=None):
+    # One set-based read of everything a report pack needs from one table.
+    for metric in metrics:
+        validate_metric(table_name, metric)
+    conditions, params = [f"country_name IN ({', '.join(['%s'] * len(countries))})"], list(countries)
+    if start_date:
+        conditions.append("report_date >= %s")
+        params.append(start_date)
+    if end_date:
+        conditions.append("report_date <= %s")
+        params.append(end_date)
+    return (f"SELECT country_name, report_date, {', '.join(metrics)} FROM {table_name} "
+            f"WHERE {' AND '.join(conditions)} ORDER BY country_name, report_date",
+            tuple(params))
+
+
+def recent_series(table_name, columns, countries, days):
+    # Each country's last `days` days up to its own latest report_date, for
+    # all countries in one statement.
+    for column in columns:
+        validate_metric(table_name, column)
+    placeholders = ", ".join(["%s"] * len(countries))
+    return (f"SELECT t.country_name, t.report_date, {', '.join(f't.{c}' for c in columns)} FROM {table_name} t "
+            f"JOIN (SELECT country_name, MAX(report_date) AS last_date FROM {table_name} "
+            f"WHERE country_name IN ({placeholders}) GROUP BY country_name) latest "
+            f"ON latest.country_name = t.country_name "
+            f"WHERE t.report_date > latest.last_date - INTERVAL (%s) DAY "
+            f"ORDER BY t.country_name, t.report_date",
+            tuple(countries) + (int(days),))
+
+
+def country_names(table_name):
+    return f"SELECT DISTINCT country_name FROM {validate_table(table_name)} ORDER BY country_name", ()
@@ -0,0 +1,426 @@
+import configparser
+import gzip
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import derived_metrics
+import query_builder as queries
+from etl.rollups import summary_available, summary_table
+from query_builder import QueryError
+from utils.logger import get_logger
+
+logger = get_logger("QueryService")
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8770
+DEFAULT_CACHE_ENTRIES = 512
+DEFAULT_CACHE_TTL = 300
+DEFAULT_VERSION_INTERVAL = 5
+DEFAULT_CLIENT_TIMEOUT = 30
+MIN_GZIP_BYTES = 1024
+MAX_ROWS_PARAM = 10000
+
+
+def load_settings(config_path="config.ini"):
+    config = configparser.ConfigParser()
+    config.read(config_path)
+    return {
+        "host": config.get("query_service", "host", fallback=DEFAULT_HOST),
+        "port": config.getint("query_service", "port", fallback=DEFAULT_PORT),
+        "url": config.get("query_service", "url", fallback="").strip() or None,
+        "cache_entries": config.getint("query_service", "cache_entries", fallback=DEFAULT_CACHE_ENTRIES),
+        "cache_ttl_seconds": config.getfloat("query_service", "cache_ttl_seconds", fallback=DEFAULT_CACHE_TTL),
+        "version_interval": config.getfloat("query_service", "version_interval", fallback=DEFAULT_VERSION_INTERVAL),
+    }
+
+
+class Analytics:
+    # The read-only analytics behind the CLI queries and the dashboard, as
+    # (columns, rows). Used directly against the database, or served to many
+    # readers by QueryService and reached through QueryClient, which has the
+    # same methods.
+
+    def __init__(self, db_handler, session=None):
+        self.db_handler = db_handler
+        self.session = session
+
+    def _run(self, sql, params=()):
+        if self.session is not None:
+            return self.session.run(sql, params)
+        return self.db_handler.run_query(sql, params)
+
+    def countries(self):
+        tables = list(queries.SCHEMAS)
+        if all(summary_available(self.db_handler, table) for table in tables):
+            sources = [f"SELECT country_name FROM {summary_table(table)}" for table in tables]
+        else:
+            sources = [f"SELECT DISTINCT country_name FROM {table}" for table in tables]
+        return ["country_name"], self._run(" UNION ".join(sources) + " ORDER BY country_name")
+
+    def total_cases(self, country):
+        use_summary = summary_available(self.db_handler, "daily_cases")
+        return ["country_name", "total_cases"], self._run(
+            *queries.country_total("daily_cases", "total_cases", country, use_summary))
+
+    def daily_trends(self, metric, country, limit=10):
+        table_name = queries.table_for_metric(metric)
+        return ["report_date", metric], self._run(*queries.daily_trends(table_name, metric, country, limit))
+
+    def top_countries(self, metric, n=10):
+        table_name = queries.table_for_metric(metric)
+        use_summary = summary_available(self.db_handler, table_name)
+        return ["country_name", "total"], self._run(*queries.top_countries(table_name, metric, n, use_summary))
+
+    def period_rollup(self, metric, country, period="month", limit=12, table=None):
+        table_name = table or queries.table_for_metric(metric)
+        # Only MySQL keeps rollup tables (see CLIManager._rollup_store), and
+        # they are read once fully rebuilt, like the summaries.
+        facts_dialect = None if summary_available(self.db_handler, table_name) else self.db_handler.dialect
+        return (["period_start", "days", f"sum_{metric}", f"max_{metric}"],
+                self._run(*queries.period_rollup(table_name, metric, country, period, limit, facts_dialect)))
+
+    def series(self, metric, countries, days=14):
+        # Each country's last `days` days up to its own latest report_date.
+        table_name = queries.table_for_metric(metric)
+        return (["country_name", "report_date", metric],
+                self._run(*queries.recent_series(table_name, [metric], countries, days)))
+
+    def derived(self, metric, countries, days=14):
+        # Source columns with WARMUP_DAYS of history so the first returned
+        # day has full windows; computed for all countries at once.
+        spec = derived_metrics.get_metric(metric)
+        rows = self._run(*queries.recent_series(spec.table, spec.sources, countries,
+                                                days + derived_metrics.WARMUP_DAYS))
+        columns = ["country_name", "report_date", metric]
+        if not rows:
+            return columns, []
+        import pandas as pd
+        frame = pd.DataFrame(rows, columns=["country_name", "report_date"] + spec.sources)
+        values = derived_metrics.compute_metrics(frame, [metric])
+        values = values.groupby("country_name", sort=False).tail(days)[columns]
+        return columns, values.astype(object).where(values.notna(), None).values.tolist()
+
+    def map_summary(self, metric, countries):
+        # Per-country maximum of a metric, for the choropleth map.
+        table_name = queries.table_for_metric(metric)
+        placeholders = ", ".join(["%s"] * len(countries))
+        if summary_available(self.db_handler, table_name):
+            sql = (f"SELECT country_name, max_{metric} AS total FROM {summary_table(table_name)} "
+                   f"WHERE country_name IN ({placeholders})")
+        else:
+            sql = (f"SELECT country_name, MAX({metric}) AS total FROM {table_name} "
+                   f"WHERE country_name IN ({placeholders}) GROUP BY country_name")
+        return ["country_name", "total"], self._run(sql, tuple(countries))
+
+    def version(self):
+        # Finish time of the latest recorded ETL run: changes whenever a
+        # fetch, ingest or scheduled run lands new data.
+        try:
+            rows = self._run("SELECT MAX(finished_at) FROM etl_runs")
+        except Exception:
+            return None
+        return _plain(rows[0][0]) if rows else None
+
+
+# Query parameters per endpoint: (name, type, default); no default = required.
+ENDPOINTS = {
+    "countries": [],
+    "total_cases": [("country", str)],
+    "daily_trends": [("metric", str), ("country", str), ("limit", int, 10)],
+    "top_countries": [("metric", str), ("n", int, 10)],
+    "period_rollup": [("metric", str), ("country", str), ("period", str, "month"), ("limit", int, 12)],
+    "series": [("metric", str), ("countries", list), ("days", int, 14)],
+    "derived": [("metric", str), ("countries", list), ("days", int, 14)],
+    "map_summary": [("metric", str), ("countries", list)],
+}
+
+
+def parse_params(endpoint, query):
+    # query: {name: [value]} as from parse_qs; returns keyword arguments.
+    params = {}
+    for name, kind, *default in ENDPOINTS[endpoint]:
+        raw = query.get(name, [None])[-1]
+        if raw is None or raw == "":
+            if not default:
+                raise QueryError(f"Missing parameter '{name}'.")
+            params[name] = default[0]
+        elif kind is int:
+            try:
+                params[name] = int(raw)
+            except ValueError:
+                raise QueryError(f"Parameter '{name}' must be an integer.") from None
+            if not 0 < params[name] <= MAX_ROWS_PARAM:
+                raise QueryError(f"Parameter '{name}' must be between 1 and {MAX_ROWS_PARAM}.")
+        elif kind is list:
+            # Sorted, so the same selection in any order shares a cache entry.
+            params[name] = sorted({value.strip() for value in raw.split(",") if value.strip()})
+            if not params[name]:
+                raise QueryError(f"Parameter '{name}' needs at least one value.")
+        else:
+            params[name] = raw
+    return params
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if hasattr(value, "item"):  # numpy scalars
+        return value.item()
+    return str(value)
+
+
+def encode_result(columns, rows):
+    return json.dumps({"columns": columns, "rows": [list(row) for row in rows]},
+                      default=_plain, separators=(",", ":")).encode("utf-8")
+
+
+class _CacheEntry:
+    def __init__(self, body, version):
+        self.body = body
+        self.version = version
+        self.created = time.monotonic()
+        self._gzipped = None
+
+    def gzipped(self):
+        # Compressed once, on the first request that accepts gzip.
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=5)
+        return self._gzipped
+
+
+class _Flight:
+    # One in-flight query; identical requests wait for it instead of
+    # running their own.
+    def __init__(self):
+        self.done = threading.Event()
+        self.entry = None
+        self.error = None
+
+
+class QueryService:
+    # Serves Analytics over HTTP/JSON from one process, so every reader shares
+    # one connection pool and one result cache:
+    #   - results are cached per (endpoint, parameters) as encoded JSON, up to
+    #     cache_entries (LRU) and cache_ttl seconds;
+    #   - the cache belongs to a data version (Analytics.version, re-read at
+    #     most every version_interval seconds, or bumped by POST /invalidate
+    #     after a load), so a finished ETL run empties it;
+    #   - identical requests arriving while their query runs wait for that
+    #     query (coalescing), so N readers cost the database one query;
+    #   - responses are gzip-compressed for clients that accept it.
+
+    def __init__(self, analytics, cache_entries=DEFAULT_CACHE_ENTRIES, cache_ttl=DEFAULT_CACHE_TTL,
+                 version_interval=DEFAULT_VERSION_INTERVAL):
+        self.analytics = analytics
+        self.cache_entries = cache_entries
+        self.cache_ttl = cache_ttl
+        self.version_interval = version_interval
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._version_lock = threading.Lock()
+        self._version = None
+        self._generation = 0
+        self._version_checked = float("-inf")
+        self.stats = dict.fromkeys(("requests", "hits", "misses", "coalesced", "queries", "errors",
+                                    "invalidations"), 0)
+
+    def result(self, endpoint, params):
+        # Returns (cache entry, how it was served: hit, miss or coalesced).
+        generation = self._current_generation()
+        key = (endpoint, tuple(sorted((name, tuple(value) if isinstance(value, list) else value)
+                                      for name, value in params.items())))
+        with self._lock:
+            self.stats["requests"] += 1
+            entry = self._cache.get(key)
+            if entry and entry.version == generation and time.monotonic() - entry.created < self.cache_ttl:
+                self._cache.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry, "hit"
+            # Requests made after an invalidation never join an older query.
+            flight = self._inflight.get((generation, key))
+            leader = flight is None
+            if leader:
+                flight = self._inflight[(generation, key)] = _Flight()
+                self.stats["misses"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.entry, "coalesced"
+
+        try:
+            columns, rows = getattr(self.analytics, endpoint)(**params)
+            flight.entry = _CacheEntry(encode_result(columns, rows), generation)
+            return flight.entry, "miss"
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self.stats["queries"] += 1
+                if flight.error is not None and not isinstance(flight.error, QueryError):
+                    self.stats["errors"] += 1
+                del self._inflight[(generation, key)]
+                if flight.entry is not None:
+                    self._cache[key] = flight.entry
+                    while len(self._cache) > self.cache_entries:
+                        self._cache.popitem(last=False)
+            flight.done.set()
+
+    def invalidate(self):
+        # The next request re-reads the data version, so the new run's version
+        # is picked up before anything is cached again.
+        self._clear()
+        self._version_checked = float("-inf")
+
+    def _clear(self):
+        with self._lock:
+            self._generation += 1
+            self._cache.clear()
+            self.stats["invalidations"] += 1
+        logger.info("Result cache invalidated.")
+
+    def _current_generation(self):
+        # Re-reads the data version at most every version_interval seconds,
+        # on one request thread; the others use the last known generation.
+        if (time.monotonic() - self._version_checked >= self.version_interval
+                and self._version_lock.acquire(blocking=False)):
+            try:
+                self._version_checked = time.monotonic()
+                version = self.analytics.version()
+                if version != self._version:
+                    if self._version is not None:
+                        logger.info(f"Data version changed to {version}.")
+                        self._clear()
+                    self._version = version
+            finally:
+                self._version_lock.release()
+        return self._generation
+
+    def status(self):
+        with self._lock:
+            return dict(self.stats, entries=len(self._cache), inflight=len(self._inflight),
+                        version=self._version, generation=self._generation)
+
+    def make_server(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        return ThreadingHTTPServer((host, port), _query_handler(self))
+
+
+def _query_handler(service):
+    class QueryHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            endpoint = url.path.strip("/")
+            if endpoint == "stats":
+                return self._reply(200, json.dumps(service.status()).encode("utf-8"))
+            if endpoint not in ENDPOINTS:
+                return self._error(404, f"Unknown endpoint '{endpoint}'; choose from {', '.join(ENDPOINTS)}.")
+            try:
+                entry, served = service.result(endpoint, parse_params(endpoint, parse_qs(url.query)))
+            except QueryError as e:
+                return self._error(400, str(e))
+            except Exception as e:
+                logger.error(f"Query {endpoint} failed: {e}")
+                return self._error(500, f"Query failed: {e}")
+            if "gzip" in self.headers.get("Accept-Encoding", "") and len(entry.body) >= MIN_GZIP_BYTES:
+                return self._reply(200, entry.gzipped(), served, encoding="gzip")
+            self._reply(200, entry.body, served)
+
+        def do_POST(self):
+            if urlsplit(self.path).path.strip("/") != "invalidate":
+                return self._error(404, f"Unknown path {self.path}")
+            service.invalidate()
+            self._reply(200, b'{"invalidated":true}')
+
+        def _error(self, code, message):
+            self._reply(code, json.dumps({"error": message}).encode("utf-8"))
+
+        def _reply(self, code, body, served=None, encoding=None):
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if encoding:
+                self.send_header("Content-Encoding", encoding)
+            if served:
+                self.send_header("X-Cache", served)
+            self.send_header("Vary", "Accept-Encoding")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.info(f"{self.client_address[0]} {format % args}")
+
+    return QueryHandler
+
+
+class QueryClient:
+    # HTTP client for QueryService with the same methods as Analytics. One
+    # keep-alive session per client; responses are gzip-compressed on the wire.
+
+    def __init__(self, base_url, timeout=DEFAULT_CLIENT_TIMEOUT):
+        import requests
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _get(self, endpoint, **params):
+        params = {name: ",".join(value) if isinstance(value, (list, tuple)) else value
+                  for name, value in params.items() if value is not None}
+        response = self.session.get(f"{self.base_url}/{endpoint}", params=params, timeout=self.timeout)
+        if response.status_code == 400:
+            raise QueryError(response.json()["error"])
+        response.raise_for_status()
+        payload = response.json()
+        return payload["columns"], payload["rows"]
+
+    def countries(self):
+        return self._get("countries")
+
+    def total_cases(self, country):
+        return self._get("total_cases", country=country)
+
+    def daily_trends(self, metric, country, limit=10):
+        return self._get("daily_trends", metric=metric, country=country, limit=limit)
+
+    def top_countries(self, metric, n=10):
+        return self._get("top_countries", metric=metric, n=n)
+
+    def period_rollup(self, metric, country, period="month", limit=12, table=None):
+        if table and table != queries.table_for_metric(metric):
+            raise QueryError("The query service reads rollups from the table holding the metric.")
+        return self._get("period_rollup", metric=metric, country=country, period=period, limit=limit)
+
+    def series(self, metric, countries, days=14):
+        return self._get("series", metric=metric, countries=countries, days=days)
+
+    def derived(self, metric, countries, days=14):
+        return self._get("derived", metric=metric, countries=countries, days=days)
+
+    def map_summary(self, metric, countries):
+        return self._get("map_summary", metric=metric, countries=countries)
+
+    def version(self):
+        return self.stats().get("version")
+
+    def stats(self):
+        response = self.session.get(f"{self.base_url}/stats", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def invalidate(self):
+        response = self.session.post(f"{self.base_url}/invalidate", timeout=self.timeout)
+        response.raise_for_status()
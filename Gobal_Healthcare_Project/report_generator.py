@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import re
+import time
+from datetime import datetime
+
+import query_builder as queries
+from etl.schema import SCHEMAS
+from utils.logger import get_logger
+
+logger = get_logger("ReportGenerator")
+
+REPORT_FORMATS = {"csv": ".csv", "csv.gz": ".csv.gz", "parquet": ".parquet"}
+DEFAULT_REPORT_DIR = os.path.join("reports", "pack")
+DEFAULT_REPORT_WORKERS = 4
+MANIFEST_NAME = "manifest.json"
+
+
+def source_hash(frame):
+    # Content fingerprint of a report's input rows; an unchanged hash means
+    # the report on disk is still current.
+    import pandas as pd
+    return hashlib.md5(pd.util.hash_pandas_object(frame, index=False).values.tobytes()).hexdigest()
+
+
+def report_path(output_dir, country, metric, fmt):
+    safe_country = re.sub(r"[^\w.-]+", "_", country).strip("_")
+    return os.path.join(output_dir, safe_country, f"{metric}{REPORT_FORMATS[fmt]}")
+
+
+def render_report(task):
+    # Runs in a worker process: writes one report file atomically.
+    key, frame, path, fmt = task
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if fmt == "parquet":
+        # Written through DuckDB (already a dependency) rather than pandas,
+        # which would need pyarrow; the relation API keeps the path out of SQL.
+        import duckdb
+        with duckdb.connect() as conn:
+            conn.from_df(frame).write_parquet(tmp_path)
+    else:
+        frame.to_csv(tmp_path, index=False, compression="gzip" if fmt == "csv.gz" else None)
+    os.replace(tmp_path, path)
+    return key
+
+
+class ReportGenerator:
+    # Builds a pack of per-country, per-metric reports. Source data is read
+    # with one query per table, reports are written by a pool of worker
+    # processes, and manifest.json records each report's source hash so later
+    # runs only rewrite reports whose data changed.
+
+    def __init__(self, db_handler, output_dir=DEFAULT_REPORT_DIR, fmt="csv", workers=DEFAULT_REPORT_WORKERS):
+        if fmt not in REPORT_FORMATS:
+            raise ValueError(f"Unknown report format '{fmt}'; choose from: {', '.join(REPORT_FORMATS)}.")
+        self.db_handler = db_handler
+        self.output_dir = output_dir
+        self.fmt = fmt
+        self.workers = workers
+
+    def generate(self, countries=None, metrics=None, start_date=None, end_date=None, force=False):
+        started = time.perf_counter()
+        metrics = metrics or [m for schema in SCHEMAS.values() for m in schema.metric_columns]
+        by_table = {}
+        for metric in metrics:
+            by_table.setdefault(queries.table_for_metric(metric), []).append(metric)
+
+        manifest = self._load_manifest()
+        entries = manifest["reports"]
+        tasks, pending, skipped = [], {}, 0
+        with self.db_handler.prepared_session() as session:
+            for table_name, table_metrics in by_table.items():
+                table_countries = countries or [row[0] for row in session.run(*queries.country_names(table_name))]
+                if not table_countries:
+                    continue
+                rows = session.run(*queries.report_source(table_name, table_metrics, table_countries,
+                                                          start_date, end_date))
+                frame = self._to_frame(rows, table_metrics)
+                for country, country_rows in frame.groupby("country_name", sort=False, observed=True):
+                    for metric in table_metrics:
+                        data = country_rows[["report_date", metric]].reset_index(drop=True)
+                        key = f"{country}/{metric}"
+                        digest = source_hash(data)
+                        path = report_path(self.output_dir, str(country), metric, self.fmt)
+                        previous = entries.get(key)
+                        if (not force and previous and previous["source_hash"] == digest
+                                and previous["format"] == self.fmt and os.path.exists(path)):
+                            skipped += 1
+                            continue
+                        tasks.append((key, data, path, self.fmt))
+                        pending[key] = {
+                            "country": str(country), "metric": metric, "table": table_name,
+                            "path": os.path.relpath(path, self.output_dir), "format": self.fmt,
+                            "rows": len(data), "source_hash": digest,
+                            "first_date": data["report_date"].min().strftime("%Y-%m-%d"),
+                            "last_date": data["report_date"].max().strftime("%Y-%m-%d"),
+                        }
+
+        rendered = 0
+        if tasks:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                chunksize = max(1, len(tasks) // (self.workers * 4))
+                for key in pool.map(render_report, tasks, chunksize=chunksize):
+                    entries[key] = dict(pending[key], generated_at=datetime.now().isoformat(timespec="seconds"))
+                    rendered += 1
+
+        manifest["updated_at"] = datetime.now().isoformat(timespec="seconds")
+        self._save_manifest(manifest)
+        elapsed = time.perf_counter() - started
+        logger.info(f"Report pack in {self.output_dir}: {rendered} written, {skipped} unchanged, {elapsed:.2f}s.")
+        return {"written": rendered, "skipped": skipped, "seconds": elapsed}
+
+    @staticmethod
+    def _to_frame(rows, metrics):
+        import pandas as pd
+        frame = pd.DataFrame(rows, columns=["country_name", "report_date"] + metrics)
+        frame["report_date"] = pd.to_datetime(frame["report_date"])
+        for metric in metrics:
+            frame[metric] = pd.to_numeric(frame[metric], errors="coerce").astype("Int64")
+        return frame
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.output_dir, MANIFEST_NAME)
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"reports": {}}
+
+    def _save_manifest(self, manifest):
+        os.makedirs(self.output_dir, exist_ok=True)
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
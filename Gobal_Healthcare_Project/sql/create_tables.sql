@@ -1,4 +1,6 @@
-
+-- Baseline schema (migration 001). Do not change it: later schema changes are
+-- numbered migrations in create_table.py, so databases that already applied
+-- 001 receive them too.
 
 -- Table for the Daily Cases
 
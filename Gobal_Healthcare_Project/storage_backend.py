@@ -0,0 +1,109 @@
+import configparser
+import hashlib
+import threading
+from contextlib import contextmanager
+
+BACKENDS = ("mysql", "duckdb")
+KEY_COLUMNS = ("report_date", "country_name")
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+class StorageBackend:
+    # What the CLI, the loader and the dashboard need from a store. SQL passed
+    # to the query methods uses %s placeholders and the portable subset of SQL
+    # (SELECT / GROUP BY / ORDER BY / LIMIT); backends translate as needed.
+    dialect = None
+
+    def run_query(self, sql, params=None):
+        raise NotImplementedError
+
+    def run_query_with_columns(self, sql, params=None):
+        raise NotImplementedError
+
+    def execute(self, sql, params=None):
+        raise NotImplementedError
+
+    def executemany(self, sql, rows):
+        # One statement for many parameter rows, in a single transaction.
+        raise NotImplementedError
+
+    def transaction(self):
+        # Context manager yielding a cursor (execute / executemany / fetchone /
+        # fetchall, %s placeholders); commits on success, rolls back on error.
+        raise NotImplementedError
+
+    @contextmanager
+    def prepared_session(self):
+        # For repeated parameterized queries (see query_builder). Backends with
+        # server-side prepared statements reuse them for the whole session.
+        yield QuerySession(self)
+
+    def insert_data(self, table_name, records, mode="ignore"):
+        # Returns {"loaded": n, "updated": n, "unchanged": n}.
+        raise NotImplementedError
+
+    def drop_table(self, table_name):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class QuerySession:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def run(self, sql, params=None):
+        return self.backend.run_query(sql, params)
+
+
+# Backend-neutral helpers for loading DataFrames. pandas is imported by the
+# functions, so selecting a backend stays cheap at start-up.
+def as_frame(table_name, records):
+    import pandas as pd
+    from etl.schema import TABLE_COLUMNS
+    if isinstance(records, pd.DataFrame):
+        return records
+    return pd.DataFrame(list(records), columns=TABLE_COLUMNS[table_name])
+
+
+def frame_row_hashes(frame):
+    # Content hash over the key and metric values, built column-wise. The last
+    # column (etl_timestamp) is excluded so a re-delivered but identical row
+    # does not count as changed.
+    import pandas as pd
+    parts = []
+    for column in frame.columns[:-1]:
+        values = frame[column]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            values = values.dt.strftime("%Y-%m-%d")
+        parts.append(values.astype("string").fillna(""))
+    joined = parts[0].str.cat(parts[1:], sep="|") if len(parts) > 1 else parts[0]
+    return [hashlib.md5(value.encode("utf-8")).hexdigest() for value in joined]
+
+
+def get_storage_backend(config_path="config.ini"):
+    # The store named by [storage] backend in config.ini; MySQL by default.
+    # One backend per config file per process, like get_db_handler.
+    config = configparser.ConfigParser()
+    config.read(config_path)
+    backend = config.get("storage", "backend", fallback="mysql").strip().lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown storage backend '{backend}'; expected one of {', '.join(BACKENDS)}.")
+
+    if backend == "mysql":
+        from mysql_handler import get_db_handler
+        return get_db_handler(config_path)
+
+    with _backends_lock:
+        if config_path not in _backends:
+            # Imported here so DuckDB is only required when it is selected.
+            from duckdb_handler import DuckDBHandler
+            _backends[config_path] = DuckDBHandler(
+                config.get("duckdb", "database", fallback="data/healthcare.duckdb"),
+                config.get("duckdb", "data_dir", fallback="data/parquet"),
+                lock_timeout=config.getfloat("duckdb", "lock_timeout", fallback=30)
+            )
+        return _backends[config_path]
@@ -1,5 +1,5 @@
 import configparser
-from mysql_handler import MySQLHandler
+from mysql_handler import get_db_handler
 
 def test_connection():
     config = configparser.ConfigParser()
@@ -9,18 +9,16 @@ def test_connection():
         print("Missing [mysql] section in config.ini")
         return
 
+    db_handler = None
     try:
-        db_handler = MySQLHandler({
-            "host": config["mysql"]["host"],
-            "user": config["mysql"]["user"],
-            "password": config["mysql"]["password"],
-            "database": config["mysql"]["database"]
-        })
+        db_handler = get_db_handler("config.ini")
+        db_handler.run_query("SELECT 1")
         print("Connected to the database successfully.")
     except Exception as e:
         print("Failed to connect to the database:", str(e))
     finally:
-        db_handler.close()
+        if db_handler:
+            db_handler.close()
 
 if __name__ == "__main__":
     test_connection()
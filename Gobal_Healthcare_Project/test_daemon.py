@@ -0,0 +1,47 @@
+from datetime import datetime
+
+import pytest
+
+from etl.daemon import CronSchedule
+
+
+def test_every_fifteen_minutes():
+    schedule = CronSchedule("*/15 * * * *")
+    assert schedule.next_after(datetime(2024, 3, 1, 10, 7, 30)) == datetime(2024, 3, 1, 10, 15)
+    # Strictly after: a moment on a matching minute moves to the next one.
+    assert schedule.next_after(datetime(2024, 3, 1, 10, 15)) == datetime(2024, 3, 1, 10, 30)
+
+
+def test_aliases_and_rollover():
+    assert CronSchedule("@daily").next_after(datetime(2024, 12, 31, 23, 59)) == datetime(2025, 1, 1, 0, 0)
+    assert CronSchedule("@monthly").next_after(datetime(2024, 1, 31, 12, 0)) == datetime(2024, 2, 1, 0, 0)
+
+
+def test_lists_and_ranges():
+    schedule = CronSchedule("30 6,18 * * 1-5")
+    # 2024-03-01 is a Friday; the weekend is skipped.
+    assert schedule.next_after(datetime(2024, 3, 1, 19, 0)) == datetime(2024, 3, 4, 6, 30)
+    assert schedule.next_after(datetime(2024, 3, 4, 6, 30)) == datetime(2024, 3, 4, 18, 30)
+
+
+def test_weekday_seven_is_sunday():
+    assert CronSchedule("0 9 * * 7").weekdays == CronSchedule("0 9 * * 0").weekdays == {0}
+    assert CronSchedule("0 9 * * 7").next_after(datetime(2024, 3, 1)) == datetime(2024, 3, 3, 9, 0)
+
+
+def test_day_or_weekday_when_both_restricted():
+    # As in cron: the 15th of the month or any Monday.
+    schedule = CronSchedule("0 0 15 * 1")
+    assert schedule.next_after(datetime(2024, 3, 1)) == datetime(2024, 3, 4, 0, 0)
+    assert schedule.next_after(datetime(2024, 3, 12)) == datetime(2024, 3, 15, 0, 0)
+
+
+def test_leap_day_only():
+    assert CronSchedule("0 0 29 2 *").next_after(datetime(2024, 3, 1)) == datetime(2028, 2, 29, 0, 0)
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "* 24 * * *", "5-1 * * * *",
+                                        "*/0 * * * *", "a * * * *", "0 0 31 2 *"])
+def test_invalid_schedules(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression).next_after(datetime(2024, 1, 1))
@@ -0,0 +1,84 @@
+import math
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+import derived_metrics
+from query_builder import QueryError
+
+START = date(2024, 1, 1)
+
+
+def series(country, values):
+    # values: {day offset: new_cases}; missing offsets are unreported days.
+    return [(country, START + timedelta(days=offset), value) for offset, value in values.items()]
+
+
+def compute(rows, *names):
+    frame = pd.DataFrame(rows, columns=["country_name", "report_date", "new_cases"])
+    values = derived_metrics.compute_metrics(frame.sample(frac=1, random_state=0), list(names))
+    return values.set_index(["country_name", "report_date"])
+
+
+def value(values, country, offset, name):
+    result = values.loc[(country, START + timedelta(days=offset)), name]
+    return None if pd.isna(result) else result
+
+
+def test_rolling_mean_spans_calendar_days():
+    # Days 4 and 5 were not reported: the 7-day window on day 8 covers days
+    # 2-8, i.e. five reported days, not the last seven rows.
+    values = compute(series("A", {day: day for day in range(10) if day not in (4, 5)}), "new_cases_7d_avg")
+    assert value(values, "A", 0, "new_cases_7d_avg") == 0
+    assert value(values, "A", 6, "new_cases_7d_avg") == pytest.approx((0 + 1 + 2 + 3 + 6) / 5)
+    assert value(values, "A", 8, "new_cases_7d_avg") == pytest.approx((2 + 3 + 6 + 7 + 8) / 5)
+
+
+def test_countries_are_computed_independently():
+    rows = series("A", {day: 10 for day in range(14)}) + series("B", {day: 100 + day for day in range(14)})
+    values = compute(rows, "new_cases_7d_avg", "new_cases_14d_avg")
+    assert value(values, "A", 13, "new_cases_14d_avg") == 10
+    assert value(values, "B", 13, "new_cases_7d_avg") == pytest.approx(110)
+
+
+def test_day_over_day_needs_the_previous_calendar_day():
+    values = compute(series("A", {0: 10, 1: 15, 3: 30}), "new_cases_dod_growth")
+    assert value(values, "A", 0, "new_cases_dod_growth") is None
+    assert value(values, "A", 1, "new_cases_dod_growth") == pytest.approx(50)
+    assert value(values, "A", 3, "new_cases_dod_growth") is None
+
+
+def test_week_over_week_compares_calendar_weeks():
+    # 10 a day for the first week, 20 a day after it.
+    values = compute(series("A", {day: 10 if day < 7 else 20 for day in range(21)}), "new_cases_wow_growth")
+    assert value(values, "A", 6, "new_cases_wow_growth") is None
+    assert value(values, "A", 13, "new_cases_wow_growth") == pytest.approx(100)
+    assert value(values, "A", 20, "new_cases_wow_growth") == pytest.approx(0)
+
+
+def test_week_over_week_is_not_dragged_down_by_a_missing_day():
+    values = compute(series("A", {day: 10 for day in range(21) if day != 16}), "new_cases_wow_growth")
+    assert value(values, "A", 20, "new_cases_wow_growth") == pytest.approx(0)
+
+
+def test_division_by_zero_gives_no_value():
+    values = compute(series("A", {0: 0, 1: 5}), "new_cases_dod_growth")
+    assert value(values, "A", 1, "new_cases_dod_growth") is None
+
+
+def test_case_fatality_rate_and_per_100():
+    frame = pd.DataFrame({"country_name": ["A"], "report_date": [START], "total_cases": [200], "total_deaths": [3]})
+    values = derived_metrics.compute_metrics(frame, ["case_fatality_rate"])
+    assert values["case_fatality_rate"].iloc[0] == pytest.approx(1.5)
+
+    population = pd.DataFrame({"population": [2000]}, index=pd.Index(["A"], name="country_name"))
+    frame = pd.DataFrame({"country_name": ["A", "B"], "report_date": [START, START], "people_vaccinated": [500, 7]})
+    values = derived_metrics.compute_metrics(frame, ["people_vaccinated_per_100"], population)
+    assert values["people_vaccinated_per_100"].iloc[0] == pytest.approx(25)
+    assert math.isnan(values["people_vaccinated_per_100"].iloc[1])
+
+
+def test_unknown_metric():
+    with pytest.raises(QueryError):
+        derived_metrics.get_metric("new_cases_3d_avg")
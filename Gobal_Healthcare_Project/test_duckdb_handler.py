@@ -0,0 +1,80 @@
+from datetime import date
+
+import pytest
+
+from duckdb_handler import DuckDBHandler
+from etl.data_transformer import DataTransformer
+from etl.validation import QuarantineStore
+from etl.watermark import WatermarkStore
+from query_service import Analytics
+
+# The DuckDB/Parquet backend end to end, on a scratch database; needs no
+# MySQL server.
+
+
+def cases(day, country="India", new_cases=10):
+    return {"report_date": f"2024-01-{day:02d}", "country_name": country, "total_cases": 100 * day,
+            "new_cases": new_cases, "total_deaths": day, "new_deaths": 1}
+
+
+@pytest.fixture
+def db(tmp_path):
+    handler = DuckDBHandler(str(tmp_path / "test.duckdb"), str(tmp_path / "parquet"))
+    yield handler
+    handler.close()
+
+
+def load(db, records, mode="ignore"):
+    return db.insert_data("daily_cases", DataTransformer().transform("daily_cases", records), mode=mode)
+
+
+def test_insert_ignore_keeps_existing_rows(db):
+    assert load(db, [cases(1), cases(2)]) == {"loaded": 2, "updated": 0, "unchanged": 0}
+    assert load(db, [cases(2, new_cases=99), cases(3)]) == {"loaded": 1, "updated": 0, "unchanged": 1}
+    assert db.run_query("SELECT report_date, new_cases FROM daily_cases ORDER BY report_date") == [
+        (date(2024, 1, 1), 10), (date(2024, 1, 2), 10), (date(2024, 1, 3), 10)]
+
+
+def test_upsert_rewrites_only_changed_rows(db):
+    load(db, [cases(1), cases(2), cases(1, country="Brazil")])
+    counts = load(db, [cases(1), cases(2, new_cases=12), cases(1, country="Brazil"), cases(3)], mode="upsert")
+    assert counts == {"loaded": 1, "updated": 1, "unchanged": 2}
+    assert db.run_query("SELECT new_cases FROM daily_cases WHERE report_date = %s", (date(2024, 1, 2),)) == [(12,)]
+    assert db.run_query("SELECT COUNT(*) FROM daily_cases") == [(4,)]
+
+
+def test_rows_across_months_land_in_month_files(db, tmp_path):
+    load(db, [cases(31), {**cases(31), "report_date": "2024-02-01"}])
+    assert sorted(path.name for path in (tmp_path / "parquet" / "daily_cases").iterdir()) == [
+        "2024-01.parquet", "2024-02.parquet"]
+    db.drop_table("daily_cases")
+    assert db.run_query("SELECT COUNT(*) FROM daily_cases") == [(0,)]
+
+
+def test_watermarks_only_move_forward(db):
+    watermarks = WatermarkStore(db)
+    transformer = DataTransformer()
+    assert watermarks.get("daily_cases", "India") is None
+    watermarks.advance("daily_cases", transformer.transform("daily_cases", [cases(5), cases(7)]))
+    watermarks.advance("daily_cases", transformer.transform("daily_cases", [cases(3)]))
+    assert watermarks.get("daily_cases", "India") == date(2024, 1, 7)
+
+
+def test_quarantine_replaces_rows_of_a_rerun(db):
+    transformer = DataTransformer(quarantine=QuarantineStore(db))
+    bad = [cases(1, new_cases=-1), {**cases(2), "country_name": None}]
+    for _ in range(2):
+        assert transformer.transform("daily_cases", bad).empty
+    assert db.run_query("SELECT report_date, reasons FROM quarantine_records ORDER BY report_date") == [
+        ("2024-01-01", "negative_new_cases"), ("2024-01-02", "missing_country_name")]
+
+
+def test_analytics_over_parquet(db):
+    load(db, [cases(day, new_cases=day) for day in range(1, 11)] + [cases(1, country="Brazil", new_cases=50)])
+    analytics = Analytics(db)
+    assert analytics.countries()[1] == [("Brazil",), ("India",)]
+    assert analytics.total_cases("India")[1] == [("India", 1000 * 11 // 2)]
+    assert analytics.top_countries("new_cases", 1)[1] == [("India", 55)]
+    # Monday-based weeks: 2024-01-01 is a Monday.
+    assert analytics.period_rollup("new_cases", "India", "week")[1] == [
+        (date(2024, 1, 8), 3, 27, 10), (date(2024, 1, 1), 7, 28, 7)]
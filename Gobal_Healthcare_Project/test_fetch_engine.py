@@ -0,0 +1,27 @@
+from etl.fetch_engine import split_date_range
+
+
+def test_no_sharding():
+    assert split_date_range("2024-01-01", "2024-01-31") == [("2024-01-01", "2024-01-31")]
+    assert split_date_range(None, "2024-01-31", shard_days=7) == [(None, "2024-01-31")]
+
+
+def test_shards_cover_the_range_without_overlap():
+    assert split_date_range("2024-01-01", "2024-01-10", shard_days=4) == [
+        ("2024-01-01", "2024-01-04"),
+        ("2024-01-05", "2024-01-08"),
+        ("2024-01-09", "2024-01-10"),
+    ]
+
+
+def test_shards_cross_month_and_leap_day():
+    assert split_date_range("2024-02-27", "2024-03-02", shard_days=2) == [
+        ("2024-02-27", "2024-02-28"),
+        ("2024-02-29", "2024-03-01"),
+        ("2024-03-02", "2024-03-02"),
+    ]
+
+
+def test_single_day_and_empty_range():
+    assert split_date_range("2024-01-01", "2024-01-01", shard_days=7) == [("2024-01-01", "2024-01-01")]
+    assert split_date_range("2024-01-02", "2024-01-01", shard_days=7) == []
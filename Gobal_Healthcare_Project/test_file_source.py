@@ -0,0 +1,39 @@
+import io
+import json
+
+import pytest
+
+from etl.file_source import iter_json_array
+
+RECORDS = [{"location": f"Country {i}", "date": "2024-01-01", "new_cases": i, "note": "a, ] } [ b"}
+           for i in range(50)]
+
+
+@pytest.mark.parametrize("read_size", [1, 7, 64, 2 ** 20])
+def test_records_split_across_reads(read_size):
+    text = "  [\n" + ",\n".join(json.dumps(record) for record in RECORDS) + "\n]\n"
+    assert list(iter_json_array(io.StringIO(text), read_size=read_size)) == RECORDS
+
+
+def test_empty_array():
+    assert list(iter_json_array(io.StringIO("[ ]"))) == []
+
+
+def test_not_an_array():
+    with pytest.raises(ValueError, match="top-level array"):
+        list(iter_json_array(io.StringIO('{"location": "India"}')))
+
+
+def test_unterminated_array():
+    with pytest.raises(ValueError, match="not terminated"):
+        list(iter_json_array(io.StringIO('[{"a": 1}, {"a": 2}'), read_size=4))
+
+
+def test_malformed_record_stops_within_the_record_limit():
+    text = '[{"a": 1}, {"a": oops}, ' + ", ".join(json.dumps(record) for record in RECORDS * 20) + "]"
+    stream = io.StringIO(text)
+    records = iter_json_array(stream, read_size=16, max_record_size=256)
+    assert next(records) == {"a": 1}
+    with pytest.raises(ValueError, match="Malformed JSON record"):
+        next(records)
+    assert stream.tell() < 512
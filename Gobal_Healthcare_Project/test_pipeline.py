@@ -0,0 +1,20 @@
+import pandas as pd
+
+from etl.pipeline import rebatch
+
+
+def test_rebatch_lists():
+    pages = [[1, 2, 3], [], [4], [5, 6, 7, 8, 9]]
+    assert list(rebatch(pages, 4)) == [[1, 2, 3, 4], [5, 6, 7, 8], [9]]
+
+
+def test_rebatch_exact_multiple_has_no_empty_tail():
+    assert list(rebatch([[1, 2], [3, 4]], 2)) == [[1, 2], [3, 4]]
+    assert list(rebatch([], 2)) == []
+
+
+def test_rebatch_frames():
+    pages = [pd.DataFrame({"n": range(0, 5)}), pd.DataFrame({"n": range(5, 7)})]
+    batches = list(rebatch(pages, 3))
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    assert pd.concat(batches)["n"].tolist() == list(range(7))
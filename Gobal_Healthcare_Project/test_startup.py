@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+
+# `main.py --help` must not pull in the heavy dependencies and must finish
+# importing within the budget (cumulative import time, as reported by
+# python -X importtime, leaving out the interpreter's own `site` setup).
+STARTUP_BUDGET_MS = 100
+HEAVY_MODULES = ("pandas", "numpy", "requests", "mysql.connector", "duckdb", "tabulate")
+
+
+def import_times(*args):
+    project_dir = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "main.py", *args],
+        cwd=project_dir, capture_output=True, text=True, check=True
+    )
+    # Lines look like "import time:  self [us] | cumulative | imported package";
+    # top-level imports are the ones without indentation in the last column.
+    times = {}
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+        if not name.startswith("  ") and name.strip() != "site":
+            total_us += int(cumulative)
+    return times, total_us / 1000
+
+
+def test_startup():
+    times, total_ms = import_times("--help")
+    loaded = [name for name in HEAVY_MODULES if name in times]
+    slowest = sorted(times.items(), key=lambda item: item[1], reverse=True)[:5]
+
+    print(f"Imports for `main.py --help`: {total_ms:.1f} ms (budget {STARTUP_BUDGET_MS} ms).")
+    for name, cumulative in slowest:
+        print(f"  {name}: {cumulative / 1000:.1f} ms")
+
+    assert not loaded, f"Heavy modules imported at startup: {', '.join(loaded)}"
+    assert total_ms <= STARTUP_BUDGET_MS, f"Startup imports took {total_ms:.1f} ms"
+
+
+if __name__ == "__main__":
+    test_startup()
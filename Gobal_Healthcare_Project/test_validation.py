@@ -0,0 +1,76 @@
+from datetime import date, timedelta
+
+import pandas as pd
+
+from etl import validation
+from etl.data_transformer import DataTransformer
+from etl.schema import SCHEMAS
+
+
+def cases(report_date, country="India", total_cases=100, new_cases=10, total_deaths=1, new_deaths=0):
+    return {"report_date": report_date, "country_name": country, "total_cases": total_cases,
+            "new_cases": new_cases, "total_deaths": total_deaths, "new_deaths": new_deaths}
+
+
+def validate(table_name, records):
+    # The transformer's cast, then the rules, as in DataTransformer.transform.
+    schema = SCHEMAS[table_name]
+    raw = pd.DataFrame(records).reindex(columns=schema.column_names)
+    typed = pd.DataFrame({column: DataTransformer._cast(raw[column], dtype, schema.date_formats.get(column))
+                          for column, dtype in schema.columns.items()}, index=raw.index)
+    return validation.validate(table_name, typed, raw)
+
+
+def reasons(result):
+    return dict(zip(result.quarantined["report_date"], result.quarantined["reasons"]))
+
+
+def test_clean_batch_passes():
+    result = validate("daily_cases", [cases("2024-01-01"), cases("2024-01-02", total_cases=110)])
+    assert len(result.valid) == 2
+    assert result.quarantined.empty
+    assert result.counts == {}
+
+
+def test_each_rule_quarantines_its_rows():
+    tomorrow = (date.today() + timedelta(days=1)).isoformat()
+    result = validate("daily_cases", [
+        cases("2024-01-01"),
+        cases("2024-01-02", country=" "),
+        cases("2024-01-03", total_cases="n/a"),
+        cases("2024-01-04", total_cases=None),
+        cases("2024-01-05", new_cases=-5),
+        cases("2024-01-06", total_deaths=500),
+        cases(tomorrow, total_cases=1000, total_deaths=500),
+    ])
+    assert result.valid["report_date"].tolist() == [pd.Timestamp("2024-01-01")]
+    assert reasons(result) == {
+        "2024-01-02": "missing_country_name",
+        "2024-01-03": "unparseable_total_cases",
+        "2024-01-04": "missing_total_cases",
+        "2024-01-05": "negative_new_cases",
+        "2024-01-06": "total_deaths_exceeds_total_cases",
+        tomorrow: "future_report_date",
+    }
+    # The quarantine keeps the record as received.
+    assert result.quarantined.set_index("report_date").loc["2024-01-03", "total_cases"] == "n/a"
+
+
+def test_cumulative_totals_compare_within_each_country():
+    result = validate("daily_cases", [
+        cases("2024-01-02", total_cases=90),
+        cases("2024-01-01", total_cases=100),
+        cases("2024-01-01", country="Brazil", total_cases=50),
+    ])
+    assert reasons(result) == {"2024-01-02": "decreasing_total_cases"}
+    assert result.counts == {"decreasing_total_cases": 1}
+
+
+def test_a_row_lists_every_failed_rule():
+    result = validate("vaccination_data", [{
+        "report_date": "2024-01-01", "country_name": "India", "total_vaccinations": 10,
+        "people_vaccinated": 20, "people_fully_vaccinated": 30,
+    }])
+    assert reasons(result) == {
+        "2024-01-01": "people_fully_vaccinated_exceeds_people_vaccinated;people_vaccinated_exceeds_total_vaccinations",
+    }
@@ -1,23 +1,41 @@
 import logging
 import os
+import threading
 from datetime import datetime
 
-# Ensure logs directory exists
-log_dir = "logs"
-os.makedirs(log_dir, exist_ok=True)
+# The one place logging is configured. Every module asks for a named logger
+# through get_logger(); the first call sets up the handlers: all records go
+# to logs/etl_log_YYYY-MM-DD.log, warnings and errors also to the console.
 
-# Define log file path
-log_file = os.path.join(log_dir, f"etl_log_{datetime.now().strftime('%Y-%m-%d')}.log")
+LOG_DIR = "logs"
+LOG_FORMAT = "%(asctime)s [%(levelname)s] %(name)s - %(message)s"
+
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def configure_logging(level=logging.INFO, console_level=logging.WARNING):
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return
+        os.makedirs(LOG_DIR, exist_ok=True)
+        log_file = os.path.join(LOG_DIR, f"etl_log_{datetime.now().strftime('%Y-%m-%d')}.log")
+        formatter = logging.Formatter(LOG_FORMAT)
+
+        file_handler = logging.FileHandler(log_file)
+        file_handler.setFormatter(formatter)
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(console_level)
+        console_handler.setFormatter(formatter)
+
+        root = logging.getLogger()
+        root.setLevel(level)
+        root.addHandler(file_handler)
+        root.addHandler(console_handler)
+        _configured = True
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(name)s - %(message)s",
-    handlers=[
-        logging.FileHandler(log_file),
-        logging.StreamHandler()
-    ]
-)
 
 def get_logger(name):
+    configure_logging()
     return logging.getLogger(name)